@@ -0,0 +1,403 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Benchmark de l'Image Optimizer pour Mayu & Jack Studio
+Corpus synthétique reproductible, matrice de configurations (moteur, qualité,
+responsive), coût/qualité de la pyramide responsive et aplatissement alpha
+"""
+
+import os
+import sys
+import json
+import argparse
+import itertools
+import multiprocessing
+import platform
+import random
+import tempfile
+import shutil
+import time
+from pathlib import Path
+from queue import Empty
+from typing import Dict, List, Optional
+
+import PIL
+from PIL import Image, ImageDraw, ImageOps
+
+from image_optimizer import (ImageOptimizer, compute_psnr, compute_ssim, flatten_alpha,
+                             normalize_alpha_mode, logger)
+
+# NumPy est optionnel: sans lui, la référence vectorisée n'est pas mesurée
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# resource n'existe pas sous Windows: le pic mémoire n'est alors pas mesuré
+try:
+    import resource
+except ImportError:
+    resource = None
+
+# Résolutions et types d'images du corpus synthétique
+CORPUS_RESOLUTIONS = [(640, 480), (1920, 1080), (4000, 3000)]
+CORPUS_KINDS = ['jpeg', 'png', 'rgba', 'palette']
+# Types disponibles (les types à transparence servent au micro-benchmark alpha)
+ALL_KINDS = CORPUS_KINDS + ['la', 'palette_alpha']
+ALPHA_KINDS = ['rgba', 'la', 'palette', 'palette_alpha']
+CORPUS_SEED = 20240601
+
+
+def _synthetic_image(rng: random.Random, size) -> Image.Image:
+    """Dessine une image RGB déterministe (dégradés, fractale et formes)"""
+    width, height = size
+    gradient = Image.linear_gradient('L').resize(size)
+    radial = Image.radial_gradient('L').resize(size)
+    fractal = Image.effect_mandelbrot(size, (-2.0, -1.2, 0.8, 1.2), rng.randint(20, 80))
+    img = Image.merge('RGB', (gradient, radial, fractal))
+
+    draw = ImageDraw.Draw(img)
+    for _ in range(40):
+        x0, y0 = rng.randrange(width), rng.randrange(height)
+        x1, y1 = x0 + rng.randrange(1, width // 4), y0 + rng.randrange(1, height // 4)
+        color = tuple(rng.randrange(256) for _ in range(3))
+        if rng.random() < 0.5:
+            draw.ellipse((x0, y0, x1, y1), fill=color)
+        else:
+            draw.rectangle((x0, y0, x1, y1), outline=color, width=rng.randint(1, 8))
+    return img
+
+
+def generate_corpus(target_dir: Path, images_per_kind: int = 2, seed: int = CORPUS_SEED,
+                    kinds: Optional[List[str]] = None) -> Dict:
+    """Génère un corpus synthétique reproductible (JPEG, PNG, RGBA, palette...)"""
+    target_dir.mkdir(parents=True, exist_ok=True)
+    rng = random.Random(seed)
+    files = []
+
+    for kind, size, index in itertools.product(kinds or CORPUS_KINDS, CORPUS_RESOLUTIONS, range(images_per_kind)):
+        img = _synthetic_image(rng, size)
+        name = f"{kind}_{size[0]}x{size[1]}_{index}"
+
+        if kind == 'jpeg':
+            path = target_dir / f"{name}.jpg"
+            img.save(path, 'JPEG', quality=95)
+        elif kind == 'png':
+            path = target_dir / f"{name}.png"
+            img.save(path, 'PNG')
+        elif kind == 'rgba':
+            alpha = Image.radial_gradient('L').resize(size)
+            img.putalpha(alpha)
+            path = target_dir / f"{name}.png"
+            img.save(path, 'PNG')
+        elif kind == 'la':
+            img = img.convert('L')
+            img.putalpha(Image.radial_gradient('L').resize(size))
+            path = target_dir / f"{name}.png"
+            img.save(path, 'PNG')
+        elif kind == 'palette_alpha':
+            path = target_dir / f"{name}.png"
+            # L'index 0 de la palette devient transparent
+            img.quantize(colors=64).save(path, 'PNG', transparency=0)
+        else:
+            path = target_dir / f"{name}.png"
+            img.quantize(colors=64).save(path, 'PNG')
+
+        files.append(path)
+
+    return {
+        'seed': seed,
+        'images': len(files),
+        'bytes': sum(path.stat().st_size for path in files)
+    }
+
+
+def _max_process_rss_mb() -> Optional[float]:
+    """Plus grand pic de mémoire résidente parmi le processus et ses enfants (Mo)
+    
+    ru_maxrss ne donne que le pic du plus gourmand des enfants terminés: c'est
+    un maximum par processus, pas la somme des workers vivants en même temps.
+    """
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    peak = max(peak, resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss)
+    # ru_maxrss est en octets sous macOS et en kilo-octets ailleurs
+    divisor = 1024 * 1024 if sys.platform == 'darwin' else 1024
+    return peak / divisor
+
+
+def _run_config_in_child(input_dir: str, config: Dict, queue):
+    """Exécute un run dans un processus dédié pour isoler le pic mémoire"""
+    output_dir = Path(tempfile.mkdtemp(prefix='bench_run_'))
+    try:
+        optimizer = ImageOptimizer(config)
+        results = optimizer.optimize_directory(Path(input_dir), output_dir, recursive=True)
+        queue.put({
+            'total_files': results.get('total_files', 0),
+            'successful': results.get('successful', 0),
+            'errors': results.get('errors', 0),
+            'executor': results.get('executor'),
+            'wall_time': results.get('wall_time', 0),
+            'images_per_second': results.get('images_per_second', 0),
+            'mb_per_second': results.get('mb_per_second', 0),
+            'bytes_before': results.get('total_size_before', 0),
+            'bytes_after': results.get('total_size_after', 0),
+            'bytes_saved': results.get('total_size_before', 0) - results.get('total_size_after', 0),
+            'max_process_rss_mb': _max_process_rss_mb()
+        })
+    except Exception as e:
+        queue.put({'error': str(e)})
+    finally:
+        shutil.rmtree(output_dir, ignore_errors=True)
+
+
+def _wait_child_result(child, queue, timeout: float) -> Dict:
+    """Attend le résultat d'un run enfant, sans bloquer si l'enfant meurt ou dépasse timeout"""
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            return queue.get(timeout=1.0)
+        except Empty:
+            if child.exitcode is not None:
+                # Le résultat a pu arriver juste avant la sortie de l'enfant
+                try:
+                    return queue.get(timeout=1.0)
+                except Empty:
+                    return {'error': f"Run terminé sans résultat (code de sortie {child.exitcode})"}
+            if time.monotonic() > deadline:
+                child.terminate()
+                return {'error': f"Run interrompu après {timeout:.0f}s"}
+
+
+def run_matrix_benchmark(input_dir: Path, executors: List[str], qualities: List[str],
+                         responsive_modes: List[bool], workers: int, repeat: int = 1,
+                         run_timeout: float = 3600) -> Dict:
+    """Exécute optimize_directory pour chaque combinaison de configuration"""
+    report = {
+        'input_dir': str(input_dir),
+        'workers': workers,
+        'environment': {
+            'python': platform.python_version(),
+            'pillow': PIL.__version__,
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count()
+        },
+        'runs': []
+    }
+    context = multiprocessing.get_context('spawn')
+
+    for executor, quality, responsive in itertools.product(executors, qualities, responsive_modes):
+        config = {
+            'executor': executor,
+            'quality': quality,
+            'generate_responsive': responsive,
+            'max_workers': workers,
+            'threading': True,
+            'incremental': False
+        }
+        for run_index in range(repeat):
+            queue = context.Queue()
+            child = context.Process(target=_run_config_in_child, args=(str(input_dir), config, queue))
+            child.start()
+            run = _wait_child_result(child, queue, run_timeout)
+            child.join()
+            if 'error' in run:
+                logger.error(f"❌ {executor}/{quality}/responsive={responsive}: {run['error']}")
+
+            run.update({'config': config, 'run': run_index})
+            report['runs'].append(run)
+            logger.info(f"⏱️ {executor}/{quality}/responsive={responsive}: "
+                        f"{run.get('images_per_second', 0):.2f} images/s")
+
+    # Comparaison avec le moteur thread (référence historique)
+    best = {}
+    for run in report['runs']:
+        name = run.get('executor') or run['config']['executor']
+        best[name] = max(best.get(name, 0), run.get('images_per_second', 0))
+    if best.get('thread'):
+        report['speedup_vs_thread'] = {name: ips / best['thread'] for name, ips in best.items()}
+    report['best_images_per_second'] = best
+
+    return report
+
+
+def run_pyramid_benchmark(input_dir: Path, min_ratio: float = 2.0) -> Dict:
+    """Compare la pyramide responsive aux redimensionnements directs (temps, PSNR, SSIM)"""
+    optimizer = ImageOptimizer({'pyramid_min_ratio': min_ratio})
+    report = {'input_dir': str(input_dir), 'pyramid_min_ratio': min_ratio, 'images': []}
+    totals = {'direct_time': 0.0, 'pyramid_time': 0.0}
+
+    image_files = sorted(
+        path for path in input_dir.rglob('*')
+        if path.suffix.lower() in ImageOptimizer.SUPPORTED_FORMATS
+    )
+
+    for image_file in image_files:
+        with Image.open(image_file) as img:
+            img = optimizer._resize_image(ImageOps.exif_transpose(img).convert('RGB'))
+
+        start = time.perf_counter()
+        direct = {name: resized for name, _, resized in optimizer._compute_responsive_images(img, pyramid=False)}
+        direct_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        pyramid = {name: resized for name, _, resized in optimizer._compute_responsive_images(img, pyramid=True)}
+        pyramid_time = time.perf_counter() - start
+
+        totals['direct_time'] += direct_time
+        totals['pyramid_time'] += pyramid_time
+
+        report['images'].append({
+            'file': str(image_file),
+            'direct_time': direct_time,
+            'pyramid_time': pyramid_time,
+            'sizes': {
+                name: {
+                    'psnr': compute_psnr(direct[name], pyramid[name]),
+                    'ssim': compute_ssim(direct[name], pyramid[name])
+                }
+                for name in direct
+            }
+        })
+
+    all_sizes = [size for image in report['images'] for size in image['sizes'].values()]
+    report.update(totals)
+    report['speedup'] = totals['direct_time'] / totals['pyramid_time'] if totals['pyramid_time'] > 0 else 0
+    if all_sizes:
+        report['min_ssim'] = min(size['ssim'] for size in all_sizes)
+        report['min_psnr'] = min(size['psnr'] for size in all_sizes)
+
+    return report
+
+
+def _legacy_flatten(img: Image.Image) -> Image.Image:
+    """Aplatissement historique: palette convertie en RGBA, collage masqué par split()"""
+    background = Image.new('RGB', img.size, (255, 255, 255))
+    if img.mode == 'P':
+        img = img.convert('RGBA')
+    background.paste(img, mask=img.split()[-1] if img.mode == 'RGBA' else None)
+    return background
+
+
+def _numpy_flatten(img: Image.Image) -> Image.Image:
+    """Aplatissement vectorisé NumPy (référence de comparaison)"""
+    rgba = np.asarray(img.convert('RGBA'))
+    alpha = rgba[..., 3:].astype(np.uint16)
+    blended = rgba[..., :3] * alpha
+    blended += (255 - alpha) * 255
+    blended += 127
+    blended //= 255
+    return Image.fromarray(blended.astype(np.uint8), 'RGB')
+
+
+def run_alpha_benchmark(input_dir: Path, repeat: int = 3) -> Dict:
+    """Compare l'aplatissement historique aux chemins flatten_alpha et alpha conservé"""
+    paths = {
+        'legacy': _legacy_flatten,
+        'flatten_alpha': flatten_alpha,
+        'preserve_alpha': normalize_alpha_mode
+    }
+    if np is not None:
+        paths['numpy'] = _numpy_flatten
+
+    report = {'input_dir': str(input_dir), 'repeat': repeat, 'images': []}
+    totals = {name: 0.0 for name in paths}
+
+    image_files = sorted(path for path in input_dir.rglob('*.png'))
+    for image_file in image_files:
+        with Image.open(image_file) as img:
+            img.load()
+            if img.mode not in ('RGBA', 'LA', 'P', 'PA'):
+                continue
+            entry = {'file': str(image_file), 'mode': img.mode, 'timings': {}}
+            reference = _legacy_flatten(img)
+
+            for name, flatten in paths.items():
+                start = time.perf_counter()
+                for _ in range(repeat):
+                    output = flatten(img)
+                elapsed = (time.perf_counter() - start) / repeat
+                entry['timings'][name] = elapsed
+                totals[name] += elapsed
+                if name != 'preserve_alpha':
+                    entry.setdefault('psnr_vs_legacy', {})[name] = compute_psnr(reference, output)
+            report['images'].append(entry)
+
+    report['totals'] = totals
+    report['speedup_vs_legacy'] = {
+        name: totals['legacy'] / elapsed for name, elapsed in totals.items() if elapsed > 0
+    }
+    return report
+
+
+def main():
+    """Point d'entrée du benchmark"""
+    parser = argparse.ArgumentParser(description="Benchmark de l'optimiseur d'images")
+    parser.add_argument('input', nargs='?',
+                        help="Répertoire d'images (par défaut: corpus synthétique généré)")
+    parser.add_argument('--suite', choices=['matrix', 'executors', 'pyramid', 'alpha'], default='matrix',
+                        help='Benchmark à exécuter')
+    parser.add_argument('--pyramid-min-ratio', type=float, default=2.0,
+                        help='Garde-fou qualité de la pyramide')
+    parser.add_argument('--executors', nargs='+', choices=['thread', 'process'],
+                        default=['thread', 'process'], help="Moteurs d'exécution à comparer")
+    parser.add_argument('--qualities', nargs='+', choices=['low', 'medium', 'high'],
+                        default=['low', 'medium', 'high'], help='Niveaux de qualité (suite matrix)')
+    parser.add_argument('--responsive', nargs='+', choices=['on', 'off'], default=['on', 'off'],
+                        help='Versions responsives (suite matrix)')
+    parser.add_argument('--kinds', nargs='+', choices=ALL_KINDS,
+                        help='Types d\'images du corpus synthétique (suite alpha: types à transparence)')
+    parser.add_argument('--images-per-kind', type=int, default=2,
+                        help='Images par type et résolution du corpus synthétique')
+    parser.add_argument('--seed', type=int, default=CORPUS_SEED, help='Graine du corpus synthétique')
+    parser.add_argument('--workers', type=int, default=4, help='Nombre de workers')
+    parser.add_argument('--repeat', type=int, default=1, help='Nombre de répétitions par configuration')
+    parser.add_argument('--run-timeout', type=float, default=3600,
+                        help="Durée maximale d'un run de la matrice (secondes)")
+    parser.add_argument('--json', help='Fichier de sortie JSON')
+
+    args = parser.parse_args()
+
+    corpus_dir = None
+    corpus_info = None
+    if args.input:
+        input_dir = Path(args.input)
+        if not input_dir.is_dir():
+            logger.error("❌ Répertoire d'entrée invalide")
+            return 1
+    else:
+        corpus_dir = Path(tempfile.mkdtemp(prefix='bench_corpus_'))
+        input_dir = corpus_dir
+        kinds = args.kinds or (ALPHA_KINDS if args.suite == 'alpha' else CORPUS_KINDS)
+        corpus_info = generate_corpus(corpus_dir, args.images_per_kind, args.seed, kinds)
+        logger.info(f"🧪 Corpus synthétique: {corpus_info['images']} images")
+
+    try:
+        if args.suite == 'pyramid':
+            report = run_pyramid_benchmark(input_dir, args.pyramid_min_ratio)
+        elif args.suite == 'alpha':
+            report = run_alpha_benchmark(input_dir, args.repeat)
+        elif args.suite == 'executors':
+            report = run_matrix_benchmark(input_dir, args.executors, ['medium'], [True],
+                                          args.workers, args.repeat, args.run_timeout)
+        else:
+            report = run_matrix_benchmark(input_dir, args.executors, args.qualities,
+                                          [mode == 'on' for mode in args.responsive],
+                                          args.workers, args.repeat, args.run_timeout)
+    finally:
+        if corpus_dir is not None:
+            shutil.rmtree(corpus_dir, ignore_errors=True)
+
+    if corpus_info is not None:
+        report['corpus'] = corpus_info
+
+    output = json.dumps(report, indent=2, default=str)
+    if args.json:
+        Path(args.json).write_text(output, encoding='utf-8')
+    print(output)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
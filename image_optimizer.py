@@ -9,14 +9,38 @@ Conversion WebP, compression, redimensionnement intelligent
 import os
 import sys
 import json
+import math
 import argparse
+import asyncio
+import base64
+import io
+from collections import OrderedDict
+import shutil
+import tarfile
+import zipfile
+from contextlib import contextmanager
 from pathlib import Path
-from PIL import Image, ImageOps, ImageFilter
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from PIL import Image, ImageOps, ImageChops, ImageStat
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, Future, wait, FIRST_COMPLETED, ALL_COMPLETED
+from itertools import chain, islice
 import logging
-from typing import List, Dict, Tuple, Optional
+from typing import List, Dict, Set, Tuple, Optional, Iterator, Iterable, Callable
+import multiprocessing.util
+import cProfile
+import glob
 import hashlib
+import heapq
+import ctypes
+import ctypes.util
+import select
+import struct
+import pstats
+import re
+import sqlite3
+import threading
 import time
+import uuid
+from urllib.parse import urlsplit, parse_qs
 
 # Configuration des logs
 logging.basicConfig(
@@ -29,6 +53,1422 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# NumPy est optionnel: il accélère les mesures de qualité (SSIM par blocs)
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# Constantes de stabilisation SSIM pour une dynamique de 8 bits
+SSIM_C1 = (0.01 * 255) ** 2
+SSIM_C2 = (0.03 * 255) ** 2
+
+# Modes Pillow porteurs d'un canal alpha (ou d'une palette pouvant en avoir un)
+ALPHA_MODES = ('RGBA', 'LA', 'P', 'PA')
+
+def normalize_alpha_mode(img: Image.Image) -> Image.Image:
+    """Ramène une image à alpha vers RGB(A) ou L(A), en ne gardant l'alpha que s'il sert
+    
+    Une palette sans transparence est convertie directement en RGB, et un canal
+    alpha entièrement opaque est abandonné (encodage WebP plus léger).
+    """
+    if img.mode == 'P':
+        return img.convert('RGBA' if 'transparency' in img.info else 'RGB')
+    if img.mode == 'PA':
+        img = img.convert('RGBA')
+    if img.mode in ('RGBA', 'LA') and img.getchannel('A').getextrema()[0] == 255:
+        return img.convert(img.mode[0] if img.mode == 'LA' else 'RGB')
+    return img
+
+def flatten_alpha(img: Image.Image, background: Tuple[int, int, int] = (255, 255, 255)) -> Image.Image:
+    """Aplatit la transparence sur un fond uni (RGB, ou L pour une image LA)
+    
+    Le fond reçoit l'image en un seul collage masqué par le canal alpha seul
+    (getchannel), sans split() de toutes les bandes. Les autres modes sont
+    retournés tels quels.
+    """
+    if img.mode not in ALPHA_MODES:
+        return img
+    img = normalize_alpha_mode(img)
+    
+    if img.mode == 'LA':
+        # Niveaux de gris: composition sur une seule bande, sans passer par RGBA
+        flattened = Image.new('L', img.size, round(sum(background) / 3))
+        flattened.paste(img.getchannel('L'), mask=img.getchannel('A'))
+        return flattened
+    if img.mode != 'RGBA':
+        return img
+    
+    flattened = Image.new('RGB', img.size, background)
+    flattened.paste(img, mask=img.getchannel('A'))
+    return flattened
+
+def compute_psnr(reference: Image.Image, candidate: Image.Image) -> float:
+    """Calcule le PSNR (dB) entre deux images de même taille"""
+    diff = ImageChops.difference(reference.convert('RGB'), candidate.convert('RGB'))
+    histogram = diff.histogram()
+    squared_error = sum(count * (index % 256) ** 2 for index, count in enumerate(histogram))
+    mse = squared_error / (reference.width * reference.height * 3)
+    if mse == 0:
+        return float('inf')
+    return 10 * math.log10(255 ** 2 / mse)
+
+def compute_ssim(reference: Image.Image, candidate: Image.Image, block_size: int = 8) -> float:
+    """Calcule le SSIM de luminance entre deux images de même taille
+    
+    Avec NumPy, le SSIM est moyenné sur des blocs de block_size pixels;
+    sans NumPy, on retombe sur un SSIM global calculé avec ImageStat.
+    """
+    ref = reference.convert('L')
+    cand = candidate.convert('L')
+    
+    if np is not None:
+        a = np.asarray(ref, dtype=np.float64)
+        b = np.asarray(cand, dtype=np.float64)
+        h = a.shape[0] // block_size * block_size
+        w = a.shape[1] // block_size * block_size
+        if h and w:
+            shape = (h // block_size, block_size, w // block_size, block_size)
+            a = a[:h, :w].reshape(shape)
+            b = b[:h, :w].reshape(shape)
+            mu_a = a.mean(axis=(1, 3))
+            mu_b = b.mean(axis=(1, 3))
+            var_a = (a * a).mean(axis=(1, 3)) - mu_a ** 2
+            var_b = (b * b).mean(axis=(1, 3)) - mu_b ** 2
+            cov = (a * b).mean(axis=(1, 3)) - mu_a * mu_b
+            ssim = ((2 * mu_a * mu_b + SSIM_C1) * (2 * cov + SSIM_C2)) / \
+                   ((mu_a ** 2 + mu_b ** 2 + SSIM_C1) * (var_a + var_b + SSIM_C2))
+            return float(ssim.mean())
+    
+    stat_a = ImageStat.Stat(ref)
+    stat_b = ImageStat.Stat(cand)
+    mu_a, mu_b = stat_a.mean[0], stat_b.mean[0]
+    var_a, var_b = stat_a.var[0], stat_b.var[0]
+    # cov(a, b) = 2·var((a+b)/2) - (var(a) + var(b)) / 2
+    var_avg = ImageStat.Stat(ImageChops.add(ref, cand, scale=2.0)).var[0]
+    cov = 2 * var_avg - (var_a + var_b) / 2
+    return ((2 * mu_a * mu_b + SSIM_C1) * (2 * cov + SSIM_C2)) / \
+           ((mu_a ** 2 + mu_b ** 2 + SSIM_C1) * (var_a + var_b + SSIM_C2))
+
+def dhash(path: Path, hash_size: int = 8) -> int:
+    """Empreinte perceptuelle dHash (hash_size² bits) calculée sur une miniature
+    
+    Les JPEG sont décodés au 1/8 (draft), les autres formats réduits dès que
+    possible: seule une miniature en niveaux de gris est manipulée.
+    """
+    with Image.open(path) as img:
+        img.draft('L', (hash_size * 8, hash_size * 8))
+        if img.format != 'JPEG' and img.mode not in ('P', '1'):
+            factor = min(img.width, img.height) // (hash_size * 8)
+            if factor >= 2:
+                img = img.reduce(factor)
+        small = img.convert('L').resize((hash_size + 1, hash_size), Image.Resampling.BOX)
+    
+    pixels = small.tobytes()
+    value = 0
+    for row in range(hash_size):
+        offset = row * (hash_size + 1)
+        for col in range(hash_size):
+            value = (value << 1) | (pixels[offset + col] > pixels[offset + col + 1])
+    return value
+
+def hamming_distance(a: int, b: int) -> int:
+    """Nombre de bits différents entre deux empreintes"""
+    return bin(a ^ b).count('1')
+
+class BKTree:
+    """Arbre BK sur la distance de Hamming: recherche des empreintes proches
+    sans comparer la requête à toutes les empreintes déjà indexées
+    """
+    
+    def __init__(self):
+        # Nœud: [empreinte, élément, {distance: nœud enfant}]
+        self.root = None
+        self.size = 0
+    
+    def add(self, value: int, item):
+        """Indexe une empreinte"""
+        self.size += 1
+        if self.root is None:
+            self.root = [value, item, {}]
+            return
+        node = self.root
+        while True:
+            distance = hamming_distance(value, node[0])
+            child = node[2].get(distance)
+            if child is None:
+                node[2][distance] = [value, item, {}]
+                return
+            node = child
+    
+    def nearest(self, value: int, max_distance: int) -> Optional[Tuple[int, object]]:
+        """Élément le plus proche à au plus max_distance, ou None"""
+        best = None
+        stack = [self.root] if self.root is not None else []
+        while stack:
+            node = stack.pop()
+            distance = hamming_distance(value, node[0])
+            if distance <= max_distance and (best is None or distance < best[0]):
+                best = (distance, node[1])
+            # Inégalité triangulaire: seuls ces sous-arbres peuvent contenir un voisin
+            for child_distance, child in node[2].items():
+                if distance - max_distance <= child_distance <= distance + max_distance:
+                    stack.append(child)
+        return best
+
+class OptimizationManifest:
+    """Manifeste persistant (SQLite) des images déjà optimisées dans un répertoire de sortie"""
+    
+    FILENAME = '.optimization_manifest.sqlite'
+    HASH_CHUNK_SIZE = 1024 * 1024
+    
+    def __init__(self, output_dir: Path):
+        """Ouvre (ou crée) le manifeste du répertoire de sortie"""
+        self.path = output_dir / self.FILENAME
+        # Une connexion SQLite par thread (les connexions ne sont pas partageables)
+        self._local = threading.local()
+        conn = self._connect()
+        with conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS entries (
+                    source TEXT PRIMARY KEY,
+                    size INTEGER NOT NULL,
+                    mtime_ns INTEGER NOT NULL,
+                    content_hash TEXT NOT NULL,
+                    config_hash TEXT NOT NULL,
+                    outputs TEXT NOT NULL,
+                    updated_at REAL NOT NULL
+                )
+            """)
+    
+    def _connect(self) -> sqlite3.Connection:
+        """Retourne la connexion du thread courant"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(str(self.path), timeout=30)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+        return conn
+    
+    def content_hash(self, source: Path, stat: os.stat_result) -> str:
+        """Empreinte SHA-256 du contenu, réutilisée si taille et mtime n'ont pas changé"""
+        row = self._connect().execute(
+            'SELECT size, mtime_ns, content_hash FROM entries WHERE source = ?',
+            (str(source),)
+        ).fetchone()
+        if row and row[0] == stat.st_size and row[1] == stat.st_mtime_ns:
+            return row[2]
+        
+        digest = hashlib.sha256()
+        with open(source, 'rb') as f:
+            for chunk in iter(lambda: f.read(self.HASH_CHUNK_SIZE), b''):
+                digest.update(chunk)
+        return digest.hexdigest()
+    
+    def lookup(self, source: Path, content_hash: str, config_hash: str) -> Optional[List[Dict]]:
+        """Retourne les sorties enregistrées si la source et la config sont inchangées"""
+        row = self._connect().execute(
+            'SELECT content_hash, config_hash, outputs FROM entries WHERE source = ?',
+            (str(source),)
+        ).fetchone()
+        if row is None or row[0] != content_hash or row[1] != config_hash:
+            return None
+        return json.loads(row[2])
+    
+    def record(self, source: Path, stat: os.stat_result, content_hash: str,
+               config_hash: str, outputs: List[Dict]):
+        """Enregistre (ou remplace) l'entrée d'une image optimisée"""
+        conn = self._connect()
+        with conn:
+            conn.execute(
+                'INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?, ?, ?)',
+                (str(source), stat.st_size, stat.st_mtime_ns, content_hash,
+                 config_hash, json.dumps(outputs), time.time())
+            )
+
+class ResultCollector:
+    """Agrège les résultats au fil de l'eau, en mémoire ou en flux JSON Lines
+    
+    En mode flux, chaque résultat est écrit dès sa réception dans un fichier
+    JSON Lines et seuls les agrégats restent en mémoire.
+    """
+    
+    def __init__(self, jsonl_path: Optional[Path] = None):
+        """Prépare le collecteur (jsonl_path active le mode flux)"""
+        self.jsonl_path = Path(jsonl_path) if jsonl_path else None
+        self.results = [] if self.jsonl_path is None else None
+        self.counts = {'success': 0, 'error': 0, 'skipped': 0}
+        self.total_files = 0
+        self.size_before = 0
+        self.size_after = 0
+        self.processing_time = 0
+        self._file = None
+        
+        if self.jsonl_path is not None:
+            self.jsonl_path.parent.mkdir(parents=True, exist_ok=True)
+            self._file = open(self.jsonl_path, 'w', encoding='utf-8')
+    
+    @classmethod
+    def from_jsonl(cls, jsonl_path: Path) -> 'ResultCollector':
+        """Reconstruit les agrégats à partir d'un fichier JSON Lines existant"""
+        collector = cls()
+        collector.results = None
+        collector.jsonl_path = Path(jsonl_path)
+        for result in iter_results_jsonl(collector.jsonl_path):
+            collector._aggregate(result)
+        return collector
+    
+    def _aggregate(self, result: Dict):
+        """Met à jour les agrégats avec un résultat"""
+        status = result['status']
+        self.total_files += 1
+        self.counts[status] = self.counts.get(status, 0) + 1
+        if status == 'success':
+            self.size_before += result['size_before']
+            self.size_after += result['size_after']
+            self.processing_time += result.get('processing_time', 0)
+    
+    def add(self, result: Dict):
+        """Ajoute un résultat (écrit immédiatement en mode flux)"""
+        self._aggregate(result)
+        if self._file is not None:
+            self._file.write(json.dumps(result, default=str) + '\n')
+            self._file.flush()
+        elif self.results is not None:
+            self.results.append(result)
+    
+    def close(self):
+        """Ferme le fichier JSON Lines éventuel"""
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+    
+    def summary(self, processing_time: Optional[float] = None) -> Dict:
+        """Retourne le résumé au format de _compile_results"""
+        total_compression = 0
+        if self.size_before > 0:
+            total_compression = (1 - self.size_after / self.size_before) * 100
+        
+        summary = {
+            'status': 'completed',
+            'total_files': self.total_files,
+            'successful': self.counts.get('success', 0),
+            'errors': self.counts.get('error', 0),
+            'skipped': self.counts.get('skipped', 0),
+            'total_compression': total_compression,
+            'total_size_before': self.size_before,
+            'total_size_after': self.size_after,
+            'processing_time': self.processing_time if processing_time is None else processing_time,
+            'results': self.results if self.results is not None else []
+        }
+        if self.jsonl_path is not None:
+            summary['results_file'] = str(self.jsonl_path)
+        return summary
+
+class RunJournal:
+    """Journal de progression (JSON Lines) d'un lot, avec points de reprise
+    
+    Chaque résultat est ajouté au journal dès sa réception; une ligne checkpoint
+    est posée une fois les sorties des résultats précédents écrites sur disque.
+    À la reprise, seuls les résultats antérieurs au dernier checkpoint comptent:
+    le journal est tronqué à ce point et les images suivantes sont retraitées.
+    """
+    
+    def __init__(self, path: Path, run_info: Dict, resume: bool = False):
+        """Ouvre le journal (repris si resume et compatible, sinon recommencé)"""
+        self.path = path
+        self.run_info = run_info
+        self.completed = set()
+        self.resumed = 0
+        self._checkpoint_offset = 0
+        
+        if resume and self.path.exists():
+            self._load()
+        
+        if self._checkpoint_offset:
+            self._file = open(self.path, 'r+', encoding='utf-8')
+            self._file.truncate(self._checkpoint_offset)
+            self._file.seek(self._checkpoint_offset)
+        else:
+            self.completed = set()
+            self._file = open(self.path, 'w', encoding='utf-8')
+            self._write({'type': 'run', **run_info, 'started_at': time.time()})
+            self.checkpoint()
+    
+    def _load(self):
+        """Relit le journal jusqu'au dernier checkpoint"""
+        completed = set()
+        offset = 0
+        with open(self.path, 'rb') as f:
+            for raw_line in f:
+                offset += len(raw_line)
+                try:
+                    entry = json.loads(raw_line)
+                except ValueError:
+                    # Ligne tronquée par l'arrêt brutal: fin du journal exploitable
+                    break
+                if entry['type'] == 'run':
+                    if any(entry.get(key) != value for key, value in self.run_info.items()):
+                        logger.warning("⚠️ Journal d'un autre lot ou d'une autre configuration, reprise ignorée")
+                        return
+                elif entry['type'] == 'result':
+                    completed.add(entry['key'])
+                elif entry['type'] == 'checkpoint':
+                    self.completed = set(completed)
+                    self._checkpoint_offset = offset
+        self.resumed = len(self.completed)
+    
+    def _iter_checkpointed(self) -> Iterator[Tuple[str, Dict]]:
+        """Relit les (clé, résultat) validés avant le dernier checkpoint"""
+        with open(self.path, 'rb') as f:
+            offset = 0
+            for raw_line in f:
+                offset += len(raw_line)
+                if offset > self._checkpoint_offset:
+                    break
+                entry = json.loads(raw_line)
+                if entry['type'] == 'result':
+                    yield entry['key'], entry['result']
+    
+    def iter_completed(self) -> Iterator[Dict]:
+        """Relit les résultats déjà validés (avant le dernier checkpoint)"""
+        if not self.resumed:
+            return
+        for key, result in self._iter_checkpointed():
+            if key in self.completed:
+                yield result
+    
+    def verify(self, outputs_exist: Callable[[Dict], bool]) -> int:
+        """Retire des images terminées celles dont les sorties ont disparu
+        
+        Elles seront retraitées; retourne leur nombre.
+        """
+        if not self.resumed:
+            return 0
+        missing = {key for key, result in self._iter_checkpointed()
+                   if key in self.completed and not outputs_exist(result)}
+        self.completed -= missing
+        self.resumed = len(self.completed)
+        return len(missing)
+    
+    @staticmethod
+    def key(file_path, input_dir: Path) -> str:
+        """Clé stable d'une image: chemin relatif au répertoire d'entrée (séparateurs /)"""
+        return Path(os.path.relpath(file_path, input_dir)).as_posix()
+    
+    def _write(self, entry: Dict):
+        """Ajoute une ligne au journal"""
+        self._file.write(json.dumps(entry, default=str) + '\n')
+    
+    def record(self, key: str, result: Dict):
+        """Ajoute un résultat au journal"""
+        self._write({'type': 'result', 'key': key, 'result': result})
+    
+    def checkpoint(self, total_files: Optional[int] = None):
+        """Rend durables les résultats journalisés jusqu'ici"""
+        self._write({'type': 'checkpoint', 'total_files': total_files, 'at': time.time()})
+        self._file.flush()
+        os.fsync(self._file.fileno())
+    
+    def complete(self, total_files: int):
+        """Marque le lot comme terminé et ferme le journal"""
+        self._write({'type': 'complete', 'total_files': total_files, 'at': time.time()})
+        self.checkpoint(total_files)
+        self.close()
+    
+    def close(self):
+        """Ferme le journal"""
+        if not self._file.closed:
+            self._file.close()
+
+class JournaledCollector(ResultCollector):
+    """Collecteur qui journalise chaque résultat et pose un checkpoint tous les chunk_size résultats
+    
+    Avant chaque checkpoint, sync rend durables les étapes d'écriture (sans
+    fermer les archives): un résultat journalisé avant un checkpoint a toutes
+    ses sorties sur disque.
+    """
+    
+    def __init__(self, journal: RunJournal, input_dir: Path, sync: Callable[[], List[BaseException]],
+                 chunk_size: int = 100, jsonl_path: Optional[Path] = None):
+        super().__init__(jsonl_path)
+        self.journal = journal
+        self.input_dir = input_dir
+        self.sync = sync
+        self.chunk_size = max(1, chunk_size)
+        self.write_errors = []
+        self._since_checkpoint = 0
+        
+        # Les résultats des runs précédents font partie du résumé final
+        for result in journal.iter_completed():
+            super().add(result)
+    
+    def add(self, result: Dict):
+        """Ajoute un résultat, le journalise et pose un checkpoint en fin de lot"""
+        super().add(result)
+        self.journal.record(RunJournal.key(result['file'], self.input_dir), result)
+        self._since_checkpoint += 1
+        if self._since_checkpoint >= self.chunk_size:
+            self.checkpoint()
+    
+    def checkpoint(self):
+        """Rend durables les écritures en cours puis pose un checkpoint"""
+        errors = self.sync()
+        for error in errors:
+            logger.error(f"❌ Erreur d'écriture: {error}")
+        self.write_errors.extend(errors)
+        self.journal.checkpoint(self.total_files)
+        self._since_checkpoint = 0
+    
+    def summary(self, processing_time: Optional[float] = None) -> Dict:
+        """Résumé, avec les erreurs d'écriture relevées aux checkpoints"""
+        summary = super().summary(processing_time)
+        summary['write_errors'] = len(self.write_errors)
+        summary['resumed'] = self.journal.resumed
+        return summary
+
+def iter_results_jsonl(jsonl_path: Path) -> Iterator[Dict]:
+    """Relit un fichier de résultats JSON Lines ligne par ligne"""
+    with open(jsonl_path, 'r', encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                yield json.loads(line)
+
+class WorkerMetrics:
+    """Accumulateur de métriques propre à un worker
+    
+    Seul le thread propriétaire écrit; son verrou (jamais contesté en pratique)
+    protège les lectures faites depuis un autre thread (snapshot, drain).
+    
+    En mode profilage, chaque durée d'étape alimente aussi un histogramme
+    logarithmique et les fichiers les plus lents sont conservés (top N).
+    """
+    
+    COUNTERS = ('processed', 'skipped', 'errors', 'total_size_before', 'total_size_after', 'processing_time')
+    
+    def __init__(self, profile: bool = False, top_n: int = 10):
+        self.profile = profile
+        self.top_n = top_n
+        self._lock = threading.Lock()
+        self._reset()
+    
+    def _reset(self):
+        self.counters = {key: 0 for key in self.COUNTERS}
+        self.stage_time = {}
+        self.stage_count = {}
+        self.stage_histogram = {}
+        self.slowest_files = []
+    
+    def increment(self, key: str, value=1):
+        """Incrémente un compteur"""
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+    
+    def add_stage(self, stage: str, elapsed: float):
+        """Ajoute la durée d'une étape du pipeline"""
+        with self._lock:
+            self._add_stage(stage, elapsed, 1)
+            if self.profile:
+                bucket = histogram_bucket(elapsed)
+                histogram = self.stage_histogram.setdefault(stage, {})
+                histogram[bucket] = histogram.get(bucket, 0) + 1
+    
+    def _add_stage(self, stage: str, elapsed: float, count: int):
+        self.stage_time[stage] = self.stage_time.get(stage, 0.0) + elapsed
+        self.stage_count[stage] = self.stage_count.get(stage, 0) + count
+    
+    @contextmanager
+    def stage(self, stage: str):
+        """Chronomètre une étape du pipeline"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_stage(stage, time.perf_counter() - start)
+    
+    def record_file(self, file_path: str, elapsed: float, stages: Dict[str, float]):
+        """Conserve le fichier s'il fait partie des top N plus lents"""
+        with self._lock:
+            self._record_file(file_path, elapsed, stages)
+    
+    def _record_file(self, file_path: str, elapsed: float, stages: Dict[str, float]):
+        entry = (elapsed, file_path, stages)
+        if len(self.slowest_files) < self.top_n:
+            heapq.heappush(self.slowest_files, entry)
+        elif elapsed > self.slowest_files[0][0]:
+            heapq.heapreplace(self.slowest_files, entry)
+    
+    def snapshot(self) -> Dict:
+        """Copie sérialisable des métriques (transfert entre processus)"""
+        with self._lock:
+            return self._snapshot()
+    
+    def _snapshot(self) -> Dict:
+        return {
+            'counters': dict(self.counters),
+            'stage_time': dict(self.stage_time),
+            'stage_count': dict(self.stage_count),
+            'stage_histogram': {stage: dict(buckets) for stage, buckets in self.stage_histogram.items()},
+            'slowest_files': list(self.slowest_files)
+        }
+    
+    def drain(self) -> Dict:
+        """Retourne les métriques accumulées puis remet l'accumulateur à zéro"""
+        with self._lock:
+            snapshot = self._snapshot()
+            self._reset()
+        return snapshot
+    
+    def merge(self, snapshot: Dict):
+        """Ajoute les métriques d'un autre accumulateur"""
+        with self._lock:
+            for key, value in snapshot['counters'].items():
+                self.counters[key] = self.counters.get(key, 0) + value
+            for stage, elapsed in snapshot['stage_time'].items():
+                self._add_stage(stage, elapsed, 0)
+            for stage, count in snapshot['stage_count'].items():
+                self._add_stage(stage, 0.0, count)
+            for stage, buckets in snapshot.get('stage_histogram', {}).items():
+                histogram = self.stage_histogram.setdefault(stage, {})
+                for bucket, count in buckets.items():
+                    histogram[bucket] = histogram.get(bucket, 0) + count
+            for elapsed, file_path, stages in snapshot.get('slowest_files', []):
+                self._record_file(file_path, elapsed, stages)
+
+def histogram_bucket(elapsed: float) -> str:
+    """Classe une durée dans un intervalle logarithmique (puissances de 2 en ms)"""
+    milliseconds = elapsed * 1000
+    if milliseconds < 1:
+        return '<1ms'
+    upper = 2 ** math.ceil(math.log2(milliseconds)) if milliseconds > 1 else 2
+    return f"{upper // 2}-{upper}ms"
+
+class PipelineMetrics:
+    """Métriques du pipeline: un accumulateur par thread, fusionnés à la lecture
+    
+    Chaque thread n'écrit que dans son propre WorkerMetrics, lu par instantané
+    sous le verrou de l'accumulateur; le verrou du pipeline ne sert qu'à
+    enregistrer un nouvel accumulateur ou à fusionner ceux des processus.
+    reset() ouvre un nouveau lot: les métriques ne couvrent que le lot en cours.
+    """
+    
+    def __init__(self, profile: bool = False, top_n: int = 10):
+        self.profile = profile
+        self.top_n = top_n
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._accumulators = []
+        self._remote = WorkerMetrics(profile, top_n)
+        self.wall_start = None
+        self.wall_end = None
+    
+    def local(self) -> WorkerMetrics:
+        """Accumulateur du thread courant"""
+        accumulator = getattr(self._local, 'accumulator', None)
+        if accumulator is None:
+            accumulator = WorkerMetrics(self.profile, self.top_n)
+            self._local.accumulator = accumulator
+            with self._lock:
+                self._accumulators.append((threading.current_thread(), accumulator))
+        return accumulator
+    
+    def reset(self):
+        """Remet les métriques à zéro au début d'un lot
+        
+        Les accumulateurs des threads terminés (pools des lots précédents) sont
+        oubliés, ceux des threads encore vivants sont vidés.
+        """
+        with self._lock:
+            self._accumulators = [(thread, accumulator) for thread, accumulator in self._accumulators
+                                  if thread.is_alive()]
+            for _, accumulator in self._accumulators:
+                accumulator.drain()
+            self._remote = WorkerMetrics(self.profile, self.top_n)
+    
+    def merge_snapshot(self, snapshot: Dict):
+        """Fusionne les métriques remontées par un processus worker"""
+        with self._lock:
+            self._remote.merge(snapshot)
+    
+    def drain(self) -> Dict:
+        """Retourne les métriques de tous les accumulateurs puis les remet à zéro"""
+        merged = WorkerMetrics(self.profile, self.top_n)
+        with self._lock:
+            for _, accumulator in self._accumulators:
+                merged.merge(accumulator.drain())
+        return merged.snapshot()
+    
+    def totals(self) -> WorkerMetrics:
+        """Fusion de tous les accumulateurs"""
+        merged = WorkerMetrics(self.profile, self.top_n)
+        with self._lock:
+            merged.merge(self._remote.snapshot())
+            for _, accumulator in self._accumulators:
+                merged.merge(accumulator.snapshot())
+        return merged
+    
+    def start_wall(self):
+        """Démarre le chronomètre wall-clock du lot"""
+        self.wall_start = time.perf_counter()
+        self.wall_end = None
+    
+    def stop_wall(self):
+        """Arrête le chronomètre wall-clock du lot"""
+        self.wall_end = time.perf_counter()
+    
+    def report(self) -> Dict:
+        """Débit wall-clock et temps par étape"""
+        totals = self.totals()
+        wall_time = 0.0
+        if self.wall_start is not None:
+            wall_time = (self.wall_end or time.perf_counter()) - self.wall_start
+        
+        processed = totals.counters['processed']
+        megabytes = totals.counters['total_size_before'] / (1024 * 1024)
+        stages = {
+            stage: {
+                'total': elapsed,
+                'count': totals.stage_count[stage],
+                'mean': elapsed / totals.stage_count[stage]
+            }
+            for stage, elapsed in sorted(totals.stage_time.items())
+        }
+        
+        report = {
+            'wall_time': wall_time,
+            'images_per_second': processed / wall_time if wall_time > 0 else 0,
+            'mb_per_second': megabytes / wall_time if wall_time > 0 else 0,
+            'counters': totals.counters,
+            'stages': stages
+        }
+        
+        if self.profile:
+            report['histograms'] = {
+                stage: dict(sorted(buckets.items(), key=lambda item: _bucket_sort_key(item[0])))
+                for stage, buckets in sorted(totals.stage_histogram.items())
+            }
+            report['slowest_files'] = [
+                {'file': file_path, 'processing_time': elapsed, 'stages': file_stages}
+                for elapsed, file_path, file_stages in sorted(totals.slowest_files, reverse=True)
+            ]
+        
+        return report
+
+def _bucket_sort_key(bucket: str) -> float:
+    """Clé de tri numérique d'un intervalle d'histogramme"""
+    if bucket.startswith('<'):
+        return 0
+    return float(bucket.split('-')[0])
+
+class OutputWriter:
+    """Étape d'écriture des fichiers encodés, séparée de l'encodage
+    
+    Les encodeurs produisent des tampons mémoire; l'écriture (fichier temporaire
+    puis renommage atomique, fsync optionnel) se fait dans un pool dédié.
+    max_pending borne le nombre d'écritures en vol: au-delà, submit() bloque
+    l'encodeur (contre-pression). Avec max_pending à 0, l'écriture est synchrone.
+    """
+    
+    def __init__(self, metrics: PipelineMetrics, max_pending: int = 16,
+                 threads: int = 4, fsync: bool = False):
+        self.metrics = metrics
+        self.fsync = fsync
+        self.max_pending = max_pending
+        self._executor = None
+        self._slots = None
+        self._lock = threading.Lock()
+        self._pending = set()
+        self._callbacks = set()
+        self._errors = []
+        
+        if max_pending > 0:
+            self._executor = ThreadPoolExecutor(max_workers=max(1, min(threads, max_pending)),
+                                                thread_name_prefix='writer')
+            self._slots = threading.BoundedSemaphore(max_pending)
+    
+    def _write_file(self, data: bytes, path: Path):
+        """Écrit un fichier de façon atomique (temporaire + rename)"""
+        metrics = self.metrics.local()
+        temp_path = path.with_name(f".{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        try:
+            with metrics.stage('write'):
+                with open(temp_path, 'wb') as f:
+                    f.write(data)
+                    if self.fsync:
+                        with metrics.stage('fsync'):
+                            f.flush()
+                            os.fsync(f.fileno())
+                os.replace(temp_path, path)
+        except BaseException:
+            if temp_path.exists():
+                temp_path.unlink()
+            raise
+    
+    def _link_file(self, source_future: Future, source: Path, path: Path):
+        """Crée un lien physique (ou une copie) une fois la source écrite"""
+        source_future.result()
+        if path.exists() or path.is_symlink():
+            path.unlink()
+        try:
+            os.link(source, path)
+        except OSError:
+            # Système de fichiers sans liens physiques: copie des octets déjà encodés
+            shutil.copyfile(source, path)
+    
+    def _submit(self, fn, *args) -> Future:
+        """Exécute une tâche d'écriture, en différé si le pool est actif"""
+        if self._executor is None:
+            future = Future()
+            try:
+                future.set_result(fn(*args))
+            except Exception as e:
+                future.set_exception(e)
+            return future
+        
+        self._slots.acquire()
+        try:
+            future = self._executor.submit(fn, *args)
+        except BaseException:
+            self._slots.release()
+            raise
+        with self._lock:
+            self._pending.add(future)
+        future.add_done_callback(self._on_done)
+        return future
+    
+    def _on_done(self, future: Future):
+        """Libère le créneau d'écriture et mémorise les erreurs"""
+        self._slots.release()
+        with self._lock:
+            self._pending.discard(future)
+            if future.exception() is not None:
+                self._errors.append(future.exception())
+    
+    def submit(self, data: bytes, path: Path) -> Future:
+        """Planifie l'écriture d'un tampon encodé"""
+        return self._submit(self._write_file, data, path)
+    
+    def submit_link(self, source_future: Future, source: Path, path: Path) -> Future:
+        """Planifie un lien vers une sortie déjà planifiée"""
+        return self._submit(self._link_file, source_future, source, path)
+    
+    def when_done(self, futures: List[Future], callback):
+        """Appelle callback quand toutes les écritures ont réussi
+        
+        Écritures déjà terminées (image hors lot, après wait): appel immédiat.
+        Sinon le rappel s'exécute dans le thread d'écriture et flush() l'attend.
+        """
+        if all(f.done() for f in futures):
+            if all(f.exception() is None for f in futures):
+                callback()
+            return
+        
+        remaining = [len(futures)]
+        lock = threading.Lock()
+        called = Future()
+        with self._lock:
+            self._callbacks.add(called)
+        
+        def on_done(_future):
+            with lock:
+                remaining[0] -= 1
+                if remaining[0]:
+                    return
+            try:
+                if all(f.exception() is None for f in futures):
+                    callback()
+            finally:
+                with self._lock:
+                    self._callbacks.discard(called)
+                called.set_result(None)
+        
+        for future in futures:
+            future.add_done_callback(on_done)
+    
+    def wait(self, futures: List[Future]):
+        """Attend des écritures et relève la première erreur"""
+        for future in futures:
+            future.result()
+    
+    def flush(self) -> List[BaseException]:
+        """Attend toutes les écritures en vol (et leurs rappels) et retourne les erreurs accumulées"""
+        with self._lock:
+            pending = list(self._pending)
+        wait(pending)
+        # wait() rend la main avant les rappels de fin d'écriture (manifeste)
+        with self._lock:
+            callbacks = list(self._callbacks)
+        wait(callbacks)
+        with self._lock:
+            errors, self._errors = self._errors, []
+        return errors
+    
+    def sync(self) -> List[BaseException]:
+        """Point de reprise: attend les écritures en vol (voir ShardWriter.sync)"""
+        return self.flush()
+    
+    def close(self):
+        """Vide puis arrête le pool d'écriture"""
+        self.flush()
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+
+class ShardWriter(OutputWriter):
+    """Écrit toutes les variantes dans des archives tar/zip de taille bornée
+    
+    Aucun fichier individuel n'est créé: chaque variante devient un membre de
+    l'archive courante (chemin relatif au répertoire de sortie). Quand l'archive
+    dépasse shard_size, elle est fermée, renommée et accompagnée d'un index JSON
+    (membres, tailles, positions, alias). Les écritures sont synchrones et
+    sérialisées par un verrou: les threads workers écrivent directement dedans.
+    
+    sync() rend durable l'archive en cours sans la fermer: les nouveaux membres
+    et la position atteinte sont ajoutés à un fichier .members.jsonl, qui permet
+    à recover() de publier une archive .partial laissée par un arrêt brutal.
+    Les rappels de when_done (manifeste) n'ont lieu qu'à ce moment, ou à la
+    publication de l'archive: un membre perdu par l'arrêt n'est jamais
+    enregistré comme sortie existante.
+    """
+    
+    def __init__(self, metrics: PipelineMetrics, root_dir: Path, archive_format: str = 'tar',
+                 shard_size: int = 256 * 1024 * 1024, fsync: bool = False):
+        super().__init__(metrics, max_pending=0, fsync=fsync)
+        if archive_format not in ('tar', 'zip'):
+            raise ValueError(f"Format d'archive inconnu: {archive_format}")
+        self.root_dir = root_dir
+        self.archive_format = archive_format
+        self.shard_size = shard_size
+        self.archive_dir = root_dir / 'archives'
+        # Préfixe unique par run et par processus (les workers ont chacun leurs archives)
+        self._prefix = f"shard-{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}-{uuid.uuid4().hex[:6]}"
+        self._shard_lock = threading.Lock()
+        self._shard_number = 0
+        self._archive = None
+        self._shard_path = None
+        self._partial_path = None
+        self._members = []
+        self._synced_members = 0
+        self._shard_bytes = 0
+        self._durable_callbacks = []
+    
+    def _member_name(self, path: Path) -> str:
+        """Nom du membre dans l'archive (chemin relatif au répertoire de sortie)"""
+        try:
+            return path.relative_to(self.root_dir).as_posix()
+        except ValueError:
+            return path.name
+    
+    def _open_shard(self):
+        """Ouvre une nouvelle archive (écrite sous un nom temporaire)"""
+        self.archive_dir.mkdir(parents=True, exist_ok=True)
+        self._shard_number += 1
+        self._shard_path = self.archive_dir / f"{self._prefix}-{self._shard_number:04d}.{self.archive_format}"
+        self._partial_path = self._shard_path.with_name(self._shard_path.name + '.partial')
+        if self.archive_format == 'tar':
+            self._archive = tarfile.open(self._partial_path, 'w')
+        else:
+            # Les images sont déjà compressées: stockage sans recompression
+            self._archive = zipfile.ZipFile(self._partial_path, 'w', zipfile.ZIP_STORED)
+        self._members = []
+        self._synced_members = 0
+        self._shard_bytes = 0
+    
+    def _close_shard(self):
+        """Ferme l'archive courante, la publie et écrit son index"""
+        if self._archive is None:
+            return
+        self._archive.close()
+        if self.fsync:
+            with open(self._partial_path, 'rb') as f:
+                os.fsync(f.fileno())
+        os.replace(self._partial_path, self._shard_path)
+        self._write_index(self._shard_path, self.archive_format, self._members)
+        
+        sidecar = self._sidecar_path(self._partial_path)
+        if sidecar.exists():
+            sidecar.unlink()
+        
+        logger.info(f"📦 Archive écrite: {self._shard_path.name} ({len(self._members)} membres)")
+        self._archive = None
+    
+    @staticmethod
+    def _sidecar_path(partial_path: Path) -> Path:
+        """Fichier des membres rendus durables d'une archive en cours"""
+        return partial_path.with_name(partial_path.name + '.members.jsonl')
+    
+    @staticmethod
+    def _write_index(shard_path: Path, archive_format: str, members: List[Dict]):
+        """Écrit l'index JSON d'une archive publiée"""
+        index_path = shard_path.with_name(shard_path.name + '.index.json')
+        with open(index_path, 'w', encoding='utf-8') as f:
+            json.dump({
+                'shard': shard_path.name,
+                'format': archive_format,
+                'size': shard_path.stat().st_size,
+                'members': members
+            }, f, indent=2)
+    
+    @staticmethod
+    def _add_member(archive, archive_format: str, name: str, data: bytes) -> int:
+        """Ajoute un membre à une archive ouverte et retourne la position de ses données"""
+        if archive_format == 'tar':
+            info = tarfile.TarInfo(name)
+            info.size = len(data)
+            info.mtime = int(time.time())
+            archive.addfile(info, io.BytesIO(data))
+            # Les données précèdent le bourrage jusqu'au bloc de 512 octets suivant
+            padded_size = -(-len(data) // tarfile.BLOCKSIZE) * tarfile.BLOCKSIZE
+            return archive.offset - padded_size
+        info = zipfile.ZipInfo(name, date_time=time.localtime()[:6])
+        archive.writestr(info, data)
+        return info.header_offset
+    
+    def when_done(self, futures: List[Future], callback):
+        """Appelle callback une fois les membres durables (prochain sync ou publication)"""
+        if all(f.exception() is None for f in futures):
+            with self._shard_lock:
+                self._durable_callbacks.append(callback)
+    
+    def _take_durable_callbacks(self) -> List:
+        """Retire les rappels en attente (appelé sous le verrou, membres déjà durables)"""
+        callbacks, self._durable_callbacks = self._durable_callbacks, []
+        return callbacks
+    
+    def sync(self) -> List[BaseException]:
+        """Rend durables les membres déjà écrits, sans fermer l'archive courante"""
+        with self._shard_lock:
+            if self._archive is not None and self._synced_members < len(self._members):
+                raw = self._archive.fileobj if self.archive_format == 'tar' else self._archive.fp
+                raw.flush()
+                os.fsync(raw.fileno())
+                offset = self._archive.offset if self.archive_format == 'tar' else raw.tell()
+                with open(self._sidecar_path(self._partial_path), 'a', encoding='utf-8') as f:
+                    for member in self._members[self._synced_members:]:
+                        f.write(json.dumps(member) + '\n')
+                    f.write(json.dumps({'synced': offset}) + '\n')
+                    f.flush()
+                    os.fsync(f.fileno())
+                self._synced_members = len(self._members)
+            callbacks = self._take_durable_callbacks()
+        for callback in callbacks:
+            callback()
+        return OutputWriter.flush(self)
+    
+    @classmethod
+    def recover(cls, archive_dir: Path) -> int:
+        """Publie les archives .partial d'un run interrompu (membres synchronisés seulement)
+        
+        Les données de chaque membre durable sont recopiées dans une archive
+        complète, publiée sous le nom prévu à l'origine. Retourne le nombre
+        d'archives récupérées.
+        """
+        recovered = 0
+        for sidecar in sorted(archive_dir.glob('*.partial.members.jsonl')):
+            partial_path = sidecar.with_name(sidecar.name[:-len('.members.jsonl')])
+            shard_path = partial_path.with_name(partial_path.name[:-len('.partial')])
+            archive_format = shard_path.suffix.lstrip('.')
+            
+            members, durable = [], []
+            with open(sidecar, 'r', encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        break  # Ligne tronquée: seule la partie synchronisée compte
+                    if 'synced' in entry:
+                        durable = list(members)
+                    else:
+                        members.append(entry)
+            
+            if partial_path.exists() and durable and archive_format in ('tar', 'zip'):
+                rebuilt_path = partial_path.with_name(partial_path.name + '.recover')
+                rebuilt_members = []
+                with open(partial_path, 'rb') as source:
+                    if archive_format == 'tar':
+                        archive = tarfile.open(rebuilt_path, 'w')
+                    else:
+                        archive = zipfile.ZipFile(rebuilt_path, 'w', zipfile.ZIP_STORED)
+                    with archive:
+                        for member in durable:
+                            if 'link_to' in member:
+                                rebuilt_members.append(member)
+                                continue
+                            offset = member['offset']
+                            if archive_format == 'zip':
+                                # En-tête local: 30 octets puis nom et champ extra
+                                source.seek(offset)
+                                name_length, extra_length = struct.unpack('<HH', source.read(30)[26:30])
+                                offset += 30 + name_length + extra_length
+                            source.seek(offset)
+                            data = source.read(member['size'])
+                            offset = cls._add_member(archive, archive_format, member['name'], data)
+                            rebuilt_members.append({**member, 'offset': offset})
+                os.replace(rebuilt_path, shard_path)
+                cls._write_index(shard_path, archive_format, rebuilt_members)
+                recovered += 1
+                logger.info(f"🩹 Archive récupérée: {shard_path.name} ({len(rebuilt_members)} membres)")
+            
+            if partial_path.exists():
+                partial_path.unlink()
+            sidecar.unlink()
+        return recovered
+    
+    def _write_file(self, data: bytes, path: Path) -> str:
+        """Ajoute un tampon encodé à l'archive courante et retourne son chemin final"""
+        name = self._member_name(path)
+        with self._shard_lock, self.metrics.local().stage('write'):
+            if self._archive is not None and self._members and self._shard_bytes + len(data) > self.shard_size:
+                self._close_shard()
+            if self._archive is None:
+                self._open_shard()
+            
+            offset = self._add_member(self._archive, self.archive_format, name, data)
+            self._members.append({'name': name, 'size': len(data), 'offset': offset})
+            self._shard_bytes += len(data)
+            return str(self._shard_path)
+    
+    def _link_file(self, source_future: Future, source: Path, path: Path) -> str:
+        """Enregistre un alias dans l'index plutôt qu'une copie des octets"""
+        shard_path = source_future.result()
+        with self._shard_lock:
+            entry = {'name': self._member_name(path), 'link_to': self._member_name(source)}
+            if shard_path != str(self._shard_path):
+                entry['link_shard'] = Path(shard_path).name
+            if self._archive is None:
+                self._open_shard()
+            self._members.append(entry)
+            return str(self._shard_path)
+    
+    def flush(self) -> List[BaseException]:
+        """Ferme l'archive courante; la prochaine écriture en ouvrira une nouvelle"""
+        with self._shard_lock:
+            self._close_shard()
+            callbacks = self._take_durable_callbacks()
+        for callback in callbacks:
+            callback()
+        return super().flush()
+
+class MemoryWriter(OutputWriter):
+    """Étape d'écriture en mémoire: les variantes restent des tampons (mode service)
+    
+    Les sorties sont indexées par leur chemin relatif au répertoire de sortie
+    virtuel; un doublon (lien physique) partage le tampon de sa source.
+    """
+    
+    def __init__(self, metrics: PipelineMetrics, root_dir: Path):
+        super().__init__(metrics, max_pending=0)
+        self.root_dir = root_dir
+        self.files = {}
+    
+    def _name(self, path: Path) -> str:
+        """Nom de la sortie relatif au répertoire de sortie virtuel"""
+        return path.relative_to(self.root_dir).as_posix()
+    
+    def _write_file(self, data: bytes, path: Path):
+        """Conserve le tampon encodé"""
+        self.files[self._name(path)] = data
+    
+    def _link_file(self, source_future: Future, source: Path, path: Path):
+        """Fait pointer la sortie vers le tampon déjà encodé"""
+        source_future.result()
+        self.files[self._name(path)] = self.files[self._name(source)]
+
+class VariantCache:
+    """Cache LRU des variantes rendues à la demande, en mémoire et sur disque
+    
+    Les deux niveaux sont bornés en octets. Une variante est écrite sur disque
+    dès son rendu: évincée de la mémoire, elle reste servie depuis le disque
+    (et survit au redémarrage) tant que le budget disque le permet.
+    """
+    
+    def __init__(self, memory_bytes: int, disk_dir: Optional[Path] = None, disk_bytes: int = 0):
+        self.memory_bytes = memory_bytes
+        self.disk_dir = disk_dir
+        self.disk_bytes = disk_bytes if disk_dir is not None else 0
+        self._memory = OrderedDict()
+        self._disk = OrderedDict()
+        self.memory_size = 0
+        self.disk_size = 0
+        self._lock = threading.Lock()
+        self.stats = {'memory_hits': 0, 'disk_hits': 0, 'misses': 0,
+                      'memory_evictions': 0, 'disk_evictions': 0}
+        
+        if self.disk_dir is not None:
+            self.disk_dir.mkdir(parents=True, exist_ok=True)
+            # Reprendre les variantes existantes, des moins aux plus récemment utilisées
+            entries = sorted((entry.stat().st_mtime_ns, entry.name[:-4], entry.stat().st_size)
+                             for entry in os.scandir(self.disk_dir) if entry.name.endswith('.bin'))
+            for _, key, size in entries:
+                self._disk[key] = size
+                self.disk_size += size
+            self._evict_disk()
+    
+    def _disk_path(self, key: str) -> Path:
+        """Fichier disque d'une variante"""
+        return self.disk_dir / f"{key}.bin"
+    
+    def get(self, key: str) -> Optional[bytes]:
+        """Retourne la variante (promue en tête de LRU) ou None"""
+        with self._lock:
+            data = self._memory.get(key)
+            if data is not None:
+                self._memory.move_to_end(key)
+                self.stats['memory_hits'] += 1
+                return data
+            on_disk = key in self._disk
+        
+        if on_disk:
+            try:
+                data = self._disk_path(key).read_bytes()
+                os.utime(self._disk_path(key))
+            except OSError:
+                # Fichier supprimé hors du cache: l'entrée est oubliée
+                data = None
+                with self._lock:
+                    self.disk_size -= self._disk.pop(key, 0)
+            if data is not None:
+                with self._lock:
+                    self.stats['disk_hits'] += 1
+                    if key in self._disk:
+                        self._disk.move_to_end(key)
+                    self._store_memory(key, data)
+                return data
+        
+        with self._lock:
+            self.stats['misses'] += 1
+        return None
+    
+    def put(self, key: str, data: bytes):
+        """Ajoute une variante rendue aux deux niveaux du cache"""
+        if self.disk_dir is not None and len(data) <= self.disk_bytes:
+            path = self._disk_path(key)
+            temp_path = path.with_name(f".{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+            try:
+                temp_path.write_bytes(data)
+                os.replace(temp_path, path)
+            except OSError as e:
+                logger.warning(f"⚠️ Cache disque des variantes indisponible: {e}")
+            else:
+                with self._lock:
+                    self.disk_size += len(data) - self._disk.pop(key, 0)
+                    self._disk[key] = len(data)
+                    self._evict_disk()
+        
+        with self._lock:
+            self._store_memory(key, data)
+    
+    def _store_memory(self, key: str, data: bytes):
+        """Place une variante en mémoire et évince les moins récentes (verrou tenu)"""
+        if len(data) > self.memory_bytes:
+            return
+        previous = self._memory.pop(key, None)
+        if previous is not None:
+            self.memory_size -= len(previous)
+        self._memory[key] = data
+        self.memory_size += len(data)
+        while self.memory_size > self.memory_bytes:
+            _, evicted = self._memory.popitem(last=False)
+            self.memory_size -= len(evicted)
+            self.stats['memory_evictions'] += 1
+    
+    def _evict_disk(self):
+        """Supprime les variantes disque les moins récentes au-delà du budget (verrou tenu)"""
+        while self.disk_size > self.disk_bytes and self._disk:
+            key, size = self._disk.popitem(last=False)
+            self.disk_size -= size
+            self.stats['disk_evictions'] += 1
+            try:
+                self._disk_path(key).unlink()
+            except OSError:
+                pass
+    
+    def report(self) -> Dict:
+        """Statistiques de cache (succès, évictions, occupation)"""
+        with self._lock:
+            lookups = self.stats['memory_hits'] + self.stats['disk_hits'] + self.stats['misses']
+            return {
+                **self.stats,
+                'hit_rate': (lookups - self.stats['misses']) / lookups if lookups else 0,
+                'memory_entries': len(self._memory),
+                'memory_mb': self.memory_size / (1024 * 1024),
+                'disk_entries': len(self._disk),
+                'disk_mb': self.disk_size / (1024 * 1024)
+            }
+
+class PollingWatcher:
+    """Détecte les images nouvelles ou modifiées en comparant périodiquement os.stat
+    
+    Une image n'est signalée qu'une fois stable (taille et mtime identiques sur
+    deux passages), pour ne pas traiter un fichier en cours de téléversement.
+    """
+    
+    def __init__(self, scan: Callable[[str], Iterator[Path]], root: Path, poll_interval: float = 2.0):
+        """Mémorise l'état initial de l'arborescence (les fichiers existants ne sont pas signalés)"""
+        self.scan = scan
+        self.root = str(root)
+        self.poll_interval = poll_interval
+        self._seen = self._snapshot()
+        self._unstable = {}
+        self._next_scan = time.monotonic() + poll_interval
+    
+    def _snapshot(self) -> Dict[str, Tuple[int, int]]:
+        """Taille et mtime de chaque image de l'arborescence"""
+        snapshot = {}
+        for path in self.scan(self.root):
+            try:
+                stat = path.stat()
+            except OSError:
+                continue
+            snapshot[str(path)] = (stat.st_size, stat.st_mtime_ns)
+        return snapshot
+    
+    def poll(self, timeout: float) -> Set[str]:
+        """Attend au plus timeout secondes et retourne les images devenues stables"""
+        delay = self._next_scan - time.monotonic()
+        if delay > timeout:
+            time.sleep(timeout)
+            return set()
+        time.sleep(max(0.0, delay))
+        self._next_scan = time.monotonic() + self.poll_interval
+        
+        current = self._snapshot()
+        changed = set()
+        unstable = {}
+        for path, signature in current.items():
+            if self._seen.get(path) == signature:
+                continue
+            if self._unstable.get(path) == signature:
+                # Inchangé depuis le passage précédent: l'écriture est terminée
+                self._seen[path] = signature
+                changed.add(path)
+            else:
+                unstable[path] = signature
+        self._unstable = unstable
+        # Oublier les fichiers supprimés
+        for path in set(self._seen) - set(current):
+            del self._seen[path]
+        return changed
+    
+    def close(self):
+        """Rien à libérer pour le mode scrutation"""
+
+class InotifyWatcher:
+    """Surveillance d'une arborescence via inotify (Linux, appelé par ctypes)
+    
+    Un watch est posé sur chaque répertoire; les fichiers sont signalés à la
+    fermeture après écriture ou au renommage vers le répertoire surveillé.
+    """
+    
+    IN_CLOSE_WRITE = 0x00000008
+    IN_MOVED_TO = 0x00000080
+    IN_CREATE = 0x00000100
+    IN_DELETE_SELF = 0x00000400
+    IN_MOVE_SELF = 0x00000800
+    IN_Q_OVERFLOW = 0x00004000
+    IN_IGNORED = 0x00008000
+    IN_ONLYDIR = 0x01000000
+    IN_ISDIR = 0x40000000
+    WATCH_MASK = IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE | IN_DELETE_SELF | IN_MOVE_SELF | IN_ONLYDIR
+    EVENT_HEADER = struct.Struct('iIII')
+    
+    def __init__(self, scan: Callable[[str], Iterator[Path]], root: Path,
+                 is_candidate: Callable[[str], bool], recursive: bool = True,
+                 exclude_dir: Optional[Path] = None):
+        """Initialise inotify et pose les watches (OSError si indisponible)"""
+        if not sys.platform.startswith('linux'):
+            raise OSError("inotify n'est disponible que sous Linux")
+        self._libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+        self.fd = self._libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            errno = ctypes.get_errno()
+            raise OSError(errno, f"inotify_init1: {os.strerror(errno)}")
+        
+        self.scan = scan
+        self.root = str(root)
+        self.is_candidate = is_candidate
+        self.recursive = recursive
+        self.excluded = os.path.realpath(exclude_dir) if exclude_dir is not None else None
+        self._watches = {}
+        self._add_tree(self.root)
+    
+    def _add_watch(self, directory: str) -> bool:
+        """Pose un watch sur un répertoire"""
+        wd = self._libc.inotify_add_watch(self.fd, os.fsencode(directory), self.WATCH_MASK)
+        if wd < 0:
+            errno = ctypes.get_errno()
+            logger.warning(f"⚠️ Surveillance impossible de {directory}: {os.strerror(errno)}")
+            return False
+        self._watches[wd] = directory
+        return True
+    
+    def _add_tree(self, directory: str):
+        """Pose un watch sur un répertoire et ses sous-répertoires"""
+        stack = [directory]
+        while stack:
+            current = stack.pop()
+            if not self._add_watch(current) or not self.recursive:
+                continue
+            try:
+                with os.scandir(current) as entries:
+                    for entry in entries:
+                        if (entry.is_dir(follow_symlinks=False)
+                                and os.path.realpath(entry.path) != self.excluded):
+                            stack.append(entry.path)
+            except OSError:
+                continue
+    
+    def poll(self, timeout: float) -> Set[str]:
+        """Attend au plus timeout secondes et retourne les images écrites ou déplacées"""
+        readable, _, _ = select.select([self.fd], [], [], timeout)
+        if not readable:
+            return set()
+        
+        changed = set()
+        while True:
+            try:
+                data = os.read(self.fd, 64 * 1024)
+            except BlockingIOError:
+                break
+            
+            offset = 0
+            while offset < len(data):
+                wd, mask, _, length = self.EVENT_HEADER.unpack_from(data, offset)
+                offset += self.EVENT_HEADER.size
+                name = os.fsdecode(data[offset:offset + length].rstrip(b'\0'))
+                offset += length
+                
+                if mask & self.IN_Q_OVERFLOW:
+                    # Des événements ont été perdus: un rattrapage complet s'impose
+                    logger.warning("⚠️ File inotify saturée, nouveau parcours de l'arborescence")
+                    changed.update(str(path) for path in self.scan(self.root))
+                    continue
+                if mask & (self.IN_IGNORED | self.IN_DELETE_SELF | self.IN_MOVE_SELF):
+                    self._watches.pop(wd, None)
+                    continue
+                
+                directory = self._watches.get(wd)
+                if directory is None or not name:
+                    continue
+                path = os.path.join(directory, name)
+                
+                if mask & self.IN_ISDIR:
+                    if (self.recursive and mask & (self.IN_CREATE | self.IN_MOVED_TO)
+                            and os.path.realpath(path) != self.excluded):
+                        # Les fichiers copiés avant la pose du watch sont signalés tout de suite
+                        self._add_tree(path)
+                        changed.update(str(found) for found in self.scan(path))
+                elif mask & (self.IN_CLOSE_WRITE | self.IN_MOVED_TO) and self.is_candidate(path):
+                    changed.add(path)
+        return changed
+    
+    def close(self):
+        """Ferme le descripteur inotify"""
+        if self.fd >= 0:
+            os.close(self.fd)
+            self.fd = -1
+
 class ImageOptimizer:
     """Optimiseur d'images avancé pour Mayu & Jack Studio"""
     
@@ -63,39 +1503,184 @@ class ImageOptimizer:
         }
     }
     
+    # Moteurs d'exécution disponibles pour optimize_directory
+    EXECUTORS = ('auto', 'thread', 'process')
+    
+    # Clés de configuration qui influencent les fichiers produits (empreinte du cache)
+    CACHE_KEY_FIELDS = (
+        'quality', 'generate_webp', 'generate_responsive', 'progressive_jpeg',
+        'strip_metadata', 'max_width', 'max_height', 'fast_decode',
+        'responsive_pyramid', 'pyramid_min_ratio', 'dedupe_outputs', 'archive_format',
+        'lazy_responsive', 'preserve_alpha',
+        'adaptive_quality', 'target_ssim', 'byte_budget', 'adaptive_proxy_size', 'adaptive_quality_range'
+    )
+    
+    # Tag EXIF d'orientation et valeurs impliquant une rotation de 90°
+    EXIF_ORIENTATION_TAG = 0x0112
+    ROTATED_ORIENTATIONS = {5, 6, 7, 8}
+    
     def __init__(self, config: Dict = None):
         """Initialise l'optimiseur avec la configuration"""
-        self.config = config or self._default_config()
-        self.stats = {
-            'processed': 0,
-            'skipped': 0,
-            'errors': 0,
-            'total_size_before': 0,
-            'total_size_after': 0,
-            'processing_time': 0
-        }
+        # Les clés absentes de la config utilisateur reprennent les valeurs par défaut
+        self.config = {**self._default_config(), **(config or {})}
+        self.metrics = PipelineMetrics(self.config['profile'], self.config['profile_top_n'])
+        self._profilers = []
+        self._profilers_lock = threading.Lock()
+        self._profiler_local = threading.local()
+        self._manifests = {}
+        self._manifests_lock = threading.Lock()
+        self._config_hash = self._compute_config_hash()
+        self._encoder_settings_cache = {}
+        self._writers = {}
+        # Étapes d'écriture en mémoire, par répertoire de sortie virtuel (mode service)
+        self._memory_writers = {}
+        # Variantes paresseuses: cache LRU et verrous de génération (répartis par clé)
+        self._variant_cache = None
+        self._render_locks = [threading.Lock() for _ in range(64)]
+        self._writer_lock = threading.Lock()
+        # Dans un lot, les écritures sont vidées en fin de lot plutôt qu'à chaque image
+        self._in_batch = False
+        # Journal de progression du lot en cours et répertoire d'entrée associé
+        self._journal = None
+        self._journal_input_dir = None
+        # Pré-passe de doublons perceptuels du lot en cours
+        self._perceptual_state = None
         
     def _default_config(self) -> Dict:
         """Configuration par défaut de l'optimiseur"""
         return {
             'output_dir': 'optimized',
             'quality': 'medium',
+            'adaptive_quality': None,
+            'target_ssim': 0.97,
+            'byte_budget': 200 * 1024,
+            'adaptive_proxy_size': 512,
+            'adaptive_quality_range': (40, 95),
             'generate_webp': True,
             'generate_responsive': True,
+            'responsive_pyramid': False,
+            'pyramid_min_ratio': 2.0,
             'progressive_jpeg': True,
+            'fsync': False,
+            'async_writes': True,
+            'max_pending_writes': 16,
+            'writer_threads': 4,
+            'archive_format': None,
+            'archive_shard_size': 256 * 1024 * 1024,
             'strip_metadata': True,
             'max_width': 1920,
             'max_height': 1920,
+            'fast_decode': True,
             'threading': True,
             'max_workers': 4,
+            'executor': 'thread',
+            'max_in_flight': None,
+            'perceptual_dedupe': None,
+            'perceptual_distance': 4,
+            'journal': True,
+            'checkpoint_every': 100,
+            'resume': False,
+            'shard': None,
+            'memory_budget_mb': None,
+            'watch_backend': 'auto',
+            'watch_debounce': 1.0,
+            'watch_max_delay': 10.0,
+            'watch_initial_scan': True,
+            'poll_interval': 2.0,
+            'service_max_queue': None,
+            'service_max_body_mb': 50,
+            'service_source_root': None,
+            'lazy_responsive': False,
+            'preserve_alpha': True,
+            'variant_cache_mb': 64,
+            'variant_cache_dir': None,
+            'variant_cache_disk_mb': 512,
+            'memory_copies': 3.0,
+            'serialize_fraction': 0.5,
+            'results_jsonl': None,
+            'profile': False,
+            'profile_top_n': 10,
+            'profile_dump': None,
             'overwrite': False,
+            'incremental': True,
+            'dedupe_outputs': 'hardlink',
             'backup_originals': True
         }
     
-    def optimize_single_image(self, input_path: Path, output_dir: Path = None) -> Dict:
-        """Optimise une image unique"""
+    @property
+    def stats(self) -> Dict:
+        """Compteurs du lot en cours (processed, errors, tailles...) tous workers confondus"""
+        return self.metrics.totals().counters
+    
+    def _compute_config_hash(self) -> str:
+        """Empreinte de la configuration effective (qualité, tailles, formats)"""
+        effective = {key: self.config.get(key) for key in self.CACHE_KEY_FIELDS}
+        effective['responsive_sizes'] = self.RESPONSIVE_SIZES
+        effective['quality_settings'] = self.QUALITY_SETTINGS
+        payload = json.dumps(effective, sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+    
+    def _get_manifest(self, output_dir: Path) -> OptimizationManifest:
+        """Retourne le manifeste associé à un répertoire de sortie"""
+        key = str(output_dir.resolve())
+        with self._manifests_lock:
+            manifest = self._manifests.get(key)
+            if manifest is None:
+                manifest = OptimizationManifest(output_dir)
+                self._manifests[key] = manifest
+            return manifest
+    
+    def _check_cache(self, input_path: Path, output_dir: Path) -> Tuple[Optional[Dict], Optional[Dict]]:
+        """Vérifie si l'image est inchangée et ses sorties toujours présentes
+        
+        Retourne (résultat si l'image peut être ignorée, contexte pour l'enregistrement).
+        """
+        if not self.config['incremental']:
+            return None, None
+        
+        try:
+            manifest = self._get_manifest(output_dir)
+            stat = input_path.stat()
+            content_hash = manifest.content_hash(input_path, stat)
+            cache_context = {
+                'manifest': manifest,
+                'stat': stat,
+                'content_hash': content_hash
+            }
+            
+            if self.config['overwrite']:
+                return None, cache_context
+            
+            outputs = manifest.lookup(input_path, content_hash, self._config_hash)
+            # En mode archive, une sortie existe tant que son archive existe
+            if outputs is None or not all(Path(o.get('archive', o['path'])).exists() for o in outputs):
+                return None, cache_context
+            
+            size_after = sum(o.get('size_after', 0) for o in outputs)
+            result = self._create_result(input_path, 'skipped', 'Inchangée (cache)')
+            result.update({
+                'cached': True,
+                'results': outputs,
+                'size_before': stat.st_size,
+                'size_after': size_after
+            })
+            return result, cache_context
+            
+        except (sqlite3.Error, OSError) as e:
+            # Le cache est une optimisation: en cas de problème on ré-encode
+            logger.warning(f"⚠️ Manifeste indisponible pour {input_path}: {e}")
+            return None, None
+    
+    def optimize_single_image(self, input_path: Path, output_dir: Path = None,
+                              data: Optional[bytes] = None) -> Dict:
+        """Optimise une image unique
+        
+        Avec data, l'image est lue depuis ce tampon (input_path ne sert qu'au nom
+        et au format) et le manifeste incrémental n'est pas consulté.
+        """
+        metrics = self.metrics.local()
         try:
-            start_time = time.time()
+            start_time = time.perf_counter()
             
             # Vérification du format
             if input_path.suffix.lower() not in self.SUPPORTED_FORMATS:
@@ -104,58 +1689,83 @@ class ImageOptimizer:
             # Définir le répertoire de sortie
             if output_dir is None:
                 output_dir = input_path.parent / self.config['output_dir']
-            output_dir.mkdir(parents=True, exist_ok=True)
+            cached_result, cache_context = None, None
+            if data is None:
+                output_dir.mkdir(parents=True, exist_ok=True)
+                
+                # Ignorer les images inchangées dont les sorties existent déjà
+                cached_result, cache_context = self._check_cache(input_path, output_dir)
+            if cached_result is not None:
+                metrics.increment('skipped')
+                logger.debug(f"⏭️ {input_path.name} inchangée, ignorée")
+                return cached_result
+            
+            # Durées d'étapes avant cette image (détail par fichier en mode profilage)
+            stages_before = dict(metrics.stage_time) if metrics.profile else None
             
             # Charger l'image
-            with Image.open(input_path) as img:
-                original_size = input_path.stat().st_size
-                self.stats['total_size_before'] += original_size
-                
-                # Correction de l'orientation EXIF
-                img = ImageOps.exif_transpose(img)
+            with Image.open(input_path if data is None else io.BytesIO(data)) as img:
+                original_size = input_path.stat().st_size if data is None else len(data)
                 
-                # Conversion en RGB si nécessaire (pour WebP/JPEG)
-                if img.mode in ('RGBA', 'LA', 'P'):
-                    if self.config['generate_webp'] or input_path.suffix.lower() in ['.jpg', '.jpeg']:
-                        background = Image.new('RGB', img.size, (255, 255, 255))
-                        if img.mode == 'P':
-                            img = img.convert('RGBA')
-                        background.paste(img, mask=img.split()[-1] if img.mode == 'RGBA' else None)
-                        img = background
+                img = self._prepare_image(img, input_path, metrics)
                 
-                # Redimensionnement si nécessaire
-                img = self._resize_image(img)
+                # Qualité adaptée au contenu (recherche sur une miniature)
+                qualities = {}
+                if self.config['adaptive_quality']:
+                    with metrics.stage('quality_search'):
+                        qualities = self._search_adaptive_qualities(img, input_path)
                 
                 # Générer les différentes versions
                 results = []
+                context = self._new_variant_context(output_dir, qualities)
                 
                 # Version WebP
                 if self.config['generate_webp']:
-                    webp_result = self._save_webp(img, input_path, output_dir)
+                    webp_result = self._save_webp(img, input_path, output_dir, context)
                     results.append(webp_result)
                 
                 # Version optimisée du format original
-                original_result = self._save_original_format(img, input_path, output_dir)
+                original_result = self._save_original_format(img, input_path, output_dir, context)
                 results.append(original_result)
                 
-                # Versions responsives
-                if self.config['generate_responsive']:
-                    responsive_results = self._generate_responsive_versions(img, input_path, output_dir)
+                # Versions responsives (rendues à la demande en mode paresseux)
+                if self.config['generate_responsive'] and not self.config['lazy_responsive']:
+                    responsive_results = self._generate_responsive_versions(img, input_path, output_dir, context)
                     results.extend(responsive_results)
                 
+                # Hors lot, l'image n'est terminée qu'une fois ses fichiers écrits
+                if not self._in_batch:
+                    self._get_writer(output_dir).wait(context['writes'])
+                
                 # Calculer les statistiques
                 total_size_after = sum(r.get('size_after', 0) for r in results)
-                self.stats['total_size_after'] += total_size_after
+                processing_time = time.perf_counter() - start_time
+                
+                metrics.increment('total_size_before', original_size)
+                metrics.increment('total_size_after', total_size_after)
+                metrics.increment('processing_time', processing_time)
+                metrics.increment('processed')
                 
-                processing_time = time.time() - start_time
-                self.stats['processing_time'] += processing_time
-                self.stats['processed'] += 1
+                if stages_before is not None:
+                    file_stages = {
+                        stage: elapsed - stages_before.get(stage, 0.0)
+                        for stage, elapsed in metrics.stage_time.items()
+                        if elapsed != stages_before.get(stage, 0.0)
+                    }
+                    metrics.record_file(str(input_path), processing_time, file_stages)
                 
                 compression_ratio = (1 - total_size_after / original_size) * 100 if original_size > 0 else 0
                 
+                # Mémoriser les sorties pour les prochains runs, une fois écrites
+                if cache_context is not None:
+                    self._get_writer(output_dir).when_done(
+                        context['writes'],
+                        lambda: self._record_manifest(input_path, cache_context, results)
+                    )
+                
                 logger.info(f"✅ {input_path.name} optimisé - Compression: {compression_ratio:.1f}% - Temps: {processing_time:.2f}s")
                 
-                return {
+                result = {
                     'status': 'success',
                     'file': str(input_path),
                     'results': results,
@@ -164,12 +1774,184 @@ class ImageOptimizer:
                     'size_before': original_size,
                     'size_after': total_size_after
                 }
+                if qualities:
+                    result['adaptive_quality'] = qualities
+                return result
                 
         except Exception as e:
-            self.stats['errors'] += 1
+            metrics.increment('errors')
             logger.error(f"❌ Erreur lors de l'optimisation de {input_path}: {str(e)}")
             return self._create_result(input_path, 'error', str(e))
     
+    def optimize_image_bytes(self, data: bytes, filename: str) -> Tuple[Dict, Dict[str, bytes]]:
+        """Optimise une image reçue en mémoire et retourne (résultat, variantes encodées)
+        
+        Rien n'est écrit sur disque: les variantes sont indexées par leur chemin
+        relatif (ex. photo.webp, responsive/photo_mobile.webp).
+        """
+        output_dir = Path(f"memory-{uuid.uuid4().hex}")
+        writer = MemoryWriter(self.metrics, output_dir)
+        with self._writer_lock:
+            self._memory_writers[output_dir] = writer
+        try:
+            result = self.optimize_single_image(output_dir / Path(filename).name, output_dir, data=data)
+        finally:
+            with self._writer_lock:
+                del self._memory_writers[output_dir]
+        
+        # Chemins de sortie exprimés relativement au répertoire virtuel
+        for variant in result.get('results', []):
+            for key in ('path', 'alias', 'duplicate_of'):
+                if key in variant:
+                    variant[key] = Path(variant[key]).relative_to(output_dir).as_posix()
+        result['file'] = Path(filename).name
+        return result, writer.files
+    
+    def _prepare_image(self, img: Image.Image, input_path: Path, metrics: WorkerMetrics,
+                       decode_target: Optional[Tuple[int, int]] = None) -> Image.Image:
+        """Décode, oriente, aplatit la transparence et limite la taille d'une image"""
+        with metrics.stage('decode'):
+            # Décodage à l'échelle utile (draft JPEG), réduction entière des autres formats
+            if self.config['fast_decode']:
+                img = self._fast_decode(img, decode_target)
+            img.load()
+        
+        # Correction de l'orientation EXIF
+        with metrics.stage('transpose'):
+            img = ImageOps.exif_transpose(img)
+        
+        # Transparence conservée pour WebP/PNG (aplatie à l'encodage JPEG), ou aplatie ici.
+        # Sans WebP, une palette opaque reste en mode P: sa sortie PNG reste une PNG palette
+        if img.mode in ALPHA_MODES:
+            if img.mode == 'P' and 'transparency' not in img.info and not self.config['generate_webp']:
+                pass
+            elif self.config['preserve_alpha']:
+                with metrics.stage('mode_convert'):
+                    img = normalize_alpha_mode(img)
+            elif self.config['generate_webp'] or input_path.suffix.lower() in ['.jpg', '.jpeg']:
+                with metrics.stage('alpha_flatten'):
+                    img = flatten_alpha(img)
+        
+        # Redimensionnement si nécessaire
+        with metrics.stage('resize'):
+            img = self._resize_image(img)
+        
+        return img
+    
+    def _get_variant_cache(self) -> 'VariantCache':
+        """Cache des variantes rendues à la demande (créé au premier usage)"""
+        with self._writer_lock:
+            if self._variant_cache is None:
+                cache_dir = self.config['variant_cache_dir']
+                self._variant_cache = VariantCache(
+                    int(self.config['variant_cache_mb'] * 1024 * 1024),
+                    Path(cache_dir) if cache_dir else None,
+                    int(self.config['variant_cache_disk_mb'] * 1024 * 1024)
+                )
+            return self._variant_cache
+    
+    def get_variant(self, source: Path, size_name: str, format_key: str = 'webp') -> bytes:
+        """Retourne une variante responsive, rendue à la première demande puis mise en cache
+        
+        La clé de cache couvre le chemin, la taille, la date de modification de la
+        source et la configuration: une source modifiée est rendue à nouveau.
+        Une image déjà plus petite que la taille demandée n'est pas agrandie.
+        """
+        if size_name not in self.RESPONSIVE_SIZES:
+            raise ValueError(f"Taille responsive inconnue: {size_name}")
+        if format_key not in ('webp', 'jpg', 'png'):
+            raise ValueError(f"Format de variante inconnu: {format_key}")
+        
+        stat = source.stat()
+        key = hashlib.sha256(
+            f"{os.path.realpath(source)}|{stat.st_size}|{stat.st_mtime_ns}|"
+            f"{size_name}|{format_key}|{self._config_hash}".encode('utf-8')
+        ).hexdigest()
+        cache = self._get_variant_cache()
+        
+        # Une seule génération par variante même si plusieurs requêtes arrivent ensemble
+        with self._render_locks[int(key[:8], 16) % len(self._render_locks)]:
+            data = cache.get(key)
+            if data is not None:
+                return data
+            
+            metrics = self.metrics.local()
+            max_w, max_h = self.RESPONSIVE_SIZES[size_name]
+            with Image.open(source) as img:
+                img = self._prepare_image(img, source, metrics, decode_target=(max_w, max_h))
+                if format_key == 'jpg':
+                    img = flatten_alpha(img)
+                new_size = self._responsive_size(img, max_w, max_h)
+                if new_size is not None:
+                    with metrics.stage('resize'):
+                        img = img.resize(new_size, Image.Resampling.LANCZOS)
+                
+                pil_format, options = self._encoder_settings(format_key)
+                buffer = io.BytesIO()
+                with metrics.stage(f"encode_{format_key}"):
+                    img.save(buffer, pil_format, **options)
+            
+            data = buffer.getvalue()
+            cache.put(key, data)
+            return data
+    
+    def _record_manifest(self, input_path: Path, cache_context: Dict, results: List[Dict]):
+        """Enregistre les sorties d'une image dans le manifeste"""
+        try:
+            cache_context['manifest'].record(
+                input_path, cache_context['stat'], cache_context['content_hash'],
+                self._config_hash, results
+            )
+        except sqlite3.Error as e:
+            logger.warning(f"⚠️ Impossible d'enregistrer {input_path} dans le manifeste: {e}")
+    
+    def _decode_target_size(self) -> Tuple[int, int]:
+        """Boîte cible du décodage: la taille max
+        
+        Les versions responsives sont dérivées de l'image déjà limitée à
+        max_width/max_height, elles n'exigent jamais une boîte plus grande.
+        """
+        return self.config['max_width'], self.config['max_height']
+    
+    def _fast_decode(self, img: Image.Image, target: Optional[Tuple[int, int]] = None) -> Image.Image:
+        """Décode l'image à l'échelle réduite la plus petite couvrant la taille cible
+        
+        Utilise draft() pour les JPEG (réduction DCT 1/2, 1/4, 1/8 au décodage).
+        Les autres formats n'offrent pas de décodage réduit: ils sont décodés en
+        pleine résolution puis réduits d'un facteur entier par reduce(), ce qui
+        n'économise que le coût du LANCZOS final. L'image obtenue reste toujours
+        au moins aussi grande que la cible, le LANCZOS final fixe la taille exacte.
+        """
+        target_w, target_h = target or self._decode_target_size()
+        
+        # La boîte cible s'applique après correction EXIF: inverser si rotation de 90°
+        orientation = img.getexif().get(self.EXIF_ORIENTATION_TAG, 1)
+        if orientation in self.ROTATED_ORIENTATIONS:
+            target_w, target_h = target_h, target_w
+        
+        scale = min(target_w / img.width, target_h / img.height)
+        if scale >= 1:
+            return img
+        
+        requested = (math.ceil(img.width * scale), math.ceil(img.height * scale))
+        
+        if img.format == 'JPEG':
+            img.draft(img.mode, requested)
+            logger.debug(f"Décodage JPEG réduit à {img.size[0]}x{img.size[1]}")
+            return img
+        
+        # Pas de draft(): reduce() s'applique après un décodage en pleine résolution.
+        # Il ne gère pas les images palette ou 1 bit: elles restent en pleine taille
+        if img.mode in ('P', '1'):
+            return img
+        
+        factor = min(img.width // requested[0], img.height // requested[1])
+        if factor >= 2:
+            img = img.reduce(factor)
+            logger.debug(f"Image réduite d'un facteur {factor} avant redimensionnement")
+        
+        return img
+    
     def _resize_image(self, img: Image.Image) -> Image.Image:
         """Redimensionne l'image selon les contraintes de taille"""
         max_width = self.config['max_width']
@@ -186,193 +1968,906 @@ class ImageOptimizer:
         
         return img
     
-    def _save_webp(self, img: Image.Image, original_path: Path, output_dir: Path) -> Dict:
-        """Sauvegarde l'image au format WebP"""
-        webp_path = output_dir / f"{original_path.stem}.webp"
+    def _get_writer(self, output_dir: Optional[Path] = None) -> OutputWriter:
+        """Retourne l'étape d'écriture (une par répertoire de sortie en mode archive)"""
+        archive_format = self.config['archive_format']
+        key = str(output_dir.resolve()) if archive_format and output_dir is not None else None
+        
+        with self._writer_lock:
+            if output_dir in self._memory_writers:
+                return self._memory_writers[output_dir]
+            writer = self._writers.get(key)
+            if writer is None:
+                if key is not None:
+                    writer = ShardWriter(self.metrics, output_dir, archive_format,
+                                         self.config['archive_shard_size'], self.config['fsync'])
+                else:
+                    max_pending = self.config['max_pending_writes'] if self.config['async_writes'] else 0
+                    writer = OutputWriter(self.metrics, max_pending,
+                                          self.config['writer_threads'], self.config['fsync'])
+                self._writers[key] = writer
+            return writer
+    
+    def _flush_writers(self) -> List[BaseException]:
+        """Vide toutes les étapes d'écriture et retourne leurs erreurs"""
+        with self._writer_lock:
+            writers = list(self._writers.values())
+        errors = []
+        for writer in writers:
+            errors.extend(writer.flush())
+        return errors
+    
+    def _sync_writers(self) -> List[BaseException]:
+        """Point de reprise: rend durables les écritures faites, sans fermer les archives"""
+        with self._writer_lock:
+            writers = list(self._writers.values())
+        errors = []
+        for writer in writers:
+            errors.extend(writer.sync())
+        return errors
+    
+    def close(self):
+        """Termine les écritures en cours et libère les étapes d'écriture"""
+        with self._writer_lock:
+            writers, self._writers = list(self._writers.values()), {}
+        for writer in writers:
+            writer.close()
+    
+    def _save_image(self, img: Image.Image, path: Path, format_name: Optional[str] = None,
+                    context: Optional[Dict] = None, **options) -> int:
+        """Encode une image en mémoire puis confie le tampon à l'étape d'écriture"""
+        metrics = self.metrics.local()
+        encoder = (format_name or path.suffix.lstrip('.')).lower()
         
-        quality = self.QUALITY_SETTINGS['webp'][self.config['quality']]
+        buffer = io.BytesIO()
+        with metrics.stage(f"encode_{encoder}"):
+            img.save(buffer, format_name or Image.registered_extensions()[path.suffix.lower()], **options)
         
-        # Options WebP avancées
-        save_options = {
-            'quality': quality,
-            'method': 4,  # Meilleure compression
-            'lossless': False,
-            'exact': False
-        }
+        future = self._get_writer(context['output_dir'] if context else None).submit(buffer.getvalue(), path)
+        if context is not None:
+            context['writes'].append(future)
+            context['futures'][str(path)] = future
         
-        img.save(webp_path, 'WebP', **save_options)
+        # La taille est connue sans stat() sur le fichier écrit
+        return buffer.tell()
+    
+    def _encoder_settings(self, format_key: str) -> Tuple[Optional[str], Dict]:
+        """Format Pillow et options d'encodage d'un format de sortie (calculés une fois)"""
+        settings = self._encoder_settings_cache.get(format_key)
+        if settings is not None:
+            return settings
         
-        return {
+        quality_level = self.config['quality']
+        if format_key == 'webp':
+            settings = ('WebP', {
+                'quality': self.QUALITY_SETTINGS['webp'][quality_level],
+                'method': 4,  # Meilleure compression
+                'lossless': False,
+                'exact': False
+            })
+        elif format_key == 'jpg':
+            settings = ('JPEG', {
+                'quality': self.QUALITY_SETTINGS['jpg'][quality_level],
+                'optimize': True,
+                'progressive': self.config['progressive_jpeg']
+            })
+        elif format_key == 'png':
+            settings = ('PNG', {
+                'optimize': True,
+                'compress_level': self.QUALITY_SETTINGS['png'][quality_level]
+            })
+        else:
+            # Format par défaut (déduit de l'extension)
+            settings = (None, {})
+        
+        self._encoder_settings_cache[format_key] = settings
+        return settings
+    
+    def _new_variant_context(self, output_dir: Path, qualities: Optional[Dict[str, int]] = None) -> Dict:
+        """Contexte d'encodage d'une image: variantes déjà encodées et qualités adaptées"""
+        return {'output_dir': output_dir, 'encoded': {}, 'qualities': qualities or {},
+                'writes': [], 'futures': {}}
+    
+    def _write_variant(self, img: Image.Image, path: Path, format_key: str,
+                       context: Dict, extra: Dict) -> Dict:
+        """Encode une variante, ou réutilise une variante identique déjà encodée
+        
+        Deux variantes de mêmes dimensions et même format (donc mêmes options)
+        ne sont encodées qu'une fois: la seconde devient un lien physique vers
+        la première, ou un simple alias dans le manifeste.
+        """
+        key = (img.size, format_key)
+        encoded = context['encoded']
+        primary = encoded.get(key)
+        
+        if primary is None or not self.config['dedupe_outputs']:
+            if format_key == 'jpg' and img.mode in ALPHA_MODES:
+                # JPEG n'a pas de canal alpha: aplatissement au moment de l'encodage
+                with self.metrics.local().stage('alpha_flatten'):
+                    img = flatten_alpha(img)
+            pil_format, options = self._encoder_settings(format_key)
+            if format_key in context['qualities']:
+                options = {**options, 'quality': context['qualities'][format_key]}
+            size_after = self._save_image(img, path, pil_format, context, **options)
+            result = {'path': str(path), 'size_after': size_after, **extra}
+            if self.config['archive_format']:
+                result['archive'] = context['futures'][str(path)].result()
+            encoded.setdefault(key, result)
+            return result
+        
+        if self.config['dedupe_outputs'] == 'alias':
+            # Aucun fichier écrit: la sortie pointe vers la variante existante
+            return {'path': primary['path'], 'alias': str(path), 'duplicate_of': primary['path'],
+                    'size_after': 0, **extra}
+        
+        # Le lien est créé par l'étape d'écriture une fois la variante primaire écrite
+        writer = self._get_writer(context['output_dir'])
+        link = writer.submit_link(context['futures'][primary['path']], Path(primary['path']), path)
+        context['writes'].append(link)
+        result = {'path': str(path), 'duplicate_of': primary['path'], 'size_after': 0, **extra}
+        if self.config['archive_format']:
+            result['archive'] = link.result()
+        return result
+    
+    def _save_webp(self, img: Image.Image, original_path: Path, output_dir: Path,
+                   context: Optional[Dict] = None) -> Dict:
+        """Sauvegarde l'image au format WebP"""
+        webp_path = output_dir / f"{original_path.stem}.webp"
+        context = context or self._new_variant_context(output_dir)
+        _, options = self._encoder_settings('webp')
+        
+        return self._write_variant(img, webp_path, 'webp', context, {
             'format': 'webp',
-            'path': str(webp_path),
-            'size_after': webp_path.stat().st_size,
-            'quality': quality
-        }
+            'quality': context['qualities'].get('webp', options['quality'])
+        })
     
-    def _save_original_format(self, img: Image.Image, original_path: Path, output_dir: Path) -> Dict:
+    def _save_original_format(self, img: Image.Image, original_path: Path, output_dir: Path,
+                              context: Optional[Dict] = None) -> Dict:
         """Sauvegarde l'image dans son format original optimisé"""
         format_name = original_path.suffix.lower()
         optimized_path = output_dir / f"{original_path.stem}_optimized{format_name}"
+        format_key = 'jpg' if format_name == '.jpeg' else format_name.lstrip('.')
         
-        if format_name in ['.jpg', '.jpeg']:
-            quality = self.QUALITY_SETTINGS['jpg'][self.config['quality']]
-            save_options = {
-                'quality': quality,
-                'optimize': True,
-                'progressive': self.config['progressive_jpeg']
-            }
-            img.save(optimized_path, 'JPEG', **save_options)
+        context = context or self._new_variant_context(output_dir)
+        
+        return self._write_variant(img, optimized_path, format_key, context, {
+            'format': format_name.replace('.', ''),
+            'quality': context['qualities'].get(format_key, self.config['quality'])
+        })
+    
+    def _search_adaptive_qualities(self, img: Image.Image, input_path: Path) -> Dict[str, int]:
+        """Cherche par dichotomie la qualité WebP/JPEG adaptée à l'image
+        
+        Mode 'ssim': plus petite qualité dont le SSIM reste >= target_ssim.
+        Mode 'bytes': plus grande qualité dont la taille estimée tient dans byte_budget.
+        Les essais sont faits sur une miniature (adaptive_proxy_size), dans un même
+        tampon mémoire réutilisé, et la taille pleine résolution est extrapolée
+        au prorata de la surface.
+        """
+        formats = []
+        if self.config['generate_webp']:
+            formats.append('webp')
+        if input_path.suffix.lower() in ['.jpg', '.jpeg']:
+            formats.append('jpg')
+        if not formats:
+            return {}
+        
+        proxy = img.copy()
+        proxy_size = self.config['adaptive_proxy_size']
+        proxy.thumbnail((proxy_size, proxy_size), Image.Resampling.BILINEAR)
+        proxy = flatten_alpha(proxy)
+        if proxy.mode not in ('RGB', 'L'):
+            proxy = proxy.convert('RGB')
+        area_ratio = (img.width * img.height) / (proxy.width * proxy.height)
+        
+        buffer = io.BytesIO()
+        mode = self.config['adaptive_quality']
+        min_quality, max_quality = self.config['adaptive_quality_range']
+        qualities = {}
+        
+        for format_key in formats:
+            pil_format, options = self._encoder_settings(format_key)
+            trials = {}
             
-        elif format_name == '.png':
-            compress_level = self.QUALITY_SETTINGS['png'][self.config['quality']]
-            save_options = {
-                'optimize': True,
-                'compress_level': compress_level
-            }
-            img.save(optimized_path, 'PNG', **save_options)
+            def trial(quality: int) -> Tuple[float, int]:
+                """Encode la miniature et retourne (SSIM, taille extrapolée)"""
+                if quality not in trials:
+                    buffer.seek(0)
+                    buffer.truncate()
+                    proxy.save(buffer, pil_format, **{**options, 'quality': quality})
+                    estimated_size = int(buffer.tell() * area_ratio)
+                    score = None
+                    if mode == 'ssim':
+                        buffer.seek(0)
+                        with Image.open(buffer) as decoded:
+                            score = compute_ssim(proxy, decoded)
+                    trials[quality] = (score, estimated_size)
+                return trials[quality]
             
-        else:
-            # Format par défaut
-            img.save(optimized_path)
+            low, high = min_quality, max_quality
+            if mode == 'ssim':
+                target = self.config['target_ssim']
+                while low < high:
+                    middle = (low + high) // 2
+                    if trial(middle)[0] >= target:
+                        high = middle
+                    else:
+                        low = middle + 1
+            else:
+                budget = self.config['byte_budget']
+                while low < high:
+                    middle = (low + high + 1) // 2
+                    if trial(middle)[1] <= budget:
+                        low = middle
+                    else:
+                        high = middle - 1
+            
+            qualities[format_key] = low
+            logger.debug(f"🎯 {input_path.name}: qualité {format_key} adaptée à {low} ({len(trials)} essais)")
         
-        return {
-            'format': format_name.replace('.', ''),
-            'path': str(optimized_path),
-            'size_after': optimized_path.stat().st_size,
-            'quality': self.config['quality']
-        }
+        return qualities
     
-    def _generate_responsive_versions(self, img: Image.Image, original_path: Path, output_dir: Path) -> List[Dict]:
-        """Génère les versions responsives de l'image"""
-        results = []
+    def _responsive_size(self, img: Image.Image, max_w: int, max_h: int) -> Optional[Tuple[int, int]]:
+        """Dimensions dans la boîte max_w × max_h (ratio préservé), None si déjà plus petite"""
+        if img.width <= max_w and img.height <= max_h:
+            return None
+        ratio = min(max_w / img.width, max_h / img.height)
+        return (max(1, int(img.width * ratio)), max(1, int(img.height * ratio)))
+    
+    def _compute_responsive_images(self, img: Image.Image,
+                                   pyramid: Optional[bool] = None) -> Iterator[Tuple[str, Tuple[int, int], Image.Image]]:
+        """Calcule les images redimensionnées pour chaque taille responsive
+        
+        En mode pyramide, chaque taille est dérivée de la plus petite version déjà
+        calculée qui reste au moins pyramid_min_ratio fois plus grande que la cible
+        (garde-fou qualité); sinon elle est calculée depuis l'image pleine taille.
+        """
+        if pyramid is None:
+            pyramid = self.config['responsive_pyramid']
+        min_ratio = self.config['pyramid_min_ratio']
         
-        for size_name, (max_w, max_h) in self.RESPONSIVE_SIZES.items():
+        # Du plus grand au plus petit pour que chaque niveau puisse servir de source
+        sizes = sorted(self.RESPONSIVE_SIZES.items(), key=lambda item: item[1][0] * item[1][1], reverse=True)
+        levels = []
+        
+        for size_name, (max_w, max_h) in sizes:
             # Skip si l'image est déjà plus petite
-            if img.width <= max_w and img.height <= max_h:
+            new_size = self._responsive_size(img, max_w, max_h)
+            if new_size is None:
                 continue
             
-            # Calculer la nouvelle taille en préservant le ratio
-            ratio = min(max_w / img.width, max_h / img.height)
-            new_size = (int(img.width * ratio), int(img.height * ratio))
+            source = img
+            if pyramid:
+                for level in reversed(levels):
+                    if min(level.width / new_size[0], level.height / new_size[1]) >= min_ratio:
+                        source = level
+                        break
             
             # Redimensionner
-            resized_img = img.resize(new_size, Image.Resampling.LANCZOS)
+            with self.metrics.local().stage('resize'):
+                resized_img = source.resize(new_size, Image.Resampling.LANCZOS)
+            levels.append(resized_img)
             
+            yield size_name, new_size, resized_img
+    
+    def _generate_responsive_versions(self, img: Image.Image, original_path: Path, output_dir: Path,
+                                      context: Optional[Dict] = None) -> List[Dict]:
+        """Génère les versions responsives de l'image"""
+        results = []
+        context = context or self._new_variant_context(output_dir)
+        
+        for size_name, new_size, resized_img in self._compute_responsive_images(img):
             # Sauvegarder en WebP et format original
             responsive_dir = output_dir / 'responsive' / size_name
-            responsive_dir.mkdir(parents=True, exist_ok=True)
+            if not self.config['archive_format'] and output_dir not in self._memory_writers:
+                responsive_dir.mkdir(parents=True, exist_ok=True)
             
             # Version WebP
             if self.config['generate_webp']:
                 webp_path = responsive_dir / f"{original_path.stem}_{size_name}.webp"
-                quality = self.QUALITY_SETTINGS['webp'][self.config['quality']]
-                resized_img.save(webp_path, 'WebP', quality=quality, method=4)
-                
-                results.append({
+                results.append(self._write_variant(resized_img, webp_path, 'webp', context, {
                     'format': 'webp',
                     'size': size_name,
-                    'path': str(webp_path),
-                    'dimensions': new_size,
-                    'size_after': webp_path.stat().st_size
-                })
+                    'dimensions': new_size
+                }))
             
             # Version format original
             original_format = original_path.suffix.lower()
             if original_format in ['.jpg', '.jpeg']:
                 responsive_path = responsive_dir / f"{original_path.stem}_{size_name}.jpg"
-                quality = self.QUALITY_SETTINGS['jpg'][self.config['quality']]
-                resized_img.save(responsive_path, 'JPEG', quality=quality, optimize=True)
-                
-                results.append({
+                results.append(self._write_variant(resized_img, responsive_path, 'jpg', context, {
                     'format': 'jpg',
                     'size': size_name,
-                    'path': str(responsive_path),
-                    'dimensions': new_size,
-                    'size_after': responsive_path.stat().st_size
-                })
+                    'dimensions': new_size
+                }))
         
         return results
     
     def optimize_directory(self, input_dir: Path, output_dir: Path = None, recursive: bool = True) -> Dict:
         """Optimise toutes les images d'un répertoire"""
         logger.info(f"🎨 Optimisation du répertoire: {input_dir}")
+        self.metrics.reset()
+        self.metrics.start_wall()
         
         if output_dir is None:
             output_dir = input_dir / self.config['output_dir']
         
-        # Rechercher toutes les images
-        image_files = []
-        pattern = "**/*" if recursive else "*"
+        # Parcours en flux: le traitement démarre dès la première image trouvée
+        image_files = self._iter_image_files(input_dir, recursive, exclude_dir=output_dir)
         
-        for ext in self.SUPPORTED_FORMATS:
-            image_files.extend(input_dir.glob(f"{pattern}{ext}"))
-            image_files.extend(input_dir.glob(f"{pattern}{ext.upper()}"))
-        
-        logger.info(f"📊 {len(image_files)} images trouvées")
+        journal = None
+        if self.config['journal']:
+            output_dir.mkdir(parents=True, exist_ok=True)
+            journal = self._open_journal(input_dir, output_dir, recursive)
+        if journal is not None or self.config['shard']:
+            image_files = self._select_files(image_files, input_dir, journal.completed if journal else set())
+        if self.config['perceptual_dedupe']:
+            image_files = self._perceptual_filter(image_files, output_dir)
+        first_files = list(islice(image_files, 2))
         
-        if not image_files:
+        if not first_files and not (journal and journal.resumed):
+            if journal is not None:
+                journal.close()
+            logger.info("📊 0 images trouvées")
             return {'status': 'no_images', 'message': 'Aucune image trouvée'}
         
         # Traitement en parallèle si activé
-        if self.config['threading'] and len(image_files) > 1:
-            return self._process_parallel(image_files, output_dir)
-        else:
-            return self._process_sequential(image_files, output_dir)
-    
-    def _process_parallel(self, image_files: List[Path], output_dir: Path) -> Dict:
-        """Traitement en parallèle des images"""
-        results = []
+        self._in_batch = True
+        self._journal = journal
+        self._journal_input_dir = input_dir
+        try:
+            if self.config['threading'] and len(first_files) > 1:
+                results = self._process_parallel(chain(first_files, image_files), output_dir)
+            else:
+                results = self._process_sequential(chain(first_files, image_files), output_dir)
+                results['executor'] = 'sequential'
+        except BaseException:
+            # Arrêt en cours de lot: les résultats déjà écrits sont validés pour --resume
+            if journal is not None:
+                if not self._flush_writers():
+                    journal.checkpoint()
+                journal.close()
+            raise
+        finally:
+            self._in_batch = False
+            self._journal = None
+            self._perceptual_state = None
+            write_errors = self._flush_writers()
+        
+        # Lot terminé: toutes les sorties sont écrites
+        if journal is not None:
+            if write_errors:
+                journal.close()
+            else:
+                journal.complete(results['total_files'])
+            logger.info(f"📒 Journal: {journal.path} ({journal.resumed} images reprises)")
         
-        with ThreadPoolExecutor(max_workers=self.config['max_workers']) as executor:
-            # Soumettre toutes les tâches
-            future_to_file = {
-                executor.submit(self.optimize_single_image, img_file, output_dir): img_file
-                for img_file in image_files
+        results['write_errors'] = results.get('write_errors', 0) + len(write_errors)
+        for error in write_errors:
+            logger.error(f"❌ Erreur d'écriture: {error}")
+        
+        logger.info(f"📊 {results['total_files']} images trouvées")
+        
+        # Débit mesuré en temps réel (wall-clock), comparable entre moteurs
+        self.metrics.stop_wall()
+        metrics_report = self.metrics.report()
+        wall_time = metrics_report['wall_time']
+        results['wall_time'] = wall_time
+        results['images_per_second'] = results['total_files'] / wall_time if wall_time > 0 else 0
+        results['mb_per_second'] = metrics_report['mb_per_second']
+        results['stage_timings'] = metrics_report['stages']
+        if self.config['profile']:
+            results['profile'] = {
+                'histograms': metrics_report['histograms'],
+                'slowest_files': metrics_report['slowest_files']
             }
-            
-            # Collecter les résultats
-            for future in as_completed(future_to_file):
-                file_path = future_to_file[future]
-                try:
-                    result = future.result()
-                    results.append(result)
-                except Exception as exc:
-                    logger.error(f"❌ {file_path} a généré une exception: {exc}")
-                    results.append(self._create_result(file_path, 'error', str(exc)))
+        if self.config['profile_dump']:
+            self._dump_profile()
+        # Le temps de traitement affiché est le temps réel; le cumul par image reste disponible
+        results['cumulative_processing_time'] = results['processing_time']
+        results['processing_time'] = wall_time
+        logger.info(f"🚀 Débit: {results['images_per_second']:.2f} images/s, "
+                    f"{results['mb_per_second']:.2f} Mo/s ({results['executor']})")
         
-        return self._compile_results(results)
+        return results
     
-    def _process_sequential(self, image_files: List[Path], output_dir: Path) -> Dict:
-        """Traitement séquentiel des images"""
-        results = []
+    def _create_watcher(self, input_dir: Path, output_dir: Path, recursive: bool):
+        """Crée le détecteur de changements (inotify si disponible, sinon scrutation)"""
+        backend = self.config['watch_backend']
+        scan = lambda directory: self._iter_image_files(Path(directory), recursive, exclude_dir=output_dir)
+        
+        if backend in ('auto', 'inotify'):
+            try:
+                return InotifyWatcher(
+                    scan, input_dir,
+                    lambda path: os.path.splitext(path)[1].lower() in self.SUPPORTED_FORMATS,
+                    recursive, exclude_dir=output_dir
+                )
+            except OSError as e:
+                if backend == 'inotify':
+                    raise
+                logger.warning(f"⚠️ inotify indisponible ({e}), surveillance par scrutation")
+        
+        return PollingWatcher(scan, input_dir, self.config['poll_interval'])
+    
+    def watch_directory(self, input_dir: Path, output_dir: Path = None, recursive: bool = True,
+                        stop_event: Optional[threading.Event] = None) -> Dict:
+        """Surveille un répertoire et optimise les images ajoutées ou modifiées
+        
+        Le pool de workers reste actif entre les événements; les rafales sont
+        regroupées (debounce) et seuls les fichiers modifiés sont traités.
+        S'arrête sur Ctrl+C ou lorsque stop_event est positionné.
+        """
+        if output_dir is None:
+            output_dir = input_dir / self.config['output_dir']
+        output_dir.mkdir(parents=True, exist_ok=True)
+        
+        executor_name = self._resolve_executor() if self.config['threading'] else 'thread'
+        debounce = self.config['watch_debounce']
+        max_delay = self.config['watch_max_delay']
+        # Sans JSON Lines, seuls les agrégats de la session sont conservés
+        collector = self._create_collector()
+        if collector.jsonl_path is None:
+            collector.results = None
+        
+        self.metrics.reset()
+        self.metrics.start_wall()
+        self._in_batch = True
+        watcher = self._create_watcher(input_dir, output_dir, recursive)
+        logger.info(f"👀 Surveillance de {input_dir} ({type(watcher).__name__}, {executor_name})")
+        
+        try:
+            with self._create_executor(executor_name) as executor:
+                if self.config['watch_initial_scan']:
+                    # Rattrapage des fichiers arrivés pendant l'arrêt (le manifeste évite le ré-encodage)
+                    self._process_watch_batch(
+                        executor, executor_name,
+                        self._iter_image_files(input_dir, recursive, exclude_dir=output_dir),
+                        output_dir, collector
+                    )
+                
+                batch = set()
+                first_event = None
+                while stop_event is None or not stop_event.is_set():
+                    changed = watcher.poll(debounce if batch else 1.0)
+                    now = time.monotonic()
+                    if changed:
+                        batch.update(changed)
+                        first_event = first_event or now
+                    
+                    # Lot traité après debounce secondes de calme, ou au plus tard après max_delay
+                    if batch and (not changed or now - first_event >= max_delay):
+                        files = [Path(path) for path in sorted(batch) if os.path.isfile(path)]
+                        batch = set()
+                        first_event = None
+                        self._process_watch_batch(executor, executor_name, files, output_dir, collector)
+        except KeyboardInterrupt:
+            logger.info("⏹️ Surveillance interrompue")
+        finally:
+            watcher.close()
+            self._in_batch = False
+            self._flush_writers()
+            self.metrics.stop_wall()
+        
+        results = self._compile_results(collector)
+        results['executor'] = executor_name
+        results['wall_time'] = self.metrics.report()['wall_time']
+        return results
+    
+    def _process_watch_batch(self, executor, executor_name: str, image_files: Iterable[Path],
+                             output_dir: Path, collector: ResultCollector):
+        """Traite un lot d'images détectées puis rend les sorties visibles"""
+        start = time.perf_counter()
+        before = dict(collector.counts)
+        total_before = collector.total_files
+        
+        self._dispatch(executor, executor_name, image_files, output_dir, collector)
+        for error in self._flush_writers():
+            logger.error(f"❌ Erreur d'écriture: {error}")
+        
+        count = collector.total_files - total_before
+        if count:
+            delta = {status: collector.counts.get(status, 0) - before.get(status, 0) for status in collector.counts}
+            logger.info(f"🔄 Lot de {count} image(s) en {time.perf_counter() - start:.2f}s: "
+                        f"{delta.get('success', 0)} optimisée(s), {delta.get('skipped', 0)} ignorée(s), "
+                        f"{delta.get('error', 0)} erreur(s)")
+    
+    def _open_journal(self, input_dir: Path, output_dir: Path, recursive: bool) -> RunJournal:
+        """Ouvre le journal de progression du lot (un fichier par shard)"""
+        shard = self.config['shard']
+        suffix = f".{shard[0]}-of-{shard[1]}" if shard else ''
+        run_info = {
+            'input_dir': os.path.realpath(input_dir),
+            'recursive': recursive,
+            'config_hash': self._config_hash,
+            'shard': list(shard) if shard else None
+        }
+        journal = RunJournal(output_dir / f".optimization_journal{suffix}.jsonl", run_info, self.config['resume'])
+        if journal.resumed:
+            archive_dir = output_dir / 'archives'
+            if self.config['archive_format'] and archive_dir.exists():
+                ShardWriter.recover(archive_dir)
+            indexes = {}
+            missing = journal.verify(lambda result: self._outputs_exist(output_dir, indexes, result))
+            if missing:
+                logger.warning(f"⚠️ {missing} image(s) journalisée(s) sans leurs sorties, retraitée(s)")
+        if journal.resumed:
+            logger.info(f"⏯️ Reprise du lot: {journal.resumed} images déjà traitées")
+        return journal
+    
+    @staticmethod
+    def _outputs_exist(output_dir: Path, indexes: Dict[str, Set[str]], result: Dict) -> bool:
+        """Vérifie que les sorties d'un résultat journalisé sont présentes
+        
+        En mode archive, le membre doit figurer dans l'index d'une archive publiée
+        (indexes met en cache les noms de membres par archive).
+        """
+        if result.get('status') != 'success':
+            return True
+        outputs = result.get('results', [])
+        # Un alias de variante (dedupe_outputs='alias') pointe vers le membre de sa variante primaire
+        archives = {output['path']: output['archive'] for output in outputs if 'archive' in output}
+        for output in outputs:
+            path = output.get('path')
+            if path is None:
+                continue
+            archive = output.get('archive', archives.get(path))
+            if archive is None:
+                if not Path(path).exists():
+                    return False
+                continue
+            if archive not in indexes:
+                indexes[archive] = set()
+                if Path(archive).exists():
+                    try:
+                        with open(archive + '.index.json', 'r', encoding='utf-8') as f:
+                            indexes[archive] = {member['name'] for member in json.load(f)['members']}
+                    except (OSError, ValueError):
+                        pass
+            try:
+                name = Path(path).relative_to(output_dir).as_posix()
+            except ValueError:
+                name = Path(path).name
+            if name not in indexes[archive]:
+                return False
+        return True
+    
+    def _select_files(self, image_files: Iterable[Path], input_dir: Path, completed: Set[str]) -> Iterator[Path]:
+        """Ignore les images déjà journalisées et celles d'un autre shard
         
+        Le shard d'une image dépend d'un hash de son chemin relatif: chaque machine
+        d'un lot --shard k/n traite un sous-ensemble disjoint et déterministe.
+        """
+        shard = self.config['shard']
         for img_file in image_files:
-            result = self.optimize_single_image(img_file, output_dir)
-            results.append(result)
+            key = RunJournal.key(img_file, input_dir)
+            if key in completed:
+                continue
+            if shard and int(hashlib.sha1(key.encode('utf-8')).hexdigest()[:8], 16) % shard[1] != shard[0] - 1:
+                continue
+            yield img_file
+    
+    def _perceptual_filter(self, image_files: Iterable[Path], output_dir: Path) -> Iterator[Path]:
+        """Pré-passe: ne produit que les images sans quasi-doublon déjà vu
         
-        return self._compile_results(results)
+        Chaque image est réduite à une empreinte dHash indexée dans un arbre BK;
+        une image à moins de perceptual_distance bits d'une image déjà produite
+        n'est pas encodée. Son résultat (ignorée ou alias) est ajouté au lot par
+        _compile_results.
+        """
+        state = {'tree': BKTree(), 'duplicates': [], 'hashed': 0, 'hash_time': 0.0, 'output_dir': output_dir}
+        self._perceptual_state = state
+        max_distance = self.config['perceptual_distance']
+        
+        for img_file in image_files:
+            start = time.perf_counter()
+            try:
+                value = dhash(img_file)
+            except Exception as e:
+                # Empreinte impossible: l'image suit le traitement normal (qui signalera l'erreur)
+                logger.debug(f"Empreinte perceptuelle impossible pour {img_file}: {e}")
+                yield img_file
+                continue
+            finally:
+                state['hash_time'] += time.perf_counter() - start
+            state['hashed'] += 1
+            
+            match = state['tree'].nearest(value, max_distance)
+            if match is None:
+                state['tree'].add(value, img_file)
+                yield img_file
+                continue
+            
+            distance, original = match
+            logger.info(f"👯 {img_file.name} quasi identique à {original.name} (distance {distance})")
+            result = self._create_result(img_file, 'skipped', f"Doublon perceptuel de {original.name}")
+            result.update({'duplicate_of': str(original), 'perceptual_distance': distance})
+            state['duplicates'].append(result)
     
-    def _compile_results(self, results: List[Dict]) -> Dict:
-        """Compile les résultats du traitement"""
-        total_compression = 0
-        successful_results = [r for r in results if r['status'] == 'success']
+    def _add_duplicate_results(self, collector: ResultCollector) -> Dict:
+        """Ajoute les doublons perceptuels au lot et estime le travail évité"""
+        state = self._perceptual_state
+        alias = self.config['perceptual_dedupe'] == 'alias'
+        if alias and state['duplicates'] and self.config['incremental']:
+            # Les sorties de l'original doivent être écrites et enregistrées au manifeste
+            self._flush_writers()
         
-        if successful_results:
-            total_size_before = sum(r['size_before'] for r in successful_results)
-            total_size_after = sum(r['size_after'] for r in successful_results)
-            total_compression = (1 - total_size_after / total_size_before) * 100 if total_size_before > 0 else 0
+        for result in state['duplicates']:
+            if alias:
+                self._alias_duplicate(result, state['output_dir'])
+            collector.add(result)
         
+        # Coût moyen d'une image réellement encodée dans ce lot
+        encoded = collector.counts.get('success', 0)
+        duplicates = len(state['duplicates'])
         return {
-            'status': 'completed',
-            'total_files': len(results),
-            'successful': len(successful_results),
-            'errors': len([r for r in results if r['status'] == 'error']),
-            'skipped': len([r for r in results if r['status'] == 'skipped']),
-            'total_compression': total_compression,
-            'processing_time': self.stats['processing_time'],
-            'results': results
+            'mode': self.config['perceptual_dedupe'],
+            'max_distance': self.config['perceptual_distance'],
+            'hashed': state['hashed'],
+            'hash_time': state['hash_time'],
+            'duplicates': duplicates,
+            'estimated_encode_time_saved': collector.processing_time / encoded * duplicates if encoded else 0,
+            'estimated_bytes_saved': collector.size_after // encoded * duplicates if encoded else 0
         }
     
+    def _alias_duplicate(self, result: Dict, output_dir: Path):
+        """Fait pointer un doublon vers les sorties de l'original (résultat et manifeste)"""
+        original = Path(result['duplicate_of'])
+        duplicate = Path(result['file'])
+        if not self.config['incremental']:
+            return
+        
+        try:
+            manifest = self._get_manifest(output_dir)
+            original_stat = original.stat()
+            outputs = manifest.lookup(original, manifest.content_hash(original, original_stat), self._config_hash)
+            if outputs is None:
+                return
+            aliases = [{**output, 'alias': str(duplicate), 'duplicate_of': output['path'], 'size_after': 0}
+                       for output in outputs]
+            result['results'] = aliases
+            # Aux prochains runs, le doublon inchangé est ignoré dès le manifeste
+            stat = duplicate.stat()
+            manifest.record(duplicate, stat, manifest.content_hash(duplicate, stat), self._config_hash, aliases)
+        except (sqlite3.Error, OSError) as e:
+            logger.warning(f"⚠️ Alias impossible pour {duplicate}: {e}")
+    
+    def _iter_image_files(self, input_dir: Path, recursive: bool = True,
+                          exclude_dir: Path = None) -> Iterator[Path]:
+        """Parcourt le répertoire en une seule passe (os.scandir) et produit les images
+        
+        Les liens symboliques vers des répertoires ne sont pas suivis et un lien vers
+        un fichier déjà présent dans l'arborescence est ignoré: chaque image n'est
+        produite qu'une fois sans garder d'ensemble des chemins vus en mémoire.
+        """
+        root = os.path.realpath(input_dir)
+        excluded = os.path.realpath(exclude_dir) if exclude_dir is not None else None
+        stack = [str(input_dir)]
+        
+        while stack:
+            current = stack.pop()
+            try:
+                with os.scandir(current) as entries:
+                    for entry in entries:
+                        try:
+                            if entry.is_dir(follow_symlinks=False):
+                                if recursive and os.path.realpath(entry.path) != excluded:
+                                    stack.append(entry.path)
+                                continue
+                            
+                            if os.path.splitext(entry.name)[1].lower() not in self.SUPPORTED_FORMATS:
+                                continue
+                            
+                            if entry.is_symlink():
+                                target = os.path.realpath(entry.path)
+                                if not os.path.isfile(target):
+                                    continue
+                                if os.path.commonpath([root, target]) == root:
+                                    # La cible sera (ou a été) produite directement
+                                    continue
+                            elif not entry.is_file(follow_symlinks=False):
+                                continue
+                        except OSError:
+                            continue
+                        
+                        yield Path(entry.path)
+            except OSError as e:
+                logger.warning(f"⚠️ Répertoire illisible {current}: {e}")
+    
+    def _resolve_executor(self) -> str:
+        """Choisit le moteur d'exécution (thread ou process) pour un lot"""
+        executor = self.config['executor']
+        if executor not in self.EXECUTORS:
+            raise ValueError(f"Moteur d'exécution inconnu: {executor}")
+        
+        if executor == 'auto':
+            # Les processus contournent le GIL dès que plusieurs cœurs sont disponibles
+            cpu_count = os.cpu_count() or 1
+            executor = 'process' if cpu_count > 1 else 'thread'
+            logger.info(f"⚙️ Moteur auto: {executor} ({cpu_count} cœurs)")
+        
+        return executor
+    
+    def _create_executor(self, executor_name: str):
+        """Crée le pool de workers correspondant au moteur choisi"""
+        if executor_name == 'process':
+            return ProcessPoolExecutor(
+                max_workers=self.config['max_workers'],
+                initializer=_init_process_worker,
+                initargs=(self.config,)
+            )
+        return ThreadPoolExecutor(max_workers=self.config['max_workers'])
+    
+    def _run_single(self, img_file: Path, output_dir: Path) -> Dict:
+        """Optimise une image, sous cProfile (un profileur par thread) si demandé"""
+        if not self.config['profile_dump']:
+            return self.optimize_single_image(img_file, output_dir)
+        
+        profiler = getattr(self._profiler_local, 'profiler', None)
+        if profiler is None:
+            profiler = cProfile.Profile()
+            self._profiler_local.profiler = profiler
+            with self._profilers_lock:
+                self._profilers.append(profiler)
+        return profiler.runcall(self.optimize_single_image, img_file, output_dir)
+    
+    def _dump_profile(self):
+        """Fusionne les profils cProfile (threads et processus) dans profile_dump"""
+        dump_path = self.config['profile_dump']
+        worker_dumps = glob.glob(f"{glob.escape(dump_path)}.*")
+        
+        with self._profilers_lock:
+            profilers = [p for p in self._profilers if p.getstats()]
+        sources = profilers + worker_dumps
+        if not sources:
+            return
+        
+        stats = pstats.Stats(sources[0])
+        for source in sources[1:]:
+            stats.add(source)
+        stats.dump_stats(dump_path)
+        
+        for worker_dump in worker_dumps:
+            os.remove(worker_dump)
+        logger.info(f"🔬 Profil cProfile écrit: {dump_path}")
+    
+    def _submit(self, executor, executor_name: str, img_file: Path, output_dir: Path):
+        """Soumet une image au pool de workers"""
+        if executor_name == 'process':
+            # Les workers reçoivent des chemins et renvoient (résultat, métriques)
+            return executor.submit(_optimize_in_worker, str(img_file), str(output_dir))
+        return executor.submit(self._run_single, img_file, output_dir)
+    
+    def _collect(self, future, executor_name: str, file_path: Path) -> Dict:
+        """Récupère le résultat d'une tâche terminée"""
+        try:
+            result = future.result()
+            if executor_name == 'process':
+                result, metrics_snapshot = result
+                self.metrics.merge_snapshot(metrics_snapshot)
+            return result
+        except Exception as exc:
+            logger.error(f"❌ {file_path} a généré une exception: {exc}")
+            return self._create_result(file_path, 'error', str(exc))
+    
+    def _estimate_footprint(self, img_file: Path) -> int:
+        """Estime la mémoire nécessaire au traitement d'une image d'après son en-tête
+        
+        largeur × hauteur × canaux à la taille décodée, multiplié par memory_copies
+        pour les copies intermédiaires du pipeline. Les JPEG sont réduits au
+        décodage exactement comme par _fast_decode; les autres formats sont
+        décodés en pleine résolution (reduce() n'intervient qu'après).
+        """
+        try:
+            with Image.open(img_file) as img:
+                # Les images palette/alpha sont converties en RGB(A) par le pipeline
+                bands = max(len(img.getbands()), 3)
+                
+                if self.config['fast_decode'] and img.format == 'JPEG':
+                    # draft() ne décode rien: il fixe seulement la taille de décodage
+                    img = self._fast_decode(img)
+                width, height = img.size
+        except Exception:
+            # Illisible: le worker signalera l'erreur, sans coût mémoire notable
+            return 0
+        
+        return int(width * height * bands * self.config['memory_copies'])
+    
+    def _dispatch(self, executor, executor_name: str, image_files: Iterable[Path],
+                  output_dir: Path, collector: ResultCollector) -> Dict:
+        """Soumet les images au pool avec une file bornée et un contrôle d'admission mémoire
+        
+        Une image n'est admise que si son empreinte estimée tient dans le budget
+        mémoire restant (memory_budget_mb). Les images dépassant serialize_fraction
+        du budget sont traitées seules. Retourne les statistiques d'admission.
+        """
+        # Nombre maximal de tâches soumises non terminées (mémoire constante)
+        max_in_flight = self.config['max_in_flight'] or self.config['max_workers'] * 2
+        budget_mb = self.config['memory_budget_mb']
+        budget = int(budget_mb * 1024 * 1024) if budget_mb else None
+        
+        pending = {}
+        in_use = 0
+        admission = {'budget_mb': budget_mb, 'peak_estimated_mb': 0.0, 'serialized': 0, 'waits': 0}
+        
+        def collect_done(block: bool):
+            nonlocal in_use
+            done, _ = wait(pending, return_when=FIRST_COMPLETED if block else ALL_COMPLETED)
+            for future in done:
+                file_path, cost = pending.pop(future)
+                in_use -= cost
+                collector.add(self._collect(future, executor_name, file_path))
+        
+        for img_file in image_files:
+            cost = 0
+            if budget is not None:
+                cost = self._estimate_footprint(img_file)
+                if cost > budget * self.config['serialize_fraction']:
+                    # Très grande image: elle occupe tout le budget, donc s'exécute seule
+                    logger.info(f"🐘 {img_file.name} traitée seule (~{cost / (1024 * 1024):.0f} Mo estimés)")
+                    admission['serialized'] += 1
+                    cost = max(cost, budget)
+            
+            while pending and (len(pending) >= max_in_flight or
+                               (budget is not None and in_use + cost > budget)):
+                if budget is not None and in_use + cost > budget:
+                    admission['waits'] += 1
+                collect_done(block=True)
+            
+            pending[self._submit(executor, executor_name, img_file, output_dir)] = (img_file, cost)
+            in_use += cost
+            admission['peak_estimated_mb'] = max(admission['peak_estimated_mb'], in_use / (1024 * 1024))
+        
+        # Collecter les derniers résultats
+        while pending:
+            collect_done(block=True)
+        
+        return admission
+    
+    def _process_parallel(self, image_files: Iterable[Path], output_dir: Path) -> Dict:
+        """Traitement en parallèle des images"""
+        executor_name = self._resolve_executor()
+        logger.info(f"⚙️ Moteur d'exécution: {executor_name} ({self.config['max_workers']} workers)")
+        
+        collector = self._create_collector()
+        
+        with self._create_executor(executor_name) as executor:
+            admission = self._dispatch(executor, executor_name, image_files, output_dir, collector)
+        
+        compiled = self._compile_results(collector)
+        compiled['executor'] = executor_name
+        if admission['budget_mb']:
+            compiled['admission'] = admission
+        return compiled
+    
+    def _process_sequential(self, image_files: Iterable[Path], output_dir: Path) -> Dict:
+        """Traitement séquentiel des images"""
+        collector = self._create_collector()
+        
+        for img_file in image_files:
+            result = self._run_single(img_file, output_dir)
+            collector.add(result)
+        
+        return self._compile_results(collector)
+    
+    def _create_collector(self) -> ResultCollector:
+        """Crée le collecteur de résultats (flux JSON Lines si configuré, journalisé en lot)"""
+        if self._journal is not None:
+            return JournaledCollector(self._journal, self._journal_input_dir, self._sync_writers,
+                                      self.config['checkpoint_every'], self.config['results_jsonl'])
+        return ResultCollector(self.config['results_jsonl'])
+    
+    def _compile_results(self, collector: ResultCollector) -> Dict:
+        """Compile les résultats du traitement"""
+        perceptual = None
+        if self._perceptual_state is not None:
+            perceptual = self._add_duplicate_results(collector)
+        collector.close()
+        summary = collector.summary(processing_time=self.stats['processing_time'])
+        if perceptual is not None:
+            summary['perceptual_dedupe'] = perceptual
+        return summary
+    
     def _create_result(self, file_path: Path, status: str, message: str = '') -> Dict:
         """Crée un objet résultat standard"""
         return {
@@ -383,11 +2878,59 @@ class ImageOptimizer:
             'size_after': 0
         }
     
-    def generate_html_report(self, results: Dict, output_path: Path = None) -> str:
-        """Génère un rapport HTML des optimisations"""
+    def _render_stages_html(self, results: Dict) -> str:
+        """Génère la section HTML du détail par étape (et du profilage si présent)"""
+        stage_timings = results.get('stage_timings')
+        if not stage_timings:
+            return ''
+        
+        total_time = sum(timing['total'] for timing in stage_timings.values()) or 1
+        rows = ''.join(
+            f"<tr><td>{stage}</td><td>{timing['total']:.2f}s</td><td>{timing['total'] / total_time * 100:.1f}%</td>"
+            f"<td>{timing['count']}</td><td>{timing['mean'] * 1000:.1f} ms</td></tr>"
+            for stage, timing in sorted(stage_timings.items(), key=lambda item: item[1]['total'], reverse=True)
+        )
+        html = f"""
+                <div class="profile">
+                    <h3>Temps par étape</h3>
+                    <table>
+                        <tr><th>Étape</th><th>Total</th><th>Part</th><th>Appels</th><th>Moyenne</th></tr>
+                        {rows}
+                    </table>"""
+        
+        profile = results.get('profile')
+        if profile:
+            for stage, buckets in profile['histograms'].items():
+                cells = ''.join(f"<td>{bucket}: {count}</td>" for bucket, count in buckets.items())
+                html += f"""
+                    <table><tr><th>{stage}</th>{cells}</tr></table>"""
+            
+            slowest = ''.join(
+                f"<tr><td>{Path(entry['file']).name}</td><td>{entry['processing_time']:.2f}s</td>"
+                f"<td>{', '.join(f'{stage} {elapsed:.2f}s' for stage, elapsed in entry['stages'].items())}</td></tr>"
+                for entry in profile['slowest_files']
+            )
+            html += f"""
+                    <h3>Fichiers les plus lents</h3>
+                    <table>
+                        <tr><th>Fichier</th><th>Temps</th><th>Étapes</th></tr>
+                        {slowest}
+                    </table>"""
+        
+        return html + """
+                </div>"""
+    
+    def generate_html_report(self, results, output_path: Path = None) -> str:
+        """Génère un rapport HTML des optimisations
+        
+        results peut être le résumé d'un run ou le chemin d'un fichier JSON Lines.
+        """
         if output_path is None:
             output_path = Path('optimization_report.html')
         
+        if isinstance(results, (str, Path)):
+            results = ResultCollector.from_jsonl(Path(results)).summary()
+        
         html_template = """
         <!DOCTYPE html>
         <html lang="fr">
@@ -411,6 +2954,10 @@ class ImageOptimizer:
                 .skipped {{ border-left: 4px solid #f59e0b; }}
                 .file-name {{ font-weight: bold; color: #f8fafc; }}
                 .compression {{ color: #10b981; font-weight: bold; }}
+                .profile {{ background: rgba(255,255,255,0.03); padding: 20px; border-radius: 10px; margin-bottom: 40px; }}
+                .profile table {{ width: 100%; border-collapse: collapse; margin-bottom: 20px; }}
+                .profile th, .profile td {{ padding: 8px; border-bottom: 1px solid rgba(255,255,255,0.1); text-align: left; }}
+                .profile th {{ color: #cbd5e1; }}
             </style>
         </head>
         <body>
@@ -439,6 +2986,8 @@ class ImageOptimizer:
                     </div>
                 </div>
                 
+                {stages_html}
+                
                 <div class="results">
                     <h3>Détails des optimisations</h3>
                     {results_html}
@@ -448,63 +2997,534 @@ class ImageOptimizer:
         </html>
         """
         
-        # Générer le HTML des résultats
-        results_html = ""
-        for result in results.get('results', []):
-            status_class = result['status']
-            compression = ""
-            if result['status'] == 'success' and 'compression_ratio' in result:
-                compression = f'<span class="compression">-{result["compression_ratio"]:.1f}%</span>'
-            
-            results_html += f"""
-            <div class="result-item {status_class}">
-                <div class="file-name">{Path(result['file']).name}</div>
-                <div>{result.get('message', '')} {compression}</div>
-            </div>
-            """
-        
-        # Remplir le template
-        html_content = html_template.format(
+        # Remplir l'en-tête du template; les résultats sont écrits au fil de l'eau
+        html_head, html_tail = html_template.split('{results_html}')
+        html_head = html_head.format(
             total_files=results['total_files'],
             successful=results['successful'],
             total_compression=results.get('total_compression', 0),
             processing_time=results.get('processing_time', 0),
-            results_html=results_html
+            stages_html=self._render_stages_html(results)
         )
         
+        if results.get('results'):
+            report_results = results['results']
+        elif results.get('results_file'):
+            report_results = iter_results_jsonl(Path(results['results_file']))
+        else:
+            report_results = []
+        
         # Sauvegarder le rapport
         with open(output_path, 'w', encoding='utf-8') as f:
-            f.write(html_content)
+            f.write(html_head)
+            
+            # Générer le HTML des résultats
+            for result in report_results:
+                status_class = result['status']
+                compression = ""
+                if result['status'] == 'success' and 'compression_ratio' in result:
+                    compression = f'<span class="compression">-{result["compression_ratio"]:.1f}%</span>'
+                
+                f.write(f"""
+            <div class="result-item {status_class}">
+                <div class="file-name">{Path(result['file']).name}</div>
+                <div>{result.get('message', '')} {compression}</div>
+            </div>
+            """)
+            
+            f.write(html_tail)
         
         logger.info(f"📊 Rapport HTML généré: {output_path}")
         return str(output_path)
 
+# Optimiseur propre à chaque processus worker (initialisé une seule fois)
+_worker_optimizer: Optional[ImageOptimizer] = None
+# Tâches traitées par ce worker depuis son dernier point de reprise
+_worker_since_sync = 0
+
+def _init_process_worker(config: Dict):
+    """Initialise l'optimiseur d'un processus worker"""
+    global _worker_optimizer
+    _worker_optimizer = ImageOptimizer(config)
+    
+    # Fermer les écritures (et publier les archives) à la sortie du processus
+    multiprocessing.util.Finalize(None, _worker_optimizer.close, exitpriority=20)
+    
+    if config.get('profile_dump'):
+        # Chaque processus écrit son profil à sa sortie; le parent les fusionne
+        dump_path = f"{config['profile_dump']}.{os.getpid()}"
+        multiprocessing.util.Finalize(None, _dump_worker_profile, args=(dump_path,), exitpriority=10)
+
+def _dump_worker_profile(dump_path: str):
+    """Écrit le profil cProfile cumulé d'un processus worker"""
+    profiler = getattr(_worker_optimizer._profiler_local, 'profiler', None)
+    if profiler is not None:
+        profiler.dump_stats(dump_path)
+
+def _optimize_in_worker(input_path: str, output_dir: str) -> Tuple[Dict, Dict]:
+    """Optimise une image dans un worker et renvoie le résultat et ses métriques"""
+    global _worker_since_sync
+    optimizer = _worker_optimizer
+    result = optimizer._run_single(Path(input_path), Path(output_dir))
+    if optimizer.config['archive_format'] and optimizer.config['journal']:
+        # L'archive du worker n'est publiée qu'à sa sortie: point de reprise local
+        # tous les checkpoint_every résultats. À la reprise, un résultat journalisé
+        # dont le membre n'a pas été rendu durable est retraité (RunJournal.verify).
+        _worker_since_sync += 1
+        if _worker_since_sync >= optimizer.config['checkpoint_every']:
+            _worker_since_sync = 0
+            for error in optimizer._sync_writers():
+                logger.error(f"❌ Erreur d'écriture: {error}")
+    # Hors lot, les écritures de la tâche sont terminées: les métriques du
+    # thread principal et des threads d'écriture ne concernent que cette tâche
+    return result, optimizer.metrics.drain()
+
+def _optimize_bytes_in_worker(data: bytes, filename: str) -> Tuple[Dict, Dict[str, bytes], Dict]:
+    """Optimise une image reçue en mémoire dans un worker (mode service)"""
+    optimizer = _worker_optimizer
+    result, files = optimizer.optimize_image_bytes(data, filename)
+    return result, files, optimizer.metrics.drain()
+
+def _warm_worker() -> int:
+    """Tâche vide qui force le démarrage d'un processus worker"""
+    return os.getpid()
+
+class OptimizationService:
+    """Service HTTP local (asyncio) d'optimisation d'images en mémoire
+    
+    POST /optimize?name=photo.jpg avec les octets de l'image: retourne une archive
+    zip des variantes et de leur manifeste (ou du JSON avec response=json).
+    GET /variant?source=photo.jpg&size=medium&format=webp rend une variante à la
+    demande depuis service_source_root (cache LRU mémoire/disque).
+    GET /metrics et GET /health exposent l'état du service. Le pool de workers
+    reste chaud entre les requêtes; au-delà de max_queue requêtes en cours, le
+    service répond 503 (contre-pression) au lieu de mettre en file sans limite.
+    """
+    
+    REASONS = {200: 'OK', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed',
+               411: 'Length Required', 413: 'Payload Too Large', 415: 'Unsupported Media Type',
+               422: 'Unprocessable Entity', 500: 'Internal Server Error', 503: 'Service Unavailable'}
+    
+    CONTENT_TYPES = {'webp': 'image/webp', 'jpg': 'image/jpeg', 'png': 'image/png'}
+    
+    def __init__(self, optimizer: ImageOptimizer, host: str = '127.0.0.1', port: int = 8765):
+        self.optimizer = optimizer
+        self.host = host
+        self.port = port
+        config = optimizer.config
+        self.max_queue = config['service_max_queue'] or config['max_workers'] * 4
+        self.max_body = int(config['service_max_body_mb'] * 1024 * 1024)
+        self.executor_name = optimizer._resolve_executor()
+        self.executor = None
+        self.in_flight = 0
+        self.stats = {'requests': 0, 'completed': 0, 'variants': 0, 'rejected': 0, 'errors': 0,
+                      'bytes_in': 0, 'bytes_out': 0}
+        self.latency_total = 0.0
+        self.latency_histogram = {}
+    
+    def start_pool(self):
+        """Démarre le pool de workers et chauffe les processus"""
+        self.executor = self.optimizer._create_executor(self.executor_name)
+        if self.executor_name == 'process':
+            warm = [self.executor.submit(_warm_worker) for _ in range(self.optimizer.config['max_workers'])]
+            wait(warm)
+        self.optimizer.metrics.reset()
+        self.optimizer.metrics.start_wall()
+    
+    def close(self):
+        """Arrête le pool de workers"""
+        if self.executor is not None:
+            self.executor.shutdown(wait=True)
+            self.executor = None
+    
+    async def optimize(self, data: bytes, filename: str) -> Tuple[Dict, Dict[str, bytes]]:
+        """Optimise une image dans le pool sans bloquer la boucle asyncio"""
+        loop = asyncio.get_running_loop()
+        if self.executor_name == 'process':
+            result, files, snapshot = await loop.run_in_executor(
+                self.executor, _optimize_bytes_in_worker, data, filename
+            )
+            self.optimizer.metrics.merge_snapshot(snapshot)
+            return result, files
+        return await loop.run_in_executor(self.executor, self.optimizer.optimize_image_bytes, data, filename)
+    
+    def metrics_report(self) -> Dict:
+        """Compteurs du service, latences et métriques du pipeline"""
+        completed = self.stats['completed']
+        # Lecture seule: le cache de variantes n'est pas créé pour être décrit
+        variant_cache = self.optimizer._variant_cache
+        return {
+            'service': {
+                **self.stats,
+                'in_flight': self.in_flight,
+                'max_queue': self.max_queue,
+                'executor': self.executor_name,
+                'mean_latency': self.latency_total / completed if completed else 0,
+                'latency_histogram': dict(sorted(self.latency_histogram.items(),
+                                                  key=lambda item: _bucket_sort_key(item[0])))
+            },
+            'pipeline': self.optimizer.metrics.report(),
+            'variant_cache': variant_cache.report() if variant_cache is not None else None
+        }
+    
+    @staticmethod
+    def _guess_filename(data: bytes) -> Optional[str]:
+        """Déduit un nom de fichier du format détecté dans les octets"""
+        try:
+            with Image.open(io.BytesIO(data)) as img:
+                image_format = img.format
+        except Exception:
+            return None
+        extensions = {'JPEG': '.jpg', 'PNG': '.png', 'WEBP': '.webp', 'GIF': '.gif', 'BMP': '.bmp', 'TIFF': '.tiff'}
+        extension = extensions.get(image_format)
+        return f"upload{extension}" if extension else None
+    
+    @staticmethod
+    def _build_zip(result: Dict, files: Dict[str, bytes]) -> bytes:
+        """Archive zip (sans recompression) des variantes et du manifeste"""
+        buffer = io.BytesIO()
+        with zipfile.ZipFile(buffer, 'w', zipfile.ZIP_STORED) as archive:
+            for name, data in files.items():
+                archive.writestr(name, data)
+            archive.writestr('manifest.json', json.dumps(result, indent=2, default=str))
+        return buffer.getvalue()
+    
+    async def handle_optimize(self, query: Dict, headers: Dict, body: bytes) -> Tuple[int, Dict, bytes, str]:
+        """Traite POST /optimize"""
+        if not body:
+            return self._json(400, {'error': 'Corps de requête vide'})
+        
+        filename = query.get('name') or headers.get('x-filename') or self._guess_filename(body)
+        if not filename:
+            return self._json(415, {'error': 'Format non reconnu'})
+        
+        # Contre-pression: on refuse plutôt que d'empiler les requêtes
+        if self.in_flight >= self.max_queue:
+            self.stats['rejected'] += 1
+            status, extra, payload, content_type = self._json(503, {'error': 'Service saturé, réessayer'})
+            return status, {**extra, 'Retry-After': '1'}, payload, content_type
+        
+        self.in_flight += 1
+        start = time.perf_counter()
+        try:
+            result, files = await self.optimize(body, filename)
+        finally:
+            self.in_flight -= 1
+        
+        elapsed = time.perf_counter() - start
+        self.latency_total += elapsed
+        bucket = histogram_bucket(elapsed)
+        self.latency_histogram[bucket] = self.latency_histogram.get(bucket, 0) + 1
+        
+        if result['status'] == 'skipped':
+            return self._json(415, result)
+        if result['status'] != 'success':
+            self.stats['errors'] += 1
+            return self._json(422, result)
+        
+        self.stats['completed'] += 1
+        if query.get('response') == 'json':
+            result['files'] = {name: base64.b64encode(data).decode('ascii') for name, data in files.items()}
+            return self._json(200, result)
+        # Le nom vient du client: seuls des caractères sûrs passent dans l'en-tête
+        stem = re.sub(r'[^A-Za-z0-9._-]', '_', Path(filename).stem) or 'optimized'
+        return 200, {'Content-Disposition': f'attachment; filename="{stem}.zip"'}, \
+            self._build_zip(result, files), 'application/zip'
+    
+    async def handle_variant(self, query: Dict) -> Tuple[int, Dict, bytes, str]:
+        """Traite GET /variant?source=...&size=...&format=... (rendu paresseux + cache LRU)"""
+        root = self.optimizer.config['service_source_root']
+        if not root:
+            return self._json(404, {'error': 'Aucun répertoire source configuré'})
+        
+        root = os.path.realpath(root)
+        source = os.path.realpath(os.path.join(root, query.get('source', '')))
+        # Refuser tout chemin qui sort du répertoire source
+        if os.path.commonpath([root, source]) != root or not os.path.isfile(source):
+            return self._json(404, {'error': 'Image source introuvable'})
+        
+        format_key = query.get('format', 'webp')
+        size_name = query.get('size', '')
+        if size_name not in ImageOptimizer.RESPONSIVE_SIZES or format_key not in self.CONTENT_TYPES:
+            return self._json(400, {'error': 'Taille ou format de variante invalide'})
+        
+        if self.in_flight >= self.max_queue:
+            self.stats['rejected'] += 1
+            status, extra, payload, content_type = self._json(503, {'error': 'Service saturé, réessayer'})
+            return status, {**extra, 'Retry-After': '1'}, payload, content_type
+        
+        # Le cache vit dans ce processus: le rendu se fait dans un thread
+        self.in_flight += 1
+        try:
+            data = await asyncio.get_running_loop().run_in_executor(
+                None, self.optimizer.get_variant, Path(source), size_name, format_key
+            )
+        finally:
+            self.in_flight -= 1
+        self.stats['variants'] += 1
+        return 200, {'Cache-Control': 'public, max-age=86400'}, data, self.CONTENT_TYPES[format_key]
+    
+    def _json(self, status: int, payload: Dict) -> Tuple[int, Dict, bytes, str]:
+        """Réponse JSON"""
+        return status, {}, json.dumps(payload, default=str).encode('utf-8'), 'application/json'
+    
+    async def route(self, method: str, target: str, headers: Dict, body: bytes) -> Tuple[int, Dict, bytes, str]:
+        """Aiguille une requête vers son traitement"""
+        url = urlsplit(target)
+        query = {key: values[-1] for key, values in parse_qs(url.query).items()}
+        
+        if url.path == '/optimize':
+            if method != 'POST':
+                return self._json(405, {'error': 'POST attendu'})
+            return await self.handle_optimize(query, headers, body)
+        if url.path == '/variant':
+            if method != 'GET':
+                return self._json(405, {'error': 'GET attendu'})
+            return await self.handle_variant(query)
+        if url.path == '/metrics' and method == 'GET':
+            return self._json(200, self.metrics_report())
+        if url.path == '/health' and method == 'GET':
+            return self._json(200, {'status': 'ok', 'in_flight': self.in_flight})
+        return self._json(404, {'error': 'Route inconnue'})
+    
+    async def handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        """Lit les requêtes HTTP/1.1 d'une connexion (keep-alive) et y répond"""
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line.strip():
+                    break
+                try:
+                    method, target, version = request_line.decode('latin-1').split()
+                except ValueError:
+                    await self._send(writer, *self._json(400, {'error': 'Requête invalide'}), keep_alive=False)
+                    break
+                
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b'\r\n', b'\n', b''):
+                        break
+                    name, _, value = line.decode('latin-1').partition(':')
+                    headers[name.strip().lower()] = value.strip()
+                
+                keep_alive = (version == 'HTTP/1.1' and headers.get('connection', '').lower() != 'close')
+                # Corps délimité par Content-Length uniquement (pas de chunked);
+                # sans longueur fiable, la connexion ne peut pas être réutilisée
+                if 'transfer-encoding' in headers:
+                    await self._send(writer, *self._json(411, {'error': 'Transfer-Encoding non pris en charge, '
+                                                                        'Content-Length requis'}), keep_alive=False)
+                    break
+                raw_length = headers.get('content-length') or '0'
+                if not re.fullmatch(r'[0-9]+', raw_length):
+                    await self._send(writer, *self._json(400, {'error': 'Content-Length invalide'}), keep_alive=False)
+                    break
+                length = int(raw_length)
+                if length > self.max_body:
+                    await self._send(writer, *self._json(413, {'error': 'Image trop volumineuse'}), keep_alive=False)
+                    break
+                body = await reader.readexactly(length) if length else b''
+                
+                self.stats['requests'] += 1
+                self.stats['bytes_in'] += length
+                try:
+                    response = await self.route(method.upper(), target, headers, body)
+                except Exception as e:
+                    logger.error(f"❌ Erreur du service sur {target}: {e}")
+                    self.stats['errors'] += 1
+                    response = self._json(500, {'error': str(e)})
+                await self._send(writer, *response, keep_alive=keep_alive)
+                if not keep_alive:
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+    
+    async def _send(self, writer: asyncio.StreamWriter, status: int, extra_headers: Dict,
+                    payload: bytes, content_type: str, keep_alive: bool = True):
+        """Écrit une réponse HTTP"""
+        headers = {
+            'Content-Type': content_type,
+            'Content-Length': str(len(payload)),
+            'Connection': 'keep-alive' if keep_alive else 'close',
+            **extra_headers
+        }
+        head = f"HTTP/1.1 {status} {self.REASONS[status]}\r\n"
+        head += ''.join(f"{name}: {value}\r\n" for name, value in headers.items()) + '\r\n'
+        writer.write(head.encode('latin-1') + payload)
+        self.stats['bytes_out'] += len(payload)
+        await writer.drain()
+    
+    async def serve(self, ready: Optional[threading.Event] = None):
+        """Démarre le serveur et sert jusqu'à annulation"""
+        server = await asyncio.start_server(self.handle_connection, self.host, self.port)
+        self.port = server.sockets[0].getsockname()[1]
+        logger.info(f"🌐 Service d'optimisation sur http://{self.host}:{self.port} "
+                    f"({self.executor_name}, file max {self.max_queue})")
+        if ready is not None:
+            ready.set()
+        async with server:
+            await server.serve_forever()
+    
+    def run(self, ready: Optional[threading.Event] = None):
+        """Point d'entrée bloquant (Ctrl+C pour arrêter)"""
+        self.start_pool()
+        try:
+            asyncio.run(self.serve(ready))
+        except KeyboardInterrupt:
+            logger.info("⏹️ Service arrêté")
+        finally:
+            self.close()
+
+def parse_shard(value: str) -> Tuple[int, int]:
+    """Analyse une part de lot au format k/n (1 <= k <= n)"""
+    try:
+        index, count = (int(part) for part in value.split('/'))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"Format attendu k/n: {value}")
+    if not 1 <= index <= count:
+        raise argparse.ArgumentTypeError(f"Part invalide: {value}")
+    return index, count
+
 def main():
     """Fonction principale avec interface en ligne de commande"""
     parser = argparse.ArgumentParser(description="Optimiseur d'images pour Mayu & Jack Studio")
-    parser.add_argument('input', help='Fichier ou répertoire d\'entrée')
+    parser.add_argument('input', nargs='?', help='Fichier ou répertoire d\'entrée')
     parser.add_argument('-o', '--output', help='Répertoire de sortie')
     parser.add_argument('-q', '--quality', choices=['low', 'medium', 'high'], default='medium', help='Qualité de compression')
+    parser.add_argument('--adaptive', choices=['ssim', 'bytes'],
+                        help='Qualité adaptée à chaque image (SSIM cible ou budget en octets)')
+    parser.add_argument('--target-ssim', type=float, default=0.97, help='SSIM cible du mode adaptatif')
+    parser.add_argument('--byte-budget', type=int, default=200 * 1024,
+                        help='Budget en octets par image du mode adaptatif')
     parser.add_argument('--no-webp', action='store_true', help='Désactiver la génération WebP')
     parser.add_argument('--no-responsive', action='store_true', help='Désactiver les versions responsives')
+    parser.add_argument('--pyramid', action='store_true',
+                        help='Dériver chaque version responsive de la précédente (pyramide)')
+    parser.add_argument('--pyramid-min-ratio', type=float, default=2.0,
+                        help='Ratio minimal source/cible pour réutiliser un niveau de la pyramide')
     parser.add_argument('--recursive', action='store_true', help='Traitement récursif des sous-dossiers')
-    parser.add_argument('--threads', type=int, default=4, help='Nombre de threads pour le traitement parallèle')
+    parser.add_argument('--threads', type=int, default=4, help='Nombre de workers pour le traitement parallèle')
+    parser.add_argument('--executor', choices=ImageOptimizer.EXECUTORS, default='auto',
+                        help="Moteur d'exécution parallèle (auto: process si plusieurs cœurs; "
+                             "thread par défaut hors CLI)")
+    parser.add_argument('--memory-budget', type=int,
+                        help='Budget mémoire (Mo) pour les images décodées en parallèle')
+    parser.add_argument('--watch', action='store_true',
+                        help='Surveiller le répertoire et optimiser les nouvelles images en continu')
+    parser.add_argument('--watch-backend', choices=['auto', 'inotify', 'poll'], default='auto',
+                        help='Détection des changements (inotify sous Linux, sinon scrutation)')
+    parser.add_argument('--debounce', type=float, default=1.0,
+                        help='Délai de calme (s) avant de traiter une rafale de changements')
+    parser.add_argument('--poll-interval', type=float, default=2.0,
+                        help='Intervalle de scrutation (s) du mode poll')
+    parser.add_argument('--serve', action='store_true',
+                        help='Démarrer le service HTTP local d\'optimisation (POST /optimize)')
+    parser.add_argument('--host', default='127.0.0.1', help='Adresse d\'écoute du service')
+    parser.add_argument('--port', type=int, default=8765, help='Port d\'écoute du service')
+    parser.add_argument('--max-queue', type=int,
+                        help='Requêtes en cours maximum avant réponse 503 (défaut: 4 par worker)')
+    parser.add_argument('--flatten-alpha', action='store_true',
+                        help='Aplatir la transparence sur fond blanc aussi pour WebP/PNG')
+    parser.add_argument('--lazy-responsive', action='store_true',
+                        help='Ne produire que l\'image de base; les tailles responsives sont rendues à la demande')
+    parser.add_argument('--source-root', help='Répertoire des images servies par GET /variant')
+    parser.add_argument('--variant-cache-mb', type=int, default=64,
+                        help='Taille du cache mémoire des variantes (Mo)')
+    parser.add_argument('--variant-cache-dir', help='Répertoire du cache disque des variantes')
+    parser.add_argument('--variant-cache-disk-mb', type=int, default=512,
+                        help='Taille du cache disque des variantes (Mo)')
     parser.add_argument('--report', help='Chemin du rapport HTML')
+    parser.add_argument('--full-decode', action='store_true',
+                        help='Décoder les images en pleine résolution (comparaison de qualité)')
+    parser.add_argument('--results-jsonl', help='Écrire les résultats en flux dans un fichier JSON Lines')
+    parser.add_argument('--archive', choices=['tar', 'zip'],
+                        help='Écrire les variantes dans des archives tar/zip au lieu de fichiers')
+    parser.add_argument('--shard-size', type=int, default=256, help='Taille maximale d\'une archive (Mo)')
+    parser.add_argument('--fsync', action='store_true', help='Forcer fsync après chaque écriture')
+    parser.add_argument('--sync-writes', action='store_true',
+                        help='Écrire les fichiers dans le worker (sans étape d\'écriture dédiée)')
+    parser.add_argument('--max-pending-writes', type=int, default=16,
+                        help='Nombre maximal d\'écritures en vol')
+    parser.add_argument('--profile', nargs='?', const='optimization_profile.json',
+                        help='Profiler chaque étape (histogrammes, fichiers les plus lents) et écrire le JSON')
+    parser.add_argument('--profile-top', type=int, default=10, help='Nombre de fichiers lents à conserver')
+    parser.add_argument('--profile-dump', help='Écrire aussi un profil cProfile (fichier .prof)')
+    parser.add_argument('--dedupe', choices=['hardlink', 'alias', 'off'], default='hardlink',
+                        help='Traitement des variantes identiques (lien physique, alias ou ré-encodage)')
+    parser.add_argument('--resume', action='store_true',
+                        help='Reprendre le lot interrompu au dernier checkpoint du journal')
+    parser.add_argument('--shard', type=parse_shard,
+                        help='Ne traiter que la part k/n du lot (ex. 3/8), répartie par hash du chemin')
+    parser.add_argument('--checkpoint-every', type=int, default=100,
+                        help='Nombre d\'images entre deux checkpoints du journal')
+    parser.add_argument('--no-journal', action='store_true', help='Désactiver le journal de progression')
+    parser.add_argument('--perceptual-dedupe', choices=['skip', 'alias'],
+                        help='Pré-passe dHash: ignorer les quasi-doublons ou les lier à l\'original')
+    parser.add_argument('--perceptual-distance', type=int, default=4,
+                        help='Distance de Hamming maximale (sur 64 bits) entre quasi-doublons')
+    parser.add_argument('--overwrite', action='store_true', help='Ré-encoder même les images inchangées')
+    parser.add_argument('--no-cache', action='store_true', help='Désactiver le manifeste incrémental')
     
     args = parser.parse_args()
     
     # Configuration depuis les arguments
     config = {
         'quality': args.quality,
+        'adaptive_quality': args.adaptive,
+        'target_ssim': args.target_ssim,
+        'byte_budget': args.byte_budget,
         'generate_webp': not args.no_webp,
         'generate_responsive': not args.no_responsive,
+        'responsive_pyramid': args.pyramid,
+        'pyramid_min_ratio': args.pyramid_min_ratio,
         'max_workers': args.threads,
-        'threading': args.threads > 1
+        'threading': args.threads > 1,
+        'executor': args.executor,
+        'memory_budget_mb': args.memory_budget,
+        'watch_backend': args.watch_backend,
+        'watch_debounce': args.debounce,
+        'poll_interval': args.poll_interval,
+        'service_max_queue': args.max_queue,
+        'service_source_root': args.source_root,
+        'lazy_responsive': args.lazy_responsive,
+        'preserve_alpha': not args.flatten_alpha,
+        'variant_cache_mb': args.variant_cache_mb,
+        'variant_cache_dir': args.variant_cache_dir,
+        'variant_cache_disk_mb': args.variant_cache_disk_mb,
+        'fast_decode': not args.full_decode,
+        'results_jsonl': args.results_jsonl,
+        'fsync': args.fsync,
+        'archive_format': args.archive,
+        'archive_shard_size': args.shard_size * 1024 * 1024,
+        'async_writes': not args.sync_writes,
+        'max_pending_writes': args.max_pending_writes,
+        'profile': bool(args.profile),
+        'profile_top_n': args.profile_top,
+        'profile_dump': args.profile_dump,
+        'dedupe_outputs': False if args.dedupe == 'off' else args.dedupe,
+        'perceptual_dedupe': args.perceptual_dedupe,
+        'perceptual_distance': args.perceptual_distance,
+        'overwrite': args.overwrite,
+        'journal': not args.no_journal,
+        'checkpoint_every': args.checkpoint_every,
+        'resume': args.resume,
+        'shard': args.shard,
+        'incremental': not args.no_cache
     }
     
     # Initialiser l'optimiseur
     optimizer = ImageOptimizer(config)
     
+    if args.serve:
+        OptimizationService(optimizer, args.host, args.port).run()
+        optimizer.close()
+        return 0
+    
+    if not args.input:
+        parser.error("le chemin d'entrée est requis (sauf avec --serve)")
+    
     input_path = Path(args.input)
     output_path = Path(args.output) if args.output else None
     
@@ -521,6 +3541,9 @@ def main():
             'processing_time': result.get('processing_time', 0),
             'results': [result]
         }
+    elif input_path.is_dir() and args.watch:
+        logger.info("👀 Mode surveillance (Ctrl+C pour arrêter)")
+        results = optimizer.watch_directory(input_path, output_path, args.recursive)
     elif input_path.is_dir():
         logger.info("📁 Optimisation d'un répertoire")
         results = optimizer.optimize_directory(input_path, output_path, args.recursive)
@@ -538,11 +3561,25 @@ def main():
     logger.info(f"Ignorés: {results['skipped']}")
     logger.info(f"Compression moyenne: {results.get('total_compression', 0):.1f}%")
     logger.info(f"Temps total: {results.get('processing_time', 0):.1f}s")
+    if 'images_per_second' in results:
+        logger.info(f"Débit: {results['images_per_second']:.2f} images/s - {results['mb_per_second']:.2f} Mo/s ({results['executor']})")
+        for stage, timing in results.get('stage_timings', {}).items():
+            logger.info(f"   {stage}: {timing['total']:.2f}s ({timing['count']} appels, {timing['mean'] * 1000:.1f} ms/appel)")
+    
+    # Écrire le profil par étape si demandé
+    if args.profile and 'profile' in results:
+        profile_data = {'stages': results.get('stage_timings', {}), **results['profile']}
+        Path(args.profile).write_text(json.dumps(profile_data, indent=2), encoding='utf-8')
+        logger.info(f"🔬 Profil par étape écrit: {args.profile}")
+        for entry in results['profile']['slowest_files'][:5]:
+            logger.info(f"   🐢 {Path(entry['file']).name}: {entry['processing_time']:.2f}s")
     
     # Générer le rapport HTML si demandé
     if args.report:
         optimizer.generate_html_report(results, Path(args.report))
     
+    optimizer.close()
+    
     logger.info("✅ Optimisation terminée avec succès!")
     return 0
 
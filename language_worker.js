@@ -0,0 +1,173 @@
+#!/usr/bin/env node
+/**
+ * WORKER NODE.JS PERSISTANT - MAYU & JACK STUDIO
+ * Lancé par multi_language_adapter.py (pool de workers), même protocole que
+ * run_python_worker: trames JSON préfixées par leur longueur (4 octets
+ * big-endian) sur stdin/stdout.
+ *
+ * Chaque requête `run` charge le script comme module principal (require.main)
+ * après avoir positionné process.argv et le répertoire de travail; ce qu'il
+ * écrit sur process.stdout/process.stderr (console comprise) est capturé et
+ * renvoyé dans la réponse. argv, env, cwd, exitCode, le module principal et le
+ * cache des modules chargés par le script sont rétablis ensuite.
+ *
+ * Limites: seule la partie synchrone du script (et les promesses déjà résolues)
+ * est attendue, et les écritures directes sur le descripteur 1 (fs.writeSync)
+ * ne sont pas capturées. Un script qui en dépend (timers, E/S asynchrones)
+ * doit être déclaré dans worker_spawn_scripts pour être lancé dans un processus neuf.
+ */
+
+'use strict';
+
+const fs = require('fs');
+const path = require('path');
+const Module = require('module');
+
+// Le protocole écrit directement sur le descripteur 1; les écritures des
+// scripts passent par process.stdout/stderr, détournés ci-dessous
+const PROTO_OUT = 1;
+
+class ExitRequest {
+    constructor(code) {
+        this.code = code;
+    }
+}
+
+function sendFrame(obj) {
+    const body = Buffer.from(JSON.stringify(obj), 'utf8');
+    const header = Buffer.alloc(4);
+    header.writeUInt32BE(body.length, 0);
+    fs.writeSync(PROTO_OUT, Buffer.concat([header, body]));
+}
+
+// Hors requête, toute sortie d'un script va sur stderr (jamais dans les trames)
+const rawStderrWrite = process.stderr.write.bind(process.stderr);
+let capture = null;
+
+function captureWrite(streamName) {
+    return (chunk, encoding, callback) => {
+        if (typeof encoding === 'function') {
+            callback = encoding;
+            encoding = undefined;
+        }
+        if (capture) {
+            capture[streamName].push(Buffer.isBuffer(chunk) ? chunk : Buffer.from(String(chunk), encoding));
+        } else {
+            rawStderrWrite(chunk, encoding);
+        }
+        if (callback) {
+            callback();
+        }
+        return true;
+    };
+}
+
+process.stdout.write = captureWrite('stdout');
+process.stderr.write = captureWrite('stderr');
+
+const rawExit = process.exit;
+const baseCwd = process.cwd();
+const baseArgv = process.argv.slice();
+const baseMainModule = process.mainModule;
+
+async function runScript(request) {
+    const script = path.resolve(request.cwd || baseCwd, request.script);
+    try {
+        process.chdir(request.cwd || baseCwd);
+    } catch (error) {
+        // Répertoire absent ou inaccessible: échec de cette requête seulement
+        return {
+            returncode: 1, stdout: '', stderr: `${error.message}\n`, success: false,
+            error: `Répertoire de travail invalide: ${error.message}`
+        };
+    }
+
+    const baseModules = new Set(Object.keys(require.cache));
+    const baseEnv = Object.assign({}, process.env);
+    capture = { stdout: [], stderr: [] };
+    process.argv = [baseArgv[0], script, ...(request.args || [])];
+    process.exitCode = undefined;
+    process.exit = (code) => {
+        throw new ExitRequest(code === undefined ? process.exitCode : code);
+    };
+
+    let returncode = null;
+    try {
+        // isMain: require.main === module dans le script, comme en ligne de commande
+        Module._load(script, null, true);
+    } catch (error) {
+        if (error instanceof ExitRequest) {
+            returncode = Number(error.code) || 0;
+        } else {
+            capture.stderr.push(Buffer.from(`${error && error.stack ? error.stack : error}\n`));
+            returncode = 1;
+        }
+    }
+    try {
+        // Laisser s'exécuter les promesses déjà résolues par le script
+        await new Promise((resolve) => setImmediate(resolve));
+        if (returncode === null) {
+            returncode = Number(process.exitCode) || 0;
+        }
+    } finally {
+        process.exit = rawExit;
+        process.exitCode = undefined;
+        process.argv = baseArgv.slice();
+        process.mainModule = baseMainModule;
+        for (const name of Object.keys(require.cache)) {
+            if (!baseModules.has(name)) {
+                delete require.cache[name];
+            }
+        }
+        for (const name of Object.keys(process.env)) {
+            if (!(name in baseEnv)) {
+                delete process.env[name];
+            }
+        }
+        Object.assign(process.env, baseEnv);
+        process.chdir(baseCwd);
+    }
+
+    const output = capture;
+    capture = null;
+    return {
+        returncode,
+        stdout: Buffer.concat(output.stdout).toString('utf8'),
+        stderr: Buffer.concat(output.stderr).toString('utf8'),
+        success: returncode === 0
+    };
+}
+
+// Lecture des trames: les requêtes sont traitées une à une, dans l'ordre
+let pending = Buffer.alloc(0);
+let queue = Promise.resolve();
+
+async function handle(request) {
+    if (request.op === 'shutdown') {
+        rawExit(0);
+    } else if (request.op === 'ping') {
+        sendFrame({ pong: true });
+    } else {
+        sendFrame(await runScript(request));
+    }
+}
+
+process.stdin.on('data', (chunk) => {
+    pending = Buffer.concat([pending, chunk]);
+    while (pending.length >= 4) {
+        const length = pending.readUInt32BE(0);
+        if (pending.length < 4 + length) {
+            break;
+        }
+        const request = JSON.parse(pending.subarray(4, 4 + length).toString('utf8'));
+        pending = pending.subarray(4 + length);
+        queue = queue.then(() => handle(request));
+    }
+});
+
+// Fin de stdin: arrêt une fois les requêtes en cours terminées
+process.stdin.on('end', () => {
+    queue.then(() => rawExit(0));
+});
+
+sendFrame({ ready: true, pid: process.pid });
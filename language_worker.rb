@@ -0,0 +1,113 @@
+#!/usr/bin/env ruby
+# frozen_string_literal: true
+
+##
+# Worker Ruby persistant pour Mayu & Jack Studio
+# Lancé par multi_language_adapter.py (pool de workers), même protocole que
+# run_python_worker: trames JSON préfixées par leur longueur (4 octets
+# big-endian) sur stdin/stdout.
+#
+# Chaque requête `run` charge le script avec `load` (constantes dans un module
+# anonyme) après avoir positionné ARGV, $0 et le répertoire de travail; sa
+# sortie $stdout/$stderr est capturée et renvoyée dans la réponse. ARGV, $0,
+# ENV et le répertoire sont rétablis après le script. Les gems chargées par
+# `require` restent en mémoire d'une requête à l'autre.
+##
+
+require 'json'
+require 'stringio'
+
+##
+# Boucle du worker: lit les requêtes et exécute les scripts
+##
+class LanguageWorker
+  def initialize
+    # Le protocole garde les descripteurs d'origine; les scripts voient /dev/null
+    # en entrée et stderr en sortie brute, pour ne jamais corrompre les trames
+    @proto_in = $stdin.dup.binmode
+    @proto_out = $stdout.dup.binmode
+    $stdin.reopen(File::NULL)
+    $stdout.reopen($stderr)
+    @base_cwd = Dir.pwd
+  end
+
+  def run
+    send_frame('ready' => true, 'pid' => Process.pid)
+    loop do
+      request = read_frame
+      return 0 if request.nil? || request['op'] == 'shutdown'
+
+      if request['op'] == 'ping'
+        send_frame('pong' => true)
+      else
+        send_frame(run_script(request))
+      end
+    end
+  end
+
+  private
+
+  def read_frame
+    header = @proto_in.read(4)
+    return nil if header.nil? || header.bytesize < 4
+
+    length = header.unpack1('N')
+    body = @proto_in.read(length)
+    return nil if body.nil? || body.bytesize < length
+
+    JSON.parse(body)
+  end
+
+  def send_frame(obj)
+    body = JSON.generate(obj).b
+    @proto_out.write([body.bytesize].pack('N'), body)
+    @proto_out.flush
+  end
+
+  def run_script(request)
+    script = request['script']
+    begin
+      Dir.chdir(request['cwd'] || @base_cwd)
+    rescue SystemCallError => e
+      # Répertoire absent ou inaccessible: échec de cette requête seulement
+      return { 'returncode' => 1, 'stdout' => '', 'stderr' => "#{e.message}\n", 'success' => false,
+               'error' => "Répertoire de travail invalide: #{e.message}" }
+    end
+
+    stdout = StringIO.new
+    stderr = StringIO.new
+    saved_stdout = $stdout
+    saved_stderr = $stderr
+    saved_argv = ARGV.dup
+    saved_program_name = $PROGRAM_NAME
+    saved_env = ENV.to_h
+    returncode = 0
+
+    begin
+      $stdout = stdout
+      $stderr = stderr
+      ARGV.replace(request['args'] || [])
+      $PROGRAM_NAME = script
+      load(script, true)
+    rescue SystemExit => e
+      returncode = e.status
+    rescue Exception => e # rubocop:disable Lint/RescueException
+      stderr.puts("#{e.class}: #{e.message}")
+      stderr.puts(e.backtrace) if e.backtrace
+      returncode = 1
+    ensure
+      $stdout = saved_stdout
+      $stderr = saved_stderr
+      ARGV.replace(saved_argv)
+      $PROGRAM_NAME = saved_program_name
+      ENV.replace(saved_env)
+      Dir.chdir(@base_cwd)
+    end
+
+    # Sorties non UTF-8 remplacées, comme le decode('utf-8', 'replace') côté Python
+    { 'returncode' => returncode, 'stdout' => stdout.string.scrub, 'stderr' => stderr.string.scrub,
+      'success' => returncode.zero? }
+  end
+end
+
+exit(LanguageWorker.new.run) if __FILE__ == $PROGRAM_NAME
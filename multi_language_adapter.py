@@ -14,12 +14,26 @@ import asyncio
 import aiofiles
 import yaml
 from pathlib import Path
-from typing import Dict, List, Any, Optional, Union
-from dataclasses import dataclass, asdict
+from typing import Dict, List, Any, Optional, Set, Tuple, Union
+from dataclasses import dataclass, asdict, field
 from concurrent.futures import ThreadPoolExecutor, as_completed
 import logging
 from datetime import datetime
 import hashlib
+import random
+import re
+import time
+import io
+import struct
+import runpy
+import contextlib
+import traceback
+
+# fcntl n'existe pas sous Windows: le verrou inter-processus du cache est alors omis
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
 
 # Configuration des logs
 logging.basicConfig(
@@ -49,6 +63,682 @@ class AdapterMessage:
     timestamp: str
     message_id: str
 
+@dataclass
+class PipelineStage:
+    """Étape d'un pipeline: script à exécuter et place dans le graphe de dépendances"""
+    name: str
+    language: str
+    script_path: str
+    args: List[str]
+    input_data: Optional[Dict] = None
+    after: List[str] = field(default_factory=list)  # Étapes à terminer avant (quel que soit leur résultat)
+    requires: List[str] = field(default_factory=list)  # Étapes qui doivent avoir réussi
+
+# Protocole des workers: trame = longueur (4 octets big-endian) + JSON UTF-8
+FRAME_HEADER = struct.Struct('>I')
+MAX_FRAME_BYTES = 64 * 1024 * 1024
+
+# Workers fournis avec le projet pour les autres interpréteurs (même protocole).
+# PHP et Lua n'en ont pas: exit() termine l'interpréteur PHP et réinclure un
+# script redéclare ses fonctions (erreur fatale); Lua n'a pas de JSON dans sa
+# bibliothèque standard. Sans commande dans worker_commands, ils restent lancés
+# processus par processus.
+WORKER_SHIMS = {'ruby': 'language_worker.rb', 'javascript': 'language_worker.js'}
+
+def encode_frame(obj: Any) -> bytes:
+    """Encode un objet JSON en trame préfixée par sa longueur"""
+    body = json.dumps(obj, separators=(',', ':')).encode('utf-8')
+    return FRAME_HEADER.pack(len(body)) + body
+
+async def read_frame(reader: asyncio.StreamReader) -> Any:
+    """Lit une trame depuis un flux asyncio (IncompleteReadError si le flux est fermé)"""
+    header = await reader.readexactly(FRAME_HEADER.size)
+    (length,) = FRAME_HEADER.unpack(header)
+    if length > MAX_FRAME_BYTES:
+        raise ValueError(f"Trame trop grande: {length} octets")
+    return json.loads(await reader.readexactly(length))
+
+def _read_frame_sync(stream) -> Optional[Any]:
+    """Version bloquante de read_frame pour le worker; None en fin de flux"""
+    header = stream.read(FRAME_HEADER.size)
+    if len(header) < FRAME_HEADER.size:
+        return None
+    (length,) = FRAME_HEADER.unpack(header)
+    body = stream.read(length)
+    if len(body) < length:
+        return None
+    return json.loads(body)
+
+class WorkerUnavailable(Exception):
+    """Le worker n'a pas pu être démarré: l'appelant revient au lancement d'un processus"""
+
+class LanguageWorker:
+    """Processus worker persistant piloté par trames sur stdin/stdout"""
+    
+    def __init__(self, process: asyncio.subprocess.Process):
+        self.process = process
+        self.requests = 0
+        self.last_used = time.monotonic()
+    
+    @property
+    def alive(self) -> bool:
+        return self.process.returncode is None
+    
+    async def request(self, message: Dict, timeout: float) -> Dict:
+        """Envoie une requête et attend la réponse correspondante"""
+        self.process.stdin.write(encode_frame(message))
+        await self.process.stdin.drain()
+        response = await asyncio.wait_for(read_frame(self.process.stdout), timeout=timeout)
+        self.last_used = time.monotonic()
+        return response
+    
+    async def stop(self, timeout: float = 2.0):
+        """Arrêt propre (fermeture de stdin), puis kill si le worker ne sort pas"""
+        if self.alive:
+            try:
+                self.process.stdin.close()
+                await asyncio.wait_for(self.process.wait(), timeout=timeout)
+            except (asyncio.TimeoutError, OSError):
+                self.kill()
+                await self.process.wait()
+    
+    def kill(self):
+        if self.alive:
+            try:
+                self.process.kill()
+            except ProcessLookupError:
+                pass
+
+class WorkerPool:
+    """Pool de workers persistants pour un langage
+    
+    Les workers sont démarrés à la demande jusqu'à `size`, vérifiés (ping) après
+    une période d'inactivité, remplacés s'ils meurent et recyclés après
+    `max_requests` requêtes.
+    """
+    
+    def __init__(self, language: str, command: List[str], size: int, max_requests: int,
+                 health_interval: float, start_timeout: float):
+        self.language = language
+        self.command = command
+        self.size = size
+        self.max_requests = max_requests
+        self.health_interval = health_interval
+        self.start_timeout = start_timeout
+        self._slots = asyncio.Semaphore(size)
+        self._idle: List[LanguageWorker] = []
+        self._busy = set()
+        self.stats = {'spawned': 0, 'requests': 0, 'crashes': 0, 'retired': 0,
+                      'health_checks': 0, 'failed_health_checks': 0, 'dispatch_time': 0.0}
+    
+    async def _spawn(self) -> LanguageWorker:
+        try:
+            process = await asyncio.create_subprocess_exec(
+                *self.command,
+                stdin=asyncio.subprocess.PIPE,
+                stdout=asyncio.subprocess.PIPE,
+                limit=MAX_FRAME_BYTES
+            )
+        except OSError as e:
+            raise WorkerUnavailable(f"{self.command[0]}: {e}")
+        
+        worker = LanguageWorker(process)
+        try:
+            # Le worker annonce qu'il est prêt par une première trame
+            hello = await asyncio.wait_for(read_frame(process.stdout), timeout=self.start_timeout)
+            if not hello.get('ready'):
+                raise ValueError(hello)
+        except (asyncio.TimeoutError, asyncio.IncompleteReadError, ValueError) as e:
+            worker.kill()
+            await process.wait()
+            raise WorkerUnavailable(f"Worker {self.language} non démarré: {e!r}")
+        
+        self.stats['spawned'] += 1
+        logger.info(f"🔧 Worker {self.language} démarré (pid {process.pid})")
+        return worker
+    
+    async def _ping(self, worker: LanguageWorker) -> bool:
+        self.stats['health_checks'] += 1
+        try:
+            response = await worker.request({'op': 'ping'}, timeout=min(5.0, self.start_timeout))
+            if response.get('pong'):
+                return True
+        except (asyncio.TimeoutError, asyncio.IncompleteReadError, ConnectionError, ValueError):
+            pass
+        self.stats['failed_health_checks'] += 1
+        worker.kill()
+        return False
+    
+    async def _acquire(self) -> LanguageWorker:
+        await self._slots.acquire()
+        try:
+            while self._idle:
+                worker = self._idle.pop()
+                if not worker.alive:
+                    self.stats['crashes'] += 1
+                    continue
+                if time.monotonic() - worker.last_used > self.health_interval and not await self._ping(worker):
+                    continue
+                break
+            else:
+                worker = await self._spawn()
+        except BaseException:
+            self._slots.release()
+            raise
+        self._busy.add(worker)
+        return worker
+    
+    async def _release(self, worker: LanguageWorker, healthy: bool):
+        self._busy.discard(worker)
+        try:
+            if not healthy or not worker.alive:
+                worker.kill()
+            elif worker.requests >= self.max_requests:
+                self.stats['retired'] += 1
+                await worker.stop()
+            else:
+                self._idle.append(worker)
+        finally:
+            self._slots.release()
+    
+    async def run(self, script_path: str, args: List[str], cwd: str, timeout: float) -> Dict:
+        """Exécute un script dans un worker; résultat au format de execute_language_script"""
+        start = time.perf_counter()
+        worker = await self._acquire()
+        self.stats['dispatch_time'] += time.perf_counter() - start
+        self.stats['requests'] += 1
+        worker.requests += 1
+        # Toute sortie autre qu'une réponse complète (timeout, trame invalide,
+        # annulation de l'étape) laisse le worker dans un état inconnu: il est
+        # tué et son créneau libéré
+        healthy = False
+        try:
+            response = await worker.request(
+                {'op': 'run', 'script': script_path, 'args': args, 'cwd': cwd}, timeout=timeout
+            )
+            healthy = True
+        except (asyncio.IncompleteReadError, ConnectionError) as e:
+            self.stats['crashes'] += 1
+            await worker.process.wait()
+            logger.warning(f"💥 Worker {self.language} arrêté pendant {script_path}, il sera remplacé")
+            return {'returncode': worker.process.returncode, 'stdout': '', 'stderr': '',
+                    'success': False, 'error': f"Worker arrêté: {e!r}"}
+        finally:
+            await self._release(worker, healthy)
+        return response
+    
+    async def health_check(self) -> Dict:
+        """Ping de tous les workers inactifs; les workers défaillants sont retirés"""
+        idle, self._idle = self._idle, []
+        for worker in idle:
+            if worker.alive and await self._ping(worker):
+                self._idle.append(worker)
+        return {'idle': len(self._idle), 'busy': len(self._busy)}
+    
+    async def close(self):
+        idle, self._idle = self._idle, []
+        for worker in list(self._busy) + idle:
+            await worker.stop()
+    
+    def report(self) -> Dict:
+        report = dict(self.stats)
+        report['idle'] = len(self._idle)
+        report['busy'] = len(self._busy)
+        report['mean_dispatch_ms'] = (
+            1000 * self.stats['dispatch_time'] / self.stats['requests'] if self.stats['requests'] else 0.0
+        )
+        return report
+
+class MessageBus:
+    """Bus de messages local sur socket Unix (trames de encode_frame)
+    
+    Chaque connexion s'annonce avec son langage; les messages publiés sont routés
+    vers la file du langage cible puis poussés par lots aux abonnés. Un abonné a
+    au plus `window` messages non acquittés; les messages non acquittés à la
+    déconnexion sont remis en file (livraison au moins une fois). Une file pleine
+    suspend l'acquittement des publieurs (contre-pression). Les messages destinés
+    à un langage sans abonné, y compris ceux en file au départ de son dernier
+    abonné, passent par `spill` (fichiers de l'outbox).
+    """
+    
+    def __init__(self, socket_path: str, queue_size: int, batch_size: int, window: int, spill=None):
+        self.socket_path = socket_path
+        self.queue_size = queue_size
+        self.batch_size = batch_size
+        self.window = window
+        self.spill = spill
+        self.server = None
+        self._queues: Dict[str, asyncio.Queue] = {}
+        self._subscribers: Dict[str, int] = {}
+        self._connections = set()
+        self._handlers = set()  # Connexions en cours, y compris celles qui remettent en file
+        self.stats = {'published': 0, 'delivered': 0, 'acked': 0, 'redelivered': 0, 'spilled': 0}
+    
+    def _queue(self, language: str) -> asyncio.Queue:
+        if language not in self._queues:
+            self._queues[language] = asyncio.Queue(maxsize=self.queue_size)
+        return self._queues[language]
+    
+    async def start(self) -> bool:
+        """Démarre le serveur; False si un autre bus écoute déjà sur le socket"""
+        if os.path.exists(self.socket_path):
+            try:
+                _, writer = await asyncio.open_unix_connection(self.socket_path)
+                writer.close()
+                return False
+            except OSError:
+                os.unlink(self.socket_path)  # Socket orphelin d'un bus arrêté
+        self.server = await asyncio.start_unix_server(self._handle, path=self.socket_path, limit=MAX_FRAME_BYTES)
+        logger.info(f"🚌 Bus de messages à l'écoute sur {self.socket_path}")
+        return True
+    
+    async def _route(self, message: Dict):
+        target = message['target_language']
+        if self.spill and not self._subscribers.get(target, 0):
+            self.stats['spilled'] += 1
+            await self.spill(message)
+        else:
+            await self._queue(target).put(message)  # Bloque si la file est pleine
+            if self.spill and not self._subscribers.get(target, 0):
+                # Dernier abonné parti pendant l'attente
+                await self._spill_queue(target)
+        self.stats['published'] += 1
+    
+    async def _spill_queue(self, language: str):
+        """Confie à spill les messages en file d'un langage sans abonné"""
+        queue = self._queues.get(language)
+        while queue is not None and not queue.empty():
+            self.stats['spilled'] += 1
+            await self.spill(queue.get_nowait())
+    
+    async def _requeue(self, language: str, messages: List[Dict]):
+        """Remet en file les messages non acquittés d'un abonné déconnecté (sans bloquer)"""
+        queue = self._queue(language)
+        for message in messages:
+            self.stats['redelivered'] += 1
+            try:
+                queue.put_nowait(message)
+            except asyncio.QueueFull:
+                if self.spill:
+                    self.stats['spilled'] += 1
+                    await self.spill(message)
+                else:
+                    logger.error(f"❌ File {language} pleine, message {message.get('message_id')} perdu")
+        if self.spill and not self._subscribers.get(language, 0):
+            await self._spill_queue(language)
+    
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        write_lock = asyncio.Lock()
+        unacked: Dict[int, Dict] = {}
+        window = asyncio.Semaphore(self.window)
+        deliver_task = None
+        language = None
+        # Les publications sont routées à part pour que les acquittements restent
+        # lus pendant qu'une file pleine bloque; le client limite ses lots en vol
+        publications = asyncio.Queue()
+        
+        async def publish():
+            while True:
+                frame = await publications.get()
+                for message in frame['messages']:
+                    await self._route(message)
+                await send({'op': 'ack', 'batch': frame['batch']})
+        
+        async def send(frame: Dict):
+            async with write_lock:
+                writer.write(encode_frame(frame))
+                await writer.drain()
+        
+        async def deliver(queue: asyncio.Queue):
+            seq = 0
+            while True:
+                await window.acquire()
+                batch = [await queue.get()]
+                while len(batch) < self.batch_size and not queue.empty() and not window.locked():
+                    await window.acquire()
+                    batch.append(queue.get_nowait())
+                items = []
+                for message in batch:
+                    seq += 1
+                    unacked[seq] = message
+                    items.append({'seq': seq, 'message': message})
+                self.stats['delivered'] += len(items)
+                await send({'op': 'deliver', 'messages': items})
+        
+        publish_task = asyncio.ensure_future(publish())
+        handler = asyncio.current_task()
+        self._connections.add(handler)
+        self._handlers.add(handler)
+        try:
+            hello = await read_frame(reader)
+            language = hello['language']
+            if hello.get('subscribe', True):
+                self._subscribers[language] = self._subscribers.get(language, 0) + 1
+                deliver_task = asyncio.ensure_future(deliver(self._queue(language)))
+            
+            while True:
+                frame = await read_frame(reader)
+                if frame['op'] == 'publish':
+                    publications.put_nowait(frame)
+                elif frame['op'] == 'ack':
+                    for seq in frame['seqs']:
+                        if unacked.pop(seq, None) is not None:
+                            self.stats['acked'] += 1
+                            window.release()
+        except (asyncio.IncompleteReadError, ConnectionError, asyncio.CancelledError):
+            pass  # Déconnexion ou arrêt du bus
+        finally:
+            self._connections.discard(handler)
+            publish_task.cancel()
+            if deliver_task:
+                deliver_task.cancel()
+                self._subscribers[language] -= 1
+                # Messages livrés mais non acquittés: remis en file, ou vers
+                # spill s'il ne reste aucun abonné
+                await self._requeue(language, list(unacked.values()))
+            writer.close()
+            self._handlers.discard(handler)
+    
+    async def close(self):
+        if self.server:
+            self.server.close()
+            for handler in list(self._connections):
+                handler.cancel()
+            # Laisser les connexions fermées finir de remettre en file (ou confier
+            # à spill) leurs messages non acquittés
+            await asyncio.gather(*self._handlers, return_exceptions=True)
+            await self.server.wait_closed()
+            self.server = None
+            if os.path.exists(self.socket_path):
+                os.unlink(self.socket_path)
+    
+    def report(self) -> Dict:
+        report = dict(self.stats)
+        report['queued'] = {language: queue.qsize() for language, queue in self._queues.items()}
+        report['subscribers'] = dict(self._subscribers)
+        return report
+
+class MessageBusClient:
+    """Connexion d'un langage au bus: publication par lots et réception poussée
+    
+    Les messages reçus sont placés dans `inbox` sous forme (seq, AdapterMessage)
+    et doivent être acquittés par ack(). Les lots publiés non acquittés lors d'une
+    coupure sont confiés à `fallback` (fichiers de l'outbox).
+    """
+    
+    def __init__(self, socket_path: str, language: str, inbox: Optional[asyncio.Queue] = None,
+                 batch_size: int = 64, batch_delay: float = 0.002, max_pending_batches: int = 16,
+                 fallback=None):
+        self.socket_path = socket_path
+        self.language = language
+        self.inbox = inbox
+        self.batch_size = batch_size
+        self.batch_delay = batch_delay
+        self.fallback = fallback
+        self._pending_batches = asyncio.Semaphore(max_pending_batches)
+        self._unacked: Dict[int, List[Dict]] = {}
+        self._batch: List[Dict] = []
+        self._batch_seq = 0
+        self._flush_handle = None
+        self._flush_lock = asyncio.Lock()
+        self._acked = asyncio.Event()
+        self._reader = None
+        self._writer = None
+        self._reader_task = None
+        self._closing = False
+        self.connected = False
+    
+    async def connect(self):
+        self._reader, self._writer = await asyncio.open_unix_connection(self.socket_path, limit=MAX_FRAME_BYTES)
+        self._writer.write(encode_frame({'op': 'hello', 'language': self.language,
+                                         'subscribe': self.inbox is not None}))
+        await self._writer.drain()
+        self.connected = True
+        self._reader_task = asyncio.ensure_future(self._read_loop())
+    
+    async def _read_loop(self):
+        try:
+            while True:
+                frame = await read_frame(self._reader)
+                if frame['op'] == 'ack':
+                    if self._unacked.pop(frame['batch'], None) is not None:
+                        self._pending_batches.release()
+                        self._acked.set()
+                elif frame['op'] == 'deliver':
+                    for item in frame['messages']:
+                        await self.inbox.put((item['seq'], AdapterMessage(**item['message'])))
+        except (asyncio.IncompleteReadError, ConnectionError):
+            if not self._closing:
+                logger.warning(f"⚠️ Bus de messages déconnecté ({self.language})")
+        finally:
+            self.connected = False
+            self._acked.set()
+            await self._spill_unacked()
+    
+    async def _spill_unacked(self):
+        batches, self._unacked = self._unacked, {}
+        # Chaque lot repris libère sa place: un flush en attente peut se terminer
+        for _ in batches:
+            self._pending_batches.release()
+        pending, self._batch = self._batch, []
+        for messages in list(batches.values()) + [pending]:
+            await self._spill(messages)
+    
+    async def _spill(self, messages: List[Dict]):
+        if self.fallback:
+            for message in messages:
+                await self.fallback(message)
+        elif messages:
+            logger.error(f"❌ {len(messages)} message(s) non remis (bus déconnecté, sans repli)")
+    
+    async def publish(self, message: Dict):
+        """Ajoute un message au lot courant (envoyé plein ou après batch_delay)"""
+        if not self.connected:
+            raise ConnectionError("Bus de messages non connecté")
+        self._batch.append(message)
+        if len(self._batch) >= self.batch_size:
+            await self.flush()
+        elif self._flush_handle is None:
+            self._flush_handle = asyncio.get_running_loop().call_later(
+                self.batch_delay, lambda: asyncio.ensure_future(self.flush())
+            )
+    
+    async def flush(self):
+        """Envoie le lot courant; attend si trop de lots sont en attente d'acquittement"""
+        async with self._flush_lock:
+            if self._flush_handle:
+                self._flush_handle.cancel()
+                self._flush_handle = None
+            if not self._batch:
+                return
+            if self.connected:
+                # Le lot reste en attente tant qu'aucune place ne se libère
+                await self._pending_batches.acquire()
+                if not self.connected:
+                    self._pending_batches.release()
+            if not self.connected:
+                batch, self._batch = self._batch, []
+                await self._spill(batch)
+                return
+            
+            batch, self._batch = self._batch, []
+            self._batch_seq += 1
+            seq = self._batch_seq
+            self._unacked[seq] = batch
+            try:
+                self._writer.write(encode_frame({'op': 'publish', 'batch': seq, 'messages': batch}))
+                await self._writer.drain()
+            except (ConnectionError, OSError):
+                # La boucle de lecture a pu reprendre le lot entre-temps
+                if self._unacked.pop(seq, None) is not None:
+                    self._pending_batches.release()
+                    await self._spill(batch)
+    
+    async def drain(self):
+        """Envoie le lot courant et attend l'acquittement de tous les lots publiés"""
+        await self.flush()
+        while self._unacked and self.connected:
+            self._acked.clear()
+            await self._acked.wait()
+    
+    async def ack(self, seqs: List[int]):
+        """Acquitte des messages reçus (seq de l'inbox), une fois traités"""
+        if seqs and self.connected:
+            self._writer.write(encode_frame({'op': 'ack', 'seqs': seqs}))
+            await self._writer.drain()
+    
+    async def close(self, timeout: float = 2.0):
+        """Ferme la connexion une fois les lots publiés et les acquittements traités par le bus"""
+        if self.connected:
+            await self.drain()
+            # Fin d'écriture: le bus lit les trames restantes puis ferme sa moitié
+            self._closing = True
+            try:
+                self._writer.write_eof()
+                await asyncio.wait_for(self._reader_task, timeout)
+            except (asyncio.TimeoutError, OSError):
+                pass
+        if self._reader_task:
+            self._reader_task.cancel()
+        if self._writer:
+            self._writer.close()
+        self.connected = False
+
+def _logging_state() -> Tuple[Dict, Set[str]]:
+    """Instantané de la configuration des loggers (niveaux, handlers, propagation)"""
+    manager = logging.Logger.manager
+    loggers = {name: logger for name, logger in manager.loggerDict.items() if isinstance(logger, logging.Logger)}
+    loggers[''] = logging.getLogger()
+    state = {name: (logger, logger.level, list(logger.handlers), logger.propagate, logger.disabled)
+             for name, logger in loggers.items()}
+    return state, set(manager.loggerDict)
+
+def _restore_logging(state: Dict, names: Set[str]):
+    """Rétablit la configuration des loggers et oublie ceux créés depuis l'instantané"""
+    manager = logging.Logger.manager
+    for name in list(manager.loggerDict):
+        if name not in names:
+            logger = manager.loggerDict.pop(name)
+            for handler in getattr(logger, 'handlers', []):
+                handler.close()
+    for logger, level, handlers, propagate, disabled in state.values():
+        for handler in logger.handlers:
+            if handler not in handlers:
+                handler.close()
+        logger.handlers[:] = handlers
+        logger.setLevel(level)
+        logger.propagate = propagate
+        logger.disabled = disabled
+    logging.disable(logging.NOTSET)
+
+def run_python_worker(preload: Optional[List[str]] = None) -> int:
+    """Boucle du worker Python (--worker): exécute les scripts dans un interpréteur persistant
+    
+    Les scripts sont lancés via runpy comme `python script args` (ou `python -c code`);
+    leur stdout/stderr Python est capturé et renvoyé dans la réponse. Chaque
+    requête part de l'état initial du worker: logging non configuré (comme un
+    interpréteur neuf), sys.modules, os.environ, cwd, argv et path rétablis
+    après le script. Seuls les modules de `preload`, importés au démarrage,
+    restent chargés d'une requête à l'autre.
+    
+    Différences restantes avec un processus neuf: l'état interne des modules
+    préchargés, les threads laissés par un script et les écritures directes sur
+    les descripteurs 1 et 2 (extensions C, sous-processus), qui ne sont pas
+    capturées. Les scripts qui en dépendent se déclarent dans
+    `worker_spawn_scripts` pour être lancés processus par processus.
+    """
+    # Le protocole garde les descripteurs d'origine; les scripts voient /dev/null en
+    # entrée et stderr en sortie brute, pour ne jamais corrompre les trames
+    proto_in = os.fdopen(os.dup(0), 'rb')
+    proto_out = os.fdopen(os.dup(1), 'wb')
+    devnull = os.open(os.devnull, os.O_RDONLY)
+    os.dup2(devnull, 0)
+    os.dup2(2, 1)
+    sys.stdin = open(os.devnull)
+    
+    def send(obj):
+        proto_out.write(encode_frame(obj))
+        proto_out.flush()
+    
+    # Logging tel qu'un interpréteur neuf le laisse: l'import de ce module l'a configuré
+    root = logging.getLogger()
+    for handler in root.handlers[:]:
+        root.removeHandler(handler)
+    root.setLevel(logging.WARNING)
+    
+    for module in preload or []:
+        __import__(module)
+    
+    send({'ready': True, 'pid': os.getpid()})
+    base_cwd = os.getcwd()
+    base_path = list(sys.path)
+    base_modules = dict(sys.modules)
+    base_environ = dict(os.environ)
+    base_logging = _logging_state()
+    
+    while True:
+        request = _read_frame_sync(proto_in)
+        if request is None or request.get('op') == 'shutdown':
+            return 0
+        if request.get('op') == 'ping':
+            send({'pong': True})
+            continue
+        
+        script, args = request['script'], request.get('args', [])
+        try:
+            os.chdir(request.get('cwd') or base_cwd)
+        except OSError as e:
+            # Répertoire absent ou inaccessible: échec de cette requête seulement
+            send({'returncode': 1, 'stdout': '', 'stderr': f"{e}\n", 'success': False,
+                  'error': f"Répertoire de travail invalide: {e}"})
+            continue
+        
+        stdout, stderr = io.StringIO(), io.StringIO()
+        returncode = 0
+        saved_argv = sys.argv
+        try:
+            with contextlib.redirect_stdout(stdout), contextlib.redirect_stderr(stderr):
+                try:
+                    if script == '-c':
+                        sys.argv = ['-c'] + args[1:]
+                        sys.path[:] = [''] + base_path[1:]
+                        exec(compile(args[0] if args else '', '<string>', 'exec'), {'__name__': '__main__'})
+                    else:
+                        sys.argv = [script] + args
+                        sys.path[:] = [os.path.dirname(os.path.abspath(script))] + base_path[1:]
+                        runpy.run_path(script, run_name='__main__')
+                except SystemExit as e:
+                    if e.code is None:
+                        returncode = 0
+                    elif isinstance(e.code, int):
+                        returncode = e.code
+                    else:
+                        print(e.code, file=sys.stderr)
+                        returncode = 1
+                except BaseException:
+                    traceback.print_exc()
+                    returncode = 1
+        finally:
+            sys.argv = saved_argv
+            sys.path[:] = base_path
+            os.chdir(base_cwd)
+            if os.environ != base_environ:
+                os.environ.clear()
+                os.environ.update(base_environ)
+            for name in [name for name in sys.modules if name not in base_modules]:
+                del sys.modules[name]
+            for name, module in base_modules.items():
+                if sys.modules.get(name) is not module:
+                    sys.modules[name] = module
+            _restore_logging(*base_logging)
+        
+        send({
+            'returncode': returncode,
+            'stdout': stdout.getvalue(),
+            'stderr': stderr.getvalue(),
+            'success': returncode == 0
+        })
+
 class MultiLanguageAdapter:
     """Adaptateur principal pour la communication inter-langages"""
     
@@ -59,6 +749,28 @@ class MultiLanguageAdapter:
         self.message_queue = asyncio.Queue()
         self.active_processes = {}
         
+        # Cache des binaires C++ (clé: source, en-têtes locaux, compilateur, options),
+        # relatif au répertoire du fichier de configuration (ou de ce module)
+        self.base_dir = Path(config_path).resolve().parent if config_path else Path(__file__).resolve().parent
+        self.build_cache_dir = self.base_dir / self.config['build_cache_dir']
+        self.build_cache_stats = {'hits': 0, 'misses': 0, 'shared_builds': 0, 'compile_time': 0.0}
+        self._build_locks = {}
+        self._compiler_versions = {}
+        
+        # Binaires Rust résolus une fois (cargo build --release) puis exécutés directement
+        self._rust_binaries = {}
+        self.rust_stats = {'resolved': 0, 'direct_calls': 0, 'cargo_run_calls': 0,
+                           'build_time': 0.0, 'cargo_overhead_per_call': 0.0}
+        
+        # Workers persistants par langage (créés au premier appel)
+        self._worker_pools = {}
+        
+        # Bus de messages (start_message_bus); sans bus, les fichiers inbox/outbox
+        self.bus_server = None
+        self.bus_client = None
+        # Messages du bus rendus par receive_messages, pas encore acquittés (message_id → seqs)
+        self._delivered: Dict[str, List[int]] = {}
+        
         # Créer les répertoires de communication
         self._setup_communication_dirs()
         
@@ -73,6 +785,26 @@ class MultiLanguageAdapter:
             "max_concurrent_processes": 8,
             "enable_caching": True,
             "cache_ttl": 3600,
+            "cpp_flags": ["-std=c++17", "-O3"],
+            "cpp_cache_keep": 3,
+            "build_cache_dir": "cache/cpp",
+            "worker_pools": True,
+            "worker_pool_size": 2,
+            "worker_max_requests": 1000,
+            "worker_health_interval": 30,
+            "worker_start_timeout": 10,
+            # Commandes des workers par langage (protocole de run_python_worker);
+            # par défaut Python utilise ce module en mode --worker, Ruby et
+            # JavaScript les workers de WORKER_SHIMS, PHP et Lua un processus par appel
+            "worker_commands": {},
+            "worker_preload": [],  # Modules Python gardés chargés dans les workers
+            "worker_spawn_scripts": [],  # Scripts toujours lancés dans un processus neuf
+            "bus_socket": "communication/bus.sock",
+            "bus_language": "python",
+            "bus_queue_size": 1024,
+            "bus_batch_size": 64,
+            "bus_batch_delay": 0.002,
+            "bus_window": 256,
             "log_level": "INFO"
         }
         
@@ -171,15 +903,72 @@ class MultiLanguageAdapter:
         for dir_path in dirs:
             Path(dir_path).mkdir(parents=True, exist_ok=True)
     
+    async def start_message_bus(self, serve: bool = True) -> bool:
+        """Connecte l'adaptateur au bus de messages (en le démarrant si serve)
+        
+        Retourne False si le bus est injoignable: les messages continuent alors
+        de passer par les fichiers inbox/outbox.
+        """
+        socket_path = self.config['bus_socket']
+        if serve and self.bus_server is None:
+            server = MessageBus(
+                socket_path,
+                queue_size=self.config['bus_queue_size'],
+                batch_size=self.config['bus_batch_size'],
+                window=self.config['bus_window'],
+                spill=self._write_outbox
+            )
+            if await server.start():
+                self.bus_server = server
+        
+        client = MessageBusClient(
+            socket_path, self.config['bus_language'], inbox=self.message_queue,
+            batch_size=self.config['bus_batch_size'],
+            batch_delay=self.config['bus_batch_delay'],
+            fallback=self._write_outbox
+        )
+        try:
+            await client.connect()
+        except OSError as e:
+            logger.warning(f"⚠️ Bus de messages indisponible ({e}), échange par fichiers")
+            return False
+        # Les livraisons d'une connexion précédente ont été remises en file par le
+        # bus; leurs seq n'ont plus de sens sur la nouvelle connexion
+        while not self.message_queue.empty():
+            self.message_queue.get_nowait()
+        self._delivered.clear()
+        self.bus_client = client
+        return True
+    
+    async def close_message_bus(self):
+        """Envoie les messages en attente puis ferme le bus"""
+        if self.bus_client:
+            await self.bus_client.close()
+            self.bus_client = None
+        if self.bus_server:
+            await self.bus_server.close()
+            self.bus_server = None
+    
+    async def _write_outbox(self, message_data: Dict):
+        message_file = f"communication/outbox/{message_data['message_id']}_{message_data['target_language']}.json"
+        async with aiofiles.open(message_file, 'w') as f:
+            await f.write(json.dumps(message_data, indent=2))
+    
     async def send_message(self, message: AdapterMessage) -> bool:
         """Envoie un message à un autre langage"""
         try:
             # Sérialiser le message
             message_data = asdict(message)
-            message_file = f"communication/outbox/{message.message_id}_{message.target_language}.json"
             
-            async with aiofiles.open(message_file, 'w') as f:
-                await f.write(json.dumps(message_data, indent=2))
+            if self.bus_client and self.bus_client.connected:
+                try:
+                    await self.bus_client.publish(message_data)
+                    logger.debug(f"📤 Message publié: {message.source_language} → {message.target_language}")
+                    return True
+                except ConnectionError:
+                    pass  # Bus coupé: repli sur l'outbox
+            
+            await self._write_outbox(message_data)
             
             logger.info(f"📤 Message envoyé: {message.source_language} → {message.target_language}")
             return True
@@ -188,12 +977,44 @@ class MultiLanguageAdapter:
             logger.error(f"❌ Erreur envoi message: {e}")
             return False
     
-    async def receive_messages(self) -> List[AdapterMessage]:
-        """Reçoit les messages en attente"""
+    async def ack_messages(self, message_ids: Optional[List[str]] = None):
+        """Acquitte auprès du bus des messages rendus par receive_messages (tous par défaut)
+        
+        À appeler une fois les messages traités; un message non acquitté est
+        relivré (ou confié à l'outbox) si l'adaptateur se déconnecte.
+        """
+        if message_ids is None:
+            message_ids = list(self._delivered)
+        seqs = [seq for message_id in message_ids for seq in self._delivered.pop(message_id, [])]
+        if self.bus_client:
+            await self.bus_client.ack(seqs)
+    
+    async def receive_messages(self, timeout: float = 0) -> List[AdapterMessage]:
+        """Reçoit les messages en attente
+        
+        Les messages du bus sont acquittés par ack_messages() ou, au plus tard, à
+        l'appel suivant: revenir chercher des messages vaut confirmation du
+        traitement des précédents. Avec `timeout`, attend jusqu'à ce délai le
+        premier message poussé si aucun n'est disponible.
+        """
         messages = []
         inbox_dir = Path('communication/inbox')
         
         try:
+            if self.bus_client:
+                await self.ack_messages()
+                if timeout and self.message_queue.empty():
+                    try:
+                        seq, message = await asyncio.wait_for(self.message_queue.get(), timeout)
+                        self._delivered.setdefault(message.message_id, []).append(seq)
+                        messages.append(message)
+                    except asyncio.TimeoutError:
+                        pass
+                while not self.message_queue.empty():
+                    seq, message = self.message_queue.get_nowait()
+                    self._delivered.setdefault(message.message_id, []).append(seq)
+                    messages.append(message)
+            
             for message_file in inbox_dir.glob('*.json'):
                 async with aiofiles.open(message_file, 'r') as f:
                     content = await f.read()
@@ -234,27 +1055,22 @@ class MultiLanguageAdapter:
             args.extend(['--input', input_file])
         
         # Construire la commande
+        cpp_lease = None
         if language == 'cpp':
-            # Compiler puis exécuter
-            executable_name = f"{self.config['temp_dir']}/compiled_{Path(script_path).stem}"
-            compile_cmd = [lang_interface.executable, '-std=c++17', '-O3', script_path, '-o', executable_name]
-            
-            compile_result = await asyncio.create_subprocess_exec(
-                *compile_cmd,
-                stdout=asyncio.subprocess.PIPE,
-                stderr=asyncio.subprocess.PIPE
-            )
-            await compile_result.wait()
-            
-            if compile_result.returncode != 0:
-                stderr = await compile_result.stderr.read()
-                raise RuntimeError(f"Erreur compilation C++: {stderr.decode()}")
-            
+            # Compiler (ou réutiliser le binaire en cache) puis exécuter; le bail
+            # empêche l'élagage du cache de supprimer le binaire avant son lancement
+            executable_name, cpp_lease = await self._get_cpp_binary(lang_interface.executable, script_path)
             cmd = [executable_name] + args
         
         elif language == 'rust':
-            # Utiliser cargo run
-            cmd = ['cargo', 'run', '--manifest-path', f"{Path(script_path).parent}/Cargo.toml"] + args
+            # Binaire release pré-construit; cargo run seulement si la résolution a échoué
+            binary = await self.resolve_rust_binary(script_path)
+            if binary:
+                self.rust_stats['direct_calls'] += 1
+                cmd = [binary] + args
+            else:
+                self.rust_stats['cargo_run_calls'] += 1
+                cmd = ['cargo', 'run', '--manifest-path', f"{Path(script_path).parent}/Cargo.toml"] + args
         
         else:
             # Langages interprétés
@@ -262,24 +1078,44 @@ class MultiLanguageAdapter:
         
         # Exécuter le script
         try:
-            process = await asyncio.create_subprocess_exec(
-                *cmd,
-                stdout=asyncio.subprocess.PIPE,
-                stderr=asyncio.subprocess.PIPE,
-                cwd=Path(script_path).parent
-            )
-            
-            stdout, stderr = await asyncio.wait_for(
-                process.communicate(), 
-                timeout=self.config['communication_timeout']
-            )
+            pool = None
+            if Path(script_path).name not in self.config['worker_spawn_scripts']:
+                pool = self._get_worker_pool(language)
+            result = None
+            if pool:
+                try:
+                    result = await pool.run(
+                        script_path, args, str(Path(script_path).parent),
+                        self.config['communication_timeout']
+                    )
+                except WorkerUnavailable as e:
+                    # Pas de worker pour ce langage: retour définitif au lancement direct
+                    logger.warning(f"⚠️ {e}; exécution {language} sans worker")
+                    self._worker_pools[language] = None
             
-            result = {
-                'returncode': process.returncode,
-                'stdout': stdout.decode('utf-8'),
-                'stderr': stderr.decode('utf-8'),
-                'success': process.returncode == 0
-            }
+            if result is None:
+                try:
+                    process = await asyncio.create_subprocess_exec(
+                        *cmd,
+                        stdout=asyncio.subprocess.PIPE,
+                        stderr=asyncio.subprocess.PIPE,
+                        cwd=Path(script_path).parent
+                    )
+                finally:
+                    if cpp_lease is not None:
+                        cpp_lease.close()
+                
+                stdout, stderr = await asyncio.wait_for(
+                    process.communicate(), 
+                    timeout=self.config['communication_timeout']
+                )
+                
+                result = {
+                    'returncode': process.returncode,
+                    'stdout': stdout.decode('utf-8'),
+                    'stderr': stderr.decode('utf-8'),
+                    'success': process.returncode == 0
+                }
             
             # Essayer de parser la sortie JSON
             try:
@@ -299,56 +1135,408 @@ class MultiLanguageAdapter:
             logger.error(f"❌ Erreur exécution {language}: {e}")
             return {'success': False, 'error': str(e)}
     
-    async def coordinate_optimization_pipeline(self, image_paths: List[str]) -> Dict:
-        """Coordonne un pipeline d'optimisation multi-langages"""
-        pipeline_id = hashlib.md5(str(datetime.now()).encode()).hexdigest()[:8]
-        results = {}
+    def _get_worker_pool(self, language: str) -> Optional[WorkerPool]:
+        """Pool de workers du langage, ou None s'il doit être lancé processus par processus"""
+        if language in self._worker_pools:
+            return self._worker_pools[language]
         
-        logger.info(f"🔄 Démarrage pipeline d'optimisation {pipeline_id}")
+        pool = None
+        command = self.config['worker_commands'].get(language)
+        if command is None and language == 'python':
+            command = [self.languages['python'].executable, os.path.abspath(__file__), '--worker']
+            if self.config['worker_preload']:
+                command += ['--preload', ','.join(self.config['worker_preload'])]
+        elif command is None and language in WORKER_SHIMS:
+            shim = Path(__file__).resolve().parent / WORKER_SHIMS[language]
+            command = [self.languages[language].executable, str(shim)]
+        
+        if self.config['worker_pools'] and not command and language not in ('cpp', 'rust'):
+            logger.info(f"ℹ️ Pas de worker persistant pour {language}: un processus par appel")
+        if self.config['worker_pools'] and command and language not in ('cpp', 'rust'):
+            pool = WorkerPool(
+                language, list(command),
+                size=self.config['worker_pool_size'],
+                max_requests=self.config['worker_max_requests'],
+                health_interval=self.config['worker_health_interval'],
+                start_timeout=self.config['worker_start_timeout']
+            )
+        self._worker_pools[language] = pool
+        return pool
+    
+    async def close_workers(self):
+        """Arrête tous les workers persistants"""
+        for pool in self._worker_pools.values():
+            if pool:
+                await pool.close()
+    
+    async def _get_compiler_version(self, compiler: str) -> str:
+        """Version du compilateur (première ligne de --version), lue une fois"""
+        if compiler not in self._compiler_versions:
+            process = await asyncio.create_subprocess_exec(
+                compiler, '--version',
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.PIPE
+            )
+            stdout, _ = await process.communicate()
+            self._compiler_versions[compiler] = stdout.decode('utf-8', 'replace').splitlines()[0] if stdout else compiler
+        return self._compiler_versions[compiler]
+    
+    def _hash_cpp_sources(self, script_path: Path) -> str:
+        """Empreinte du source et des en-têtes locaux inclus (#include "...")"""
+        digest = hashlib.sha256()
+        pending = [script_path.resolve()]
+        seen = set()
+        while pending:
+            path = pending.pop()
+            if path in seen or not path.is_file():
+                continue
+            seen.add(path)
+            content = path.read_bytes()
+            digest.update(str(path.name).encode('utf-8') + b'\0' + content + b'\0')
+            for include in re.findall(rb'^\s*#\s*include\s*"([^"]+)"', content, re.MULTILINE):
+                pending.append((path.parent / include.decode('utf-8')).resolve())
+        return digest.hexdigest()
+    
+    async def _get_cpp_binary(self, compiler: str, script_path: str) -> Tuple[str, Any]:
+        """Retourne (binaire compilé, bail) pour un source C++, depuis le cache si possible
+        
+        Le binaire est adressé par le contenu (source, en-têtes locaux, version
+        du compilateur, options). Une seule compilation a lieu par clé: verrou
+        asyncio dans ce processus, verrou fcntl exclusif entre processus. Le bail
+        est le fichier de verrou tenu en mode partagé: l'appelant le ferme une
+        fois le binaire lancé, l'élagage ne supprime jamais un binaire sous bail.
+        """
+        flags = list(self.config['cpp_flags'])
+        version = await self._get_compiler_version(compiler)
+        key = hashlib.sha256('\0'.join([
+            self._hash_cpp_sources(Path(script_path)), compiler, version, ' '.join(flags)
+        ]).encode('utf-8')).hexdigest()
+        
+        self.build_cache_dir.mkdir(parents=True, exist_ok=True)
+        stem = Path(script_path).stem
+        binary = (self.build_cache_dir / f"{stem}-{key[:16]}").resolve()
+        lock_path = self.build_cache_dir / f".{binary.name}.lock"
+        loop = asyncio.get_running_loop()
+        
+        if binary.exists():
+            lease = await self._take_lease(lock_path)
+            # L'élagage a pu passer entre le test et le bail
+            if binary.exists():
+                self.build_cache_stats['hits'] += 1
+                os.utime(binary)  # Dernière utilisation, pour l'élagage
+                return str(binary), lease
+            lease.close()
+        
+        lock = self._build_locks.setdefault(key, asyncio.Lock())
+        async with lock:
+            lock_file = open(lock_path, 'a')
+            try:
+                if fcntl is not None:
+                    # Attente du verrou dans un thread pour ne pas bloquer la boucle
+                    await loop.run_in_executor(None, fcntl.flock, lock_file, fcntl.LOCK_EX)
+                
+                if binary.exists():
+                    # Compilé pendant l'attente, par une autre tâche ou un autre processus
+                    self.build_cache_stats['shared_builds'] += 1
+                    self.build_cache_stats['hits'] += 1
+                    os.utime(binary)
+                else:
+                    self.build_cache_stats['misses'] += 1
+                    temp_binary = binary.with_name(f".{binary.name}.{os.getpid()}.tmp")
+                    start = time.perf_counter()
+                    process = await asyncio.create_subprocess_exec(
+                        compiler, *flags, script_path, '-o', str(temp_binary),
+                        stdout=asyncio.subprocess.PIPE,
+                        stderr=asyncio.subprocess.PIPE
+                    )
+                    _, stderr = await process.communicate()
+                    self.build_cache_stats['compile_time'] += time.perf_counter() - start
+                    
+                    if process.returncode != 0:
+                        if temp_binary.exists():
+                            temp_binary.unlink()
+                        raise RuntimeError(f"Erreur compilation C++: {stderr.decode()}")
+                    
+                    os.replace(temp_binary, binary)
+                    logger.info(f"🔨 {script_path} compilé ({binary.name})")
+                
+                if fcntl is not None:
+                    # Le verrou exclusif devient le bail partagé de l'appelant
+                    fcntl.flock(lock_file, fcntl.LOCK_SH)
+                self._prune_cpp_cache(stem, keep=binary.name)
+                return str(binary), lock_file
+            except BaseException:
+                lock_file.close()
+                raise
+            finally:
+                self._build_locks.pop(key, None)
+    
+    async def _take_lease(self, lock_path: Path):
+        """Ouvre le fichier de verrou d'un binaire et le tient en mode partagé"""
+        lease = open(lock_path, 'a')
+        if fcntl is not None:
+            try:
+                fcntl.flock(lease, fcntl.LOCK_SH | fcntl.LOCK_NB)
+            except BlockingIOError:
+                # Compilation ou élagage en cours sur cette clé
+                await asyncio.get_running_loop().run_in_executor(None, fcntl.flock, lease, fcntl.LOCK_SH)
+        return lease
+    
+    def _prune_cpp_cache(self, stem: str, keep: str):
+        """Ne garde que les cpp_cache_keep binaires d'un source utilisés le plus récemment
+        
+        Seuls les noms `<stem>-<empreinte>` du source sont concernés; un binaire
+        dont le verrou est tenu (compilation ou bail) n'est pas supprimé.
+        """
+        pattern = re.compile(re.escape(stem) + r'-[0-9a-f]{16}')
+        binaries = sorted(
+            (path for path in self.build_cache_dir.iterdir()
+             if pattern.fullmatch(path.name) and path.name != keep and path.is_file()),
+            key=lambda path: path.stat().st_mtime,
+            reverse=True
+        )
+        for path in binaries[max(0, self.config['cpp_cache_keep'] - 1):]:
+            lock_path = self.build_cache_dir / f".{path.name}.lock"
+            try:
+                with open(lock_path, 'a') as lock_file:
+                    if fcntl is not None:
+                        fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                    path.unlink()
+                    lock_path.unlink()
+            except OSError:
+                pass  # Binaire en cours d'utilisation (BlockingIOError) ou déjà supprimé
+    
+    async def _run_cargo(self, *args: str) -> Tuple[int, str, str]:
+        """Exécute une commande cargo et retourne (code, stdout, stderr)"""
+        process = await asyncio.create_subprocess_exec(
+            'cargo', *args,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE
+        )
+        stdout, stderr = await process.communicate()
+        return process.returncode, stdout.decode('utf-8', 'replace'), stderr.decode('utf-8', 'replace')
+    
+    async def resolve_rust_binary(self, script_path: str) -> Optional[str]:
+        """Construit (si besoin) l'outil Rust en release et retourne le chemin du binaire
+        
+        Résolu une fois par Cargo.toml: cargo metadata donne le répertoire cible
+        et le nom du binaire, cargo build --release ne recompile que si nécessaire.
+        Un second build, sans travail, mesure le surcoût que cargo run payait à
+        chaque appel. Retourne None si l'outil ne peut pas être construit.
+        """
+        manifest = str((Path(script_path).parent / 'Cargo.toml').resolve())
+        if manifest in self._rust_binaries:
+            return self._rust_binaries[manifest]
+        
+        lock = self._build_locks.setdefault(manifest, asyncio.Lock())
+        async with lock:
+            if manifest in self._rust_binaries:
+                return self._rust_binaries[manifest]
+            self._rust_binaries[manifest] = await self._build_rust_binary(manifest)
+            return self._rust_binaries[manifest]
+    
+    async def _build_rust_binary(self, manifest: str) -> Optional[str]:
+        """cargo build --release puis localisation du binaire produit"""
+        if not Path(manifest).is_file():
+            logger.warning(f"⚠️ {manifest} introuvable, exécution via cargo run")
+            return None
         
         try:
-            # 1. Analyse des images avec Python
-            python_result = await self.execute_language_script(
-                'python',
-                'image_optimizer.py',
-                ['--analyze'] + image_paths,
-                {'pipeline_id': pipeline_id, 'mode': 'analyze'}
+            code, stdout, stderr = await self._run_cargo(
+                'metadata', '--format-version', '1', '--no-deps', '--manifest-path', manifest
             )
-            results['python_analysis'] = python_result
+            if code != 0:
+                raise RuntimeError(stderr.strip())
+            metadata = json.loads(stdout)
+            package = next(p for p in metadata['packages'] if p['manifest_path'] == manifest)
+            binaries = [t['name'] for t in package['targets'] if 'bin' in t['kind']]
+            if not binaries:
+                raise RuntimeError("aucune cible binaire")
+            # Comme cargo run: le binaire du nom du paquet, sinon l'unique cible
+            name = package['name'] if package['name'] in binaries else binaries[0]
             
-            # 2. Optimisation performance avec C++
-            if python_result['success']:
-                cpp_result = await self.execute_language_script(
-                    'cpp',
-                    'performance_optimizer.cpp',
-                    ['--optimize', f"--data={self.config['shared_data_dir']}/analysis_{pipeline_id}.json"]
-                )
-                results['cpp_optimization'] = cpp_result
+            start = time.perf_counter()
+            code, _, stderr = await self._run_cargo('build', '--release', '--manifest-path', manifest)
+            self.rust_stats['build_time'] += time.perf_counter() - start
+            if code != 0:
+                raise RuntimeError(stderr.strip().splitlines()[-1] if stderr.strip() else 'échec')
             
-            # 3. Traitement concurrentiel avec Rust
-            rust_result = await self.execute_language_script(
-                'rust',
-                'performance_utils.rs',
-                ['--concurrent-process', f"--input={self.config['shared_data_dir']}/optimized_{pipeline_id}.json"]
-            )
-            results['rust_processing'] = rust_result
+            # Build à vide: coût de résolution et de fraîcheur évité à chaque appel direct
+            start = time.perf_counter()
+            await self._run_cargo('build', '--release', '--manifest-path', manifest)
+            overhead = time.perf_counter() - start
+            self.rust_stats['cargo_overhead_per_call'] = max(self.rust_stats['cargo_overhead_per_call'], overhead)
+        except (RuntimeError, ValueError, KeyError, StopIteration, OSError) as e:
+            logger.warning(f"⚠️ Outil Rust {manifest} non pré-construit ({e}), exécution via cargo run")
+            return None
+        
+        suffix = '.exe' if sys.platform == 'win32' else ''
+        binary = Path(metadata['target_directory']) / 'release' / f"{name}{suffix}"
+        if not binary.is_file():
+            logger.warning(f"⚠️ Binaire Rust introuvable: {binary}")
+            return None
+        
+        self.rust_stats['resolved'] += 1
+        logger.info(f"🦀 Outil Rust prêt: {binary}")
+        return str(binary)
+    
+    async def prepare_rust_tools(self, script_paths: List[str]):
+        """Résout les outils Rust au démarrage, hors du chemin critique du pipeline"""
+        await asyncio.gather(*(self.resolve_rust_binary(path) for path in script_paths))
+    
+    async def run_stage_graph(self, stages: List[PipelineStage]) -> Tuple[Dict, Dict]:
+        """Exécute un graphe d'étapes: chaque étape démarre dès que ses dépendances
+        sont terminées, dans la limite de max_concurrent_processes processus
+        
+        Une étape dont une dépendance requise a échoué (ou a été sautée) est
+        sautée et absente des résultats. Retourne (résultats, ordonnancement).
+        """
+        by_name = {stage.name: stage for stage in stages}
+        self._check_stage_graph(by_name)
+        
+        semaphore = asyncio.Semaphore(self.config['max_concurrent_processes'])
+        results = {}
+        timings = {}
+        tasks = {}
+        running = 0
+        max_running = 0
+        origin = time.perf_counter()
+        
+        async def run(stage: PipelineStage):
+            nonlocal running, max_running
+            dependencies = stage.after + stage.requires
+            if dependencies:
+                await asyncio.gather(*(tasks[name] for name in dependencies))
+            if not all(results.get(name, {}).get('success', False) for name in stage.requires):
+                logger.info(f"⏭️ Étape {stage.name} sautée (dépendance en échec)")
+                return
             
-            # 4. Génération des couleurs avec Ruby
-            ruby_result = await self.execute_language_script(
-                'ruby',
-                'color_animation_engine.rb',
-                ['--extract-colors', f"--images={','.join(image_paths)}"]
-            )
-            results['ruby_colors'] = ruby_result
+            async with semaphore:
+                start = time.perf_counter()
+                running += 1
+                max_running = max(max_running, running)
+                try:
+                    result = await self.execute_language_script(
+                        stage.language, stage.script_path, list(stage.args), stage.input_data
+                    )
+                except Exception as e:
+                    # Une étape en erreur n'interrompt que ses dépendants
+                    logger.error(f"❌ Étape {stage.name}: {e}")
+                    result = {'success': False, 'error': str(e)}
+                finally:
+                    running -= 1
+                end = time.perf_counter()
             
-            # 5. Mise à jour du backend PHP
-            if all(r.get('success', False) for r in results.values()):
-                php_result = await self.execute_language_script(
-                    'php',
-                    'backend.php',
-                    ['--update-optimized', f"--pipeline={pipeline_id}"]
+            results[stage.name] = result
+            timings[stage.name] = {'start': start - origin, 'end': end - origin, 'duration': end - start}
+        
+        # Les étapes sont déclarées dans un ordre topologique (vérifié ci-dessus)
+        for stage in self._topological_order(by_name):
+            tasks[stage.name] = asyncio.ensure_future(run(by_name[stage.name]))
+        await asyncio.gather(*tasks.values())
+        wall_time = time.perf_counter() - origin
+        
+        critical_path, critical_time = self._critical_path(by_name, timings)
+        serial_time = sum(timing['duration'] for timing in timings.values())
+        schedule = {
+            'stages': timings,
+            'skipped': [stage.name for stage in stages if stage.name not in results],
+            'wall_time': wall_time,
+            'serial_time': serial_time,
+            'time_saved': serial_time - wall_time,
+            'critical_path': critical_path,
+            'critical_path_time': critical_time,
+            'max_concurrency': max_running
+        }
+        ordered_results = {stage.name: results[stage.name] for stage in stages if stage.name in results}
+        return ordered_results, schedule
+    
+    def _check_stage_graph(self, by_name: Dict[str, PipelineStage]):
+        """Vérifie que les dépendances existent et que le graphe est acyclique"""
+        for stage in by_name.values():
+            for name in stage.after + stage.requires:
+                if name not in by_name:
+                    raise ValueError(f"Étape {stage.name}: dépendance inconnue {name}")
+        if len(self._topological_order(by_name)) != len(by_name):
+            raise ValueError("Cycle dans le graphe du pipeline")
+    
+    def _topological_order(self, by_name: Dict[str, PipelineStage]) -> List[PipelineStage]:
+        """Ordre topologique (Kahn), stable selon l'ordre de déclaration"""
+        remaining = {name: set(stage.after + stage.requires) for name, stage in by_name.items()}
+        order = []
+        while True:
+            ready = [name for name, deps in remaining.items() if not deps]
+            if not ready:
+                break
+            for name in ready:
+                order.append(by_name[name])
+                del remaining[name]
+            for deps in remaining.values():
+                deps.difference_update(ready)
+        return order
+    
+    def _critical_path(self, by_name: Dict[str, PipelineStage], timings: Dict) -> Tuple[List[str], float]:
+        """Plus long chemin (en durée d'exécution) à travers le graphe"""
+        best = {}
+        for stage in self._topological_order(by_name):
+            duration = timings.get(stage.name, {}).get('duration', 0.0)
+            previous = max(
+                (best[name] for name in stage.after + stage.requires),
+                key=lambda item: item[0],
+                default=(0.0, [])
+            )
+            best[stage.name] = (previous[0] + duration, previous[1] + [stage.name])
+        
+        if not best:
+            return [], 0.0
+        time_total, path = max(best.values(), key=lambda item: item[0])
+        # Seules les étapes exécutées apparaissent sur le chemin
+        return [name for name in path if name in timings], time_total
+    
+    async def coordinate_optimization_pipeline(self, image_paths: List[str]) -> Dict:
+        """Coordonne un pipeline d'optimisation multi-langages"""
+        pipeline_id = hashlib.md5(str(datetime.now()).encode()).hexdigest()[:8]
+        results = {}
+        
+        logger.info(f"🔄 Démarrage pipeline d'optimisation {pipeline_id}")
+        
+        try:
+            # Graphe du pipeline: Ruby ne dépend que des images, Rust des sorties C++
+            stages = [
+                # 1. Analyse des images avec Python
+                PipelineStage(
+                    'python_analysis', 'python', 'image_optimizer.py',
+                    ['--analyze'] + image_paths,
+                    {'pipeline_id': pipeline_id, 'mode': 'analyze'}
+                ),
+                # 2. Optimisation performance avec C++
+                PipelineStage(
+                    'cpp_optimization', 'cpp', 'performance_optimizer.cpp',
+                    ['--optimize', f"--data={self.config['shared_data_dir']}/analysis_{pipeline_id}.json"],
+                    requires=['python_analysis']
+                ),
+                # 3. Traitement concurrentiel avec Rust
+                PipelineStage(
+                    'rust_processing', 'rust', 'performance_utils.rs',
+                    ['--concurrent-process', f"--input={self.config['shared_data_dir']}/optimized_{pipeline_id}.json"],
+                    after=['cpp_optimization']
+                ),
+                # 4. Génération des couleurs avec Ruby
+                PipelineStage(
+                    'ruby_colors', 'ruby', 'color_animation_engine.rb',
+                    ['--extract-colors', f"--images={','.join(image_paths)}"]
+                ),
+                # 5. Mise à jour du backend PHP
+                PipelineStage(
+                    'php_backend', 'php', 'backend.php',
+                    ['--update-optimized', f"--pipeline={pipeline_id}"],
+                    requires=['python_analysis', 'cpp_optimization', 'rust_processing', 'ruby_colors']
                 )
-                results['php_backend'] = php_result
+            ]
+            results, schedule = await self.run_stage_graph(stages)
+            logger.info(f"⏱️ Pipeline {pipeline_id}: {schedule['wall_time']:.2f}s "
+                        f"(série: {schedule['serial_time']:.2f}s, chemin critique: "
+                        f"{' → '.join(schedule['critical_path'])})")
             
             # Générer le rapport final
             final_report = {
@@ -357,7 +1545,8 @@ class MultiLanguageAdapter:
                 'total_images': len(image_paths),
                 'results': results,
                 'success': all(r.get('success', False) for r in results.values()),
-                'processing_chain': ['Python', 'C++', 'Rust', 'Ruby', 'PHP']
+                'processing_chain': ['Python', 'C++', 'Rust', 'Ruby', 'PHP'],
+                'schedule': schedule
             }
             
             # Sauvegarder le rapport
@@ -592,6 +1781,15 @@ namespace MayuJackStudio {
             'active_processes': len(self.active_processes),
             'shared_data_size': self._get_shared_data_size(),
             'cache_size': self._get_cache_size(),
+            'build_cache': dict(self.build_cache_stats),
+            'rust_tools': {
+                **self.rust_stats,
+                'estimated_time_saved': self.rust_stats['direct_calls'] * self.rust_stats['cargo_overhead_per_call']
+            },
+            'workers': {
+                language: pool.report() for language, pool in self._worker_pools.items() if pool
+            },
+            'message_bus': self.bus_server.report() if self.bus_server else None,
             'uptime': datetime.now().isoformat()
         }
     
@@ -615,16 +1813,119 @@ namespace MayuJackStudio {
                     total_size += file_path.stat().st_size
         return total_size
 
+async def benchmark_message_bus(adapter: MultiLanguageAdapter, iterations: int,
+                                poll_interval: float) -> Dict:
+    """Compare l'échange par fichiers (inbox scrutée) et le bus de messages
+    
+    La latence est mesurée message par message (envoi → réception par un
+    consommateur indépendant), le débit sur un envoi de `iterations` × 50 messages.
+    """
+    def make_message(index: int) -> AdapterMessage:
+        return AdapterMessage(
+            source_language='ruby', target_language=adapter.config['bus_language'],
+            message_type='data', payload={'index': index, 'sent': time.perf_counter()},
+            timestamp=datetime.now().isoformat(), message_id=f"bench_{index}"
+        )
+    
+    async def write_inbox(message: AdapterMessage):
+        # Dépôt d'un autre processus: écriture temporaire puis renommage atomique
+        path = Path('communication/inbox') / f"{message.message_id}_{message.target_language}.json"
+        async with aiofiles.open(f"{path}.tmp", 'w') as f:
+            await f.write(json.dumps(asdict(message), indent=2))
+        os.replace(f"{path}.tmp", path)
+    
+    async def measure(send, flush, receive) -> Dict:
+        # Un consommateur indépendant reçoit pendant que l'émetteur envoie
+        received = []
+        target = 1
+        arrived = asyncio.Event()
+        
+        async def consume():
+            while True:
+                for message in await receive():
+                    received.append(time.perf_counter() - message.payload['sent'])
+                if len(received) >= target:
+                    arrived.set()
+        
+        consumer = asyncio.ensure_future(consume())
+        try:
+            for index in range(iterations):
+                # Envoi déphasé par rapport à la scrutation
+                await asyncio.sleep(random.uniform(0, poll_interval))
+                target = len(received) + 1
+                arrived.clear()
+                await send(make_message(index))
+                await flush()
+                await arrived.wait()
+            latency = sum(received) / len(received)
+            
+            received.clear()
+            target = batch
+            arrived.clear()
+            start = time.perf_counter()
+            for index in range(batch):
+                await send(make_message(index))
+            await flush()
+            await arrived.wait()
+            return {'latency_ms': 1000 * latency, 'throughput': batch / (time.perf_counter() - start)}
+        finally:
+            consumer.cancel()
+    
+    async def no_flush():
+        pass
+    
+    results = {}
+    batch = iterations * 50
+    level = logger.level
+    logger.setLevel(logging.WARNING)
+    try:
+        # Fichiers: l'inbox est scrutée toutes les poll_interval secondes
+        async def poll():
+            messages = await adapter.receive_messages()
+            if not messages:
+                await asyncio.sleep(poll_interval)
+            return messages
+        
+        results['files'] = await measure(write_inbox, no_flush, poll)
+        
+        # Bus: un client "ruby" publie vers l'adaptateur abonné
+        if not adapter.bus_client and not await adapter.start_message_bus():
+            return results
+        sender = MessageBusClient(adapter.config['bus_socket'], 'ruby',
+                                  batch_size=adapter.config['bus_batch_size'],
+                                  batch_delay=adapter.config['bus_batch_delay'])
+        await sender.connect()
+        
+        async def publish(message: AdapterMessage):
+            await sender.publish(asdict(message))
+        
+        async def push():
+            return await adapter.receive_messages(timeout=1.0)
+        
+        results['bus'] = await measure(publish, sender.flush, push)
+        await adapter.ack_messages()
+        await sender.close()
+    finally:
+        logger.setLevel(level)
+    return results
+
 # Interface en ligne de commande
 async def main():
     """Point d'entrée principal"""
     import argparse
     
     parser = argparse.ArgumentParser(description="Multi-Language Adapter - Mayu & Jack Studio")
-    parser.add_argument('--action', choices=['pipeline', 'colors', 'test', 'stats'], 
+    parser.add_argument('--action', choices=['pipeline', 'colors', 'test', 'stats', 'bench-workers', 'bench-bus'], 
                        default='test', help='Action à exécuter')
     parser.add_argument('--images', nargs='*', help='Chemins des images pour le pipeline')
     parser.add_argument('--config', help='Fichier de configuration')
+    parser.add_argument('--iterations', type=int, default=20,
+                       help='Nombre d\'appels pour les benchmarks')
+    parser.add_argument('--poll-interval', type=float, default=0.01,
+                       help='Intervalle de scrutation de l\'inbox fichiers (bench-bus)')
+    parser.add_argument('--worker', action='store_true',
+                       help='Mode worker persistant (utilisé par le pool Python)')
+    parser.add_argument('--preload', help='Modules préchargés par le worker (séparés par des virgules)')
     
     args = parser.parse_args()
     
@@ -639,6 +1940,7 @@ async def main():
             print("❌ Images requises pour le pipeline")
             return
         
+        await adapter.prepare_rust_tools(['performance_utils.rs'])
         result = await adapter.coordinate_optimization_pipeline(args.images)
         print(f"📊 Pipeline terminé: {result['success']}")
         print(f"📁 Rapport: {result.get('pipeline_id', 'N/A')}")
@@ -648,6 +1950,33 @@ async def main():
         print(f"🎨 Système de couleurs créé: {result.get('version', 'N/A')}")
         print(f"📄 Adaptations: {len(result.get('adaptations', {}))}")
     
+    elif args.action == 'bench-workers':
+        # Latence par appel: un interpréteur par appel contre le pool persistant
+        code = ['import json; print(json.dumps({"status": "ok"}))']
+        timings = {}
+        for mode in ('spawn', 'worker'):
+            adapter.config['worker_pools'] = mode == 'worker'
+            adapter._worker_pools.clear()
+            await adapter.execute_language_script('python', '-c', list(code))  # Démarrage du worker
+            start = time.perf_counter()
+            for _ in range(args.iterations):
+                result = await adapter.execute_language_script('python', '-c', list(code))
+                if not result['success']:
+                    print(f"❌ Échec en mode {mode}: {result.get('stderr') or result.get('error')}")
+                    break
+            timings[mode] = (time.perf_counter() - start) / args.iterations
+            await adapter.close_workers()
+        
+        for mode, latency in timings.items():
+            print(f"⏱️ {mode}: {latency * 1000:.2f} ms/appel")
+        print(f"🚀 Accélération: {timings['spawn'] / timings['worker']:.1f}x")
+    
+    elif args.action == 'bench-bus':
+        results = await benchmark_message_bus(adapter, args.iterations, args.poll_interval)
+        for transport, result in results.items():
+            print(f"⏱️ {transport}: latence {result['latency_ms']:.3f} ms/message, "
+                  f"débit {result['throughput']:.0f} messages/s")
+    
     elif args.action == 'stats':
         stats = adapter.get_statistics()
         print("📊 Statistiques:")
@@ -670,6 +1999,15 @@ async def main():
         stats = adapter.get_statistics()
         print(f"\n📊 Langages supportés: {stats['supported_languages']}")
         print(f"💾 Données partagées: {stats['shared_data_size']} octets")
+    
+    await adapter.close_workers()
+    await adapter.close_message_bus()
 
 if __name__ == '__main__':
+    # Mode worker (pool persistant): boucle synchrone hors de toute boucle asyncio
+    if '--worker' in sys.argv[1:]:
+        preload = []
+        if '--preload' in sys.argv[1:-1]:
+            preload = sys.argv[sys.argv.index('--preload') + 1].split(',')
+        sys.exit(run_python_worker(preload))
     asyncio.run(main())
@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""
+Tests de non-régression de l'optimiseur d'images (pytest)
+
+Chaque lot s'exécute dans un sous-processus placé dans un répertoire temporaire
+(le module écrit son journal image_optimizer.log dans le répertoire courant).
+"""
+
+import json
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+from PIL import Image
+
+REPO_DIR = Path(__file__).resolve().parent
+
+# Lot d'archives avec checkpoint tous les 5 résultats; kill_after > 0 tue le
+# groupe de processus, workers compris (SIGKILL, sans nettoyage), après ce
+# nombre de résultats collectés
+BATCH_SCRIPT = """
+import os, signal, sys
+from pathlib import Path
+sys.path.insert(0, sys.argv[1])
+import image_optimizer as io_mod
+
+kill_after = int(sys.argv[5])
+if kill_after:
+    original_add = io_mod.JournaledCollector.add
+    def add(self, result):
+        original_add(self, result)
+        if self.total_files >= kill_after:
+            os.killpg(os.getpgid(0), signal.SIGKILL)
+    io_mod.JournaledCollector.add = add
+
+optimizer = io_mod.ImageOptimizer({
+    'archive_format': 'tar',
+    'checkpoint_every': 5,
+    'executor': sys.argv[4],
+    'max_workers': 4,
+    'generate_responsive': False,
+    'resume': not kill_after,
+})
+optimizer.optimize_directory(Path(sys.argv[2]), Path(sys.argv[3]))
+"""
+
+def _make_corpus(input_dir: Path, count: int):
+    input_dir.mkdir()
+    for i in range(count):
+        Image.new('RGB', (64, 48), (i * 8 % 256, 80, 160)).save(input_dir / f"n{i:02d}.jpg", quality=90)
+
+def _run_batch(work_dir: Path, executor: str, kill_after: int) -> subprocess.CompletedProcess:
+    return subprocess.run(
+        [sys.executable, '-c', BATCH_SCRIPT, str(REPO_DIR), 'input', 'output', executor, str(kill_after)],
+        cwd=work_dir, capture_output=True, text=True, timeout=300, start_new_session=True
+    )
+
+def _published_members(archive_dir: Path) -> set:
+    members = set()
+    for index_path in archive_dir.glob('*.index.json'):
+        with open(index_path, 'r', encoding='utf-8') as f:
+            members.update(member['name'] for member in json.load(f)['members'])
+    return members
+
+@pytest.mark.parametrize('executor', ['thread', 'process'])
+def test_resume_after_kill_rewrites_unsynced_archive_members(tmp_path, executor):
+    """Après un SIGKILL entre deux checkpoints, --resume ne tient pour « inchangée »
+    aucune image dont le membre d'archive n'a pas été rendu durable"""
+    count = 30
+    _make_corpus(tmp_path / 'input', count)
+
+    killed = _run_batch(tmp_path, executor, kill_after=22)
+    assert killed.returncode != 0
+
+    resumed = _run_batch(tmp_path, executor, kill_after=0)
+    assert resumed.returncode == 0, resumed.stderr
+
+    members = _published_members(tmp_path / 'output' / 'archives')
+    missing = [f"n{i:02d}" for i in range(count)
+               if f"n{i:02d}.webp" not in members or f"n{i:02d}_optimized.jpg" not in members]
+    assert not missing
+    assert not list((tmp_path / 'output' / 'archives').glob('*.partial*'))